@@ -0,0 +1,79 @@
+from datetime import date
+import numpy as np
+from flask import Blueprint, request, jsonify
+from app.db.models import db, Trade
+from app.api.pnl import _filter_trades_by_exit
+from app.services.analytics import load_trade_columns, compute_summary, equity_curve
+from app.services.trade_cache import get_trade_snapshot
+
+analytics_bp = Blueprint('analytics', __name__)
+
+@analytics_bp.route('/api/analytics/summary', methods=['GET'])
+def get_analytics_summary():
+    """
+    Win rate, profit factor, drawdown, expectancy, streaks, Sharpe/Sortino over the filtered trades.
+
+    Query params:
+    - start_date, end_date, symbol: same as /api/pnl/daily
+    - account, direction (LONG/SHORT), strategy: exact filters
+    - series: none (default), daily or trade - include the equity / drawdown curve
+    - source: cache (default, the in-process trade snapshot) or db; strategy always reads the db
+    """
+    try:
+        series = request.args.get('series', 'none')
+        if series not in ['none', 'daily', 'trade']:
+            return jsonify({'error': f"Invalid series: {series}. Must be none, daily or trade"}), 400
+
+        if request.args.get('source', 'cache') == 'cache' and not request.args.get('strategy'):
+            columns = _snapshot_columns()
+        else:
+            columns = _db_columns()
+
+        response = compute_summary(columns['pnl'], columns['trading_day'])
+
+        if series != 'none':
+            response['equity_curve'] = equity_curve(columns['pnl'], columns['trading_day'],
+                                                    columns['exit_time'], by=series)
+
+        return jsonify(response), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate analytics: {str(e)}'}), 500
+
+@analytics_bp.route('/api/analytics/cache', methods=['GET'])
+def get_trade_cache_report():
+    """size of the in-process trade snapshot (built if needed)"""
+    try:
+        return jsonify(get_trade_snapshot().memory_report()), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to build trade cache: {str(e)}'}), 500
+
+def _snapshot_columns():
+    snapshot = get_trade_snapshot()
+    mask = snapshot.select(request.args.get('start_date'), request.args.get('end_date'),
+                           request.args.get('symbol'), request.args.get('account'),
+                           request.args.get('direction'))
+    return {
+        'exit_time': snapshot.exit_time[mask],
+        'pnl': snapshot.pnl[mask],
+        'trading_day': snapshot.trading_day[mask],
+    }
+
+def _db_columns():
+    query = _filter_trades_by_exit(db.session.query(Trade), request.args.get('start_date'),
+                                   request.args.get('end_date'), request.args.get('symbol'))
+    if request.args.get('account'):
+        query = query.filter(Trade.acc_id == request.args['account'])
+    if request.args.get('direction'):
+        query = query.filter(Trade.direction == request.args['direction'].upper())
+    if request.args.get('strategy'):
+        query = query.filter(Trade.strategy == request.args['strategy'])
+    columns = load_trade_columns(query)
+
+    # the exit time window can span other products' sessions, keep the requested trading days
+    mask = np.ones(columns['pnl'].size, dtype=bool)
+    for bound, keep in [('start_date', np.greater_equal), ('end_date', np.less_equal)]:
+        value = request.args.get(bound)
+        if value and 'T' not in value:
+            mask &= keep(columns['trading_day'], np.datetime64(date.fromisoformat(value), 'D'))
+    return {name: column[mask] for name, column in columns.items()}
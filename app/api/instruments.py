@@ -0,0 +1,71 @@
+from flask import Blueprint, request, jsonify, current_app, url_for
+from app.services.instruments import DEFAULT_INSTRUMENTS, get_instruments, upsert_instrument, run_reprice_job
+from app.services.jobs import submit_job
+from app.utils.session_calendar import product_root
+
+instruments_bp = Blueprint('instruments', __name__)
+
+
+def _queue_reprice(roots=None):
+    job = submit_job(current_app._get_current_object(), 'reprice', run_reprice_job, roots=roots)
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('jobs.get_job_status', job_id=job['id'])
+    }
+
+@instruments_bp.route('/api/instruments', methods=['GET'])
+def get_instrument_list():
+    """every known root with its tick size, point value and per-side commission"""
+    try:
+        instruments = get_instruments()
+        return jsonify({
+            'instruments': [
+                {'root': root, **spec._asdict(),
+                 'source': 'default' if DEFAULT_INSTRUMENTS.get(root) == spec else 'table'}
+                for root, spec in sorted(instruments.items())
+            ]
+        }), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to load instruments: {str(e)}'}), 500
+
+@instruments_bp.route('/api/instruments/<root>', methods=['PUT'])
+def put_instrument(root):
+    """
+    Set a root's spec / fee schedule.
+
+    JSON: tick_size, point_value, commission_per_side (missing ones keep their current
+    value), reprice (default true) queues a job re-pricing that root's stored trades.
+    """
+    try:
+        data = request.get_json() or {}
+        root = product_root(root)  # MGCG6 -> MGC, the key upsert_instrument uses
+        current = get_instruments().get(root)
+        values = {}
+        for name in ['tick_size', 'point_value', 'commission_per_side']:
+            value = data.get(name, getattr(current, name) if current else None)
+            if value is None:
+                return jsonify({'error': f'{name} is required for a new instrument'}), 400
+            try:
+                values[name] = float(value)
+            except (TypeError, ValueError):
+                return jsonify({'error': f'Invalid {name}: {value}'}), 400
+        if values['tick_size'] <= 0 or values['point_value'] <= 0 or values['commission_per_side'] < 0:
+            return jsonify({'error': 'tick_size and point_value must be positive, commission_per_side not negative'}), 400
+
+        instrument = upsert_instrument(root, **values)
+        if str(data.get('reprice', True)).lower() in ['1', 'true', 'yes']:
+            return jsonify({'instrument': instrument, 'reprice': _queue_reprice([instrument['root']])}), 202
+        return jsonify({'instrument': instrument}), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to save instrument: {str(e)}'}), 500
+
+@instruments_bp.route('/api/instruments/reprice', methods=['POST'])
+def reprice_trades():
+    """queue a re-price of stored trades: JSON roots (list) limits it to those roots"""
+    try:
+        roots = (request.get_json(silent=True) or {}).get('roots')
+        return jsonify(_queue_reprice(roots or None)), 202
+    except Exception as e:
+        return jsonify({'error': f'Failed to queue reprice: {str(e)}'}), 500
@@ -0,0 +1,66 @@
+from flask import Blueprint, request, jsonify, current_app, url_for
+from app.services.jobs import submit_job, get_job, list_jobs, run_import_job
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def _option(data: dict, name: str, default: bool) -> bool:
+    value = data.get(name, default)
+    if isinstance(value, str):
+        return value.lower() in ['1', 'true', 'yes']
+    return bool(value)
+
+@jobs_bp.route('/api/jobs/import', methods=['POST'])
+def create_import_job():
+    """
+    Queue an Orders.csv import (save raw orders + match) and return right away.
+
+    Same input as /api/trades/import: a 'file' upload or JSON csv_text/csv_data,
+    plus default_acc_id, bulk, incremental and auto_match.
+    Poll GET /api/jobs/<job_id> for progress and the result.
+    """
+    try:
+        if 'file' in request.files:
+            # read the upload now, the request stream is gone once we return
+            csv_text = request.files['file'].read().decode("utf-8")
+            data = request.form.to_dict()
+        elif request.is_json:
+            data = request.get_json() or {}
+            csv_text = data.get('csv_text') or data.get('csv_data')
+        else:
+            data, csv_text = {}, None
+
+        if not csv_text:
+            return jsonify({'error': 'No CSV data provided'}), 400
+
+        job = submit_job(
+            current_app._get_current_object(), 'import', run_import_job,
+            csv_text=csv_text,
+            account=data.get('default_acc_id', 'default'),
+            bulk=_option(data, 'bulk', False),
+            incremental=_option(data, 'incremental', False),
+            auto_match=_option(data, 'auto_match', True),
+        )
+        return jsonify({
+            'job_id': job['id'],
+            'status': job['status'],
+            'status_url': url_for('jobs.get_job_status', job_id=job['id'])
+        }), 202
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to queue import: {str(e)}'}), 500
+
+@jobs_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """status (queued/running/succeeded/failed), progress counters and, once finished, the result"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    return jsonify(job), 200
+
+@jobs_bp.route('/api/jobs', methods=['GET'])
+def get_jobs():
+    """recent jobs, newest first"""
+    limit = request.args.get('limit', 50, type=int)
+    jobs = list_jobs(limit)
+    return jsonify({'count': len(jobs), 'jobs': jobs}), 200
@@ -0,0 +1,18 @@
+from flask import Blueprint, request, jsonify
+from app.utils.instrumentation import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Import pipeline counters and per-stage timers (count, total/avg/max/last seconds)
+    since the process started or the last reset.
+
+    Query params:
+    - reset: true to clear everything after reading
+    """
+    snapshot = metrics.snapshot()
+    if request.args.get('reset', '').lower() in ['1', 'true', 'yes']:
+        metrics.reset()
+    return jsonify(snapshot), 200
@@ -1,7 +1,12 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 import pytz
-from app.db.models import db, Trade
+from sqlalchemy import and_, case, column, func, values
+from app.db.models import db, Trade, trade_columns, trade_rows_to_dicts
+from app.utils.serialization import json_response
+from app.utils.session_calendar import (
+    DEFAULT_SESSION, STORAGE_TIMEZONE, session_bounds, session_day_strings, session_name, session_windows
+)
 
 pnl_bp = Blueprint('pnl', __name__)
 
@@ -28,6 +33,10 @@ def get_trading_day(dt: datetime, market_close_hour: int = 15, timezone: str = '
     
     Returns:
         ISO date string (YYYY-MM-DD) representing the trading day
+
+    This is the default session (products without one in app.utils.session_calendar);
+    the PnL endpoints bucket by each product's session. For a whole column of exit
+    times use app.utils.trading_day (same results, one pass).
     """
     # Convert to PST timezone
     pst = pytz.timezone(timezone)
@@ -61,54 +70,106 @@ def get_trading_day(dt: datetime, market_close_hour: int = 15, timezone: str = '
     
     return trading_date.isoformat()
 
-def get_trading_day_range(trading_day_str: str, market_close_hour: int = 15, timezone: str = 'America/Los_Angeles'):
+def get_trading_day_range(trading_day_str: str, market_close_hour: int = 15,
+                          timezone: str = 'America/Los_Angeles', symbol: str = None):
     """
     Convert a trading day string to a datetime range (start, end) for database queries.
-    
-    Trading day "2026-01-15" includes trades that exit:
-    - Start: 2026-01-14 3:00:01pm PST (after previous day's market close)
-    - End: 2026-01-15 3:00:00pm PST (at current day's market close, inclusive)
-    
-    This means:
-    - Trade at 2026-01-14 3:00:00pm PST → Trading day 2026-01-14 (not included in 2026-01-15)
-    - Trade at 2026-01-14 3:00:01pm PST → Trading day 2026-01-15 (included)
-    - Trade at 2026-01-15 3:00:00pm PST → Trading day 2026-01-15 (included)
-    - Trade at 2026-01-15 3:00:01pm PST → Trading day 2026-01-16 (not included)
-    
-    Args:
-        trading_day_str: ISO date string (YYYY-MM-DD)
-        market_close_hour: Hour when market closes (15 = 3pm)
-        timezone: Timezone string
-    
+
+    Trading day "2026-01-15" includes trades that exit after the previous session's
+    close up to and including its own close. With the defaults that's the original
+    3pm rule (2026-01-14 3:00:00.000001pm to 2026-01-15 3:00:00pm); pass symbol to get
+    that product's session from app.utils.session_calendar instead (holidays, early
+    closes). Bounds are naive wall-clock in `timezone`, like the stored exit times.
+
+    Changed: this used to return the bounds converted to UTC (naive), which didn't
+    match the naive Pacific exit times they were compared with; callers that
+    converted them back from UTC must stop doing so. Trading days of ES / NQ / metals
+    also moved to the CME session (see session_calendar.CALENDAR_VERSION).
+
     Returns:
-        Tuple of (start_datetime, end_datetime) as naive datetime for database queries
+        Tuple of (start_datetime, end_datetime) as naive datetimes, both inclusive
     """
-    pst = pytz.timezone(timezone)
-    
-    # Parse the trading day
     trading_date = datetime.strptime(trading_day_str, '%Y-%m-%d').date()
-    
-    # Trading day starts: previous day at market close + 1 microsecond
-    # This ensures trades at exactly 3:00:00pm belong to previous trading day
-    # Example: Trading day 2026-01-15 starts at 2026-01-14 3:00:00.000001pm PST
-    start_date = trading_date - timedelta(days=1)
-    start_dt = pst.localize(
-        datetime.combine(start_date, datetime.min.time().replace(hour=market_close_hour, minute=0, second=0, microsecond=0))
-    ) + timedelta(microseconds=1)  # Add 1 microsecond to exclude exactly 3:00:00.000000pm
-    
-    # Trading day ends: current day at market close (inclusive)
-    # Example: Trading day 2026-01-15 ends at 2026-01-15 3:00:00pm PST (inclusive)
-    end_dt = pst.localize(
-        datetime.combine(trading_date, datetime.min.time().replace(hour=market_close_hour, minute=0, second=0))
-    )
-    
-    # Convert to UTC then back to naive for database (if your DB stores naive datetimes)
-    utc = pytz.UTC
-    start_utc = start_dt.astimezone(utc)
-    end_utc = end_dt.astimezone(utc)
-    
-    # Return as naive datetime (SQLAlchemy typically works with naive datetimes)
-    return start_utc.replace(tzinfo=None), end_utc.replace(tzinfo=None)
+    if market_close_hour == 15 and timezone == STORAGE_TIMEZONE:
+        return session_bounds(trading_date, trading_date, [symbol])
+
+    # a different fixed cutoff: every calendar day closes at market_close_hour
+    close = datetime.min.time().replace(hour=market_close_hour)
+    start = datetime.combine(trading_date - timedelta(days=1), close) + timedelta(microseconds=1)
+    return start, datetime.combine(trading_date, close)
+
+def trading_day_sql(exit_time_column, market_close_hour: int = 15):
+    """
+    SQL expression equivalent of get_trading_day for naive exit times.
+
+    Naive times are wall-clock in the trading timezone, so the cutoff is just a shift:
+    adding (24 - close hour) hours minus 1 microsecond moves anything after the close
+    (e.g. 3:00:01pm) past midnight into the next date, while exactly 3:00:00pm stays
+    on the same date.
+
+    Only right for the default session (a fixed daily cutoff); products with their own
+    session are bucketed by joining against the session windows (_aggregate_trades_by_day).
+    """
+    shift = timedelta(hours=24 - market_close_hour) - timedelta(microseconds=1)
+    return db.cast(exit_time_column + shift, db.Date)
+
+def _day_bound(value):
+    """YYYY-MM-DD -> date (a whole trading day), full ISO datetime -> None"""
+    return datetime.strptime(value, '%Y-%m-%d').date() if value and 'T' not in value else None
+
+def _filter_trades_by_exit(query, start_date, end_date, symbol):
+    """
+    apply the start_date / end_date / symbol filters shared by the PnL endpoints
+
+    YYYY-MM-DD bounds are trading days and become the exit time window of those days'
+    sessions (see session_calendar). Without a symbol that window covers every product's
+    sessions, so bucket the results with _trades_in_days to drop neighbouring days.
+    """
+    # apply filters
+    if symbol:
+        query = query.filter(Trade.symbol == symbol)
+
+    # trading days -> session window, full datetimes are used as-is
+    start_range, end_range = session_bounds(_day_bound(start_date), _day_bound(end_date),
+                                            [symbol] if symbol else None)
+    if start_date:
+        query = query.filter(Trade.exit_time >= (start_range or datetime.fromisoformat(start_date)))
+    if end_date:
+        query = query.filter(Trade.exit_time <= (end_range or datetime.fromisoformat(end_date)))
+    return query
+
+def _in_day_range(start_date, end_date):
+    """predicate on ISO trading days for YYYY-MM-DD bounds (datetime bounds are exact already)"""
+    start_day, end_day = _day_bound(start_date), _day_bound(end_date)
+    first = start_day.isoformat() if start_day else '0000-00-00'
+    last = end_day.isoformat() if end_day else '9999-99-99'
+    return lambda day: first <= day <= last
+
+def _trades_in_days(trades, start_date=None, end_date=None):
+    """
+    (trade, trading day) pairs for trade dicts, each on its product's session
+    calendar, keeping only the trading days inside YYYY-MM-DD bounds
+    """
+    trade_dates = session_day_strings([trade['exit_time'] for trade in trades],
+                                      [trade['symbol'] for trade in trades])
+    in_range = _in_day_range(start_date, end_date)
+    return [(trade, day) for trade, day in zip(trades, trade_dates) if in_range(day)]
+
+def _rollup_days(start_date, end_date, symbol):
+    """
+    Day totals from the daily_pnl rollup, or None when the bounds are full
+    datetimes (the rollup only knows whole trading days).
+    """
+    from app.services.daily_rollup import read_daily_rollup
+
+    if (start_date and 'T' in start_date) or (end_date and 'T' in end_date):
+        return None
+    start_day = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    end_day = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    return read_daily_rollup(start_day, end_day, symbol)
+
+def _wants_trades(default: str = 'true') -> bool:
+    return request.args.get('include_trades', default).lower() in ['1', 'true', 'yes']
 
 @pnl_bp.route('/api/pnl/daily', methods = ['GET'])
 def get_daily_pnl():
@@ -121,42 +182,29 @@ def get_daily_pnl():
         end_date = request.args.get('end_date')
         # symbol
         symbol = request.args.get('symbol')
+        # include_trades=false skips the per-trade payload
+        include_trades = _wants_trades()
+
+        # without trades the day totals come straight from the daily_pnl rollup
+        if not include_trades:
+            rollup = _rollup_days(start_date, end_date, symbol)
+            if rollup is not None:
+                return jsonify({
+                    'period': 'daily',
+                    'total_pnl': round(sum(day['pnl'] for day in rollup), 2),
+                    'total_trades': sum(day['trade_count'] for day in rollup),
+                    'data': rollup
+                }), 200
 
-        # get all trades
-        query = Trade.query
-
-        # apply filters
-        if symbol:
-            query = query.filter_by(symbol=symbol)
-        if start_date:
-            # Convert trading day to datetime range
-            # If start_date is just a date (YYYY-MM-DD), treat it as a trading day
-            if 'T' not in start_date:
-                # It's a date string, get the trading day range
-                start_range, _ = get_trading_day_range(start_date, market_close_hour=15, timezone='America/Los_Angeles')
-                query = query.filter(Trade.exit_time >= start_range)
-            else:
-                # It's a full datetime, use as-is
-                start = datetime.fromisoformat(start_date)
-                query = query.filter(Trade.exit_time >= start)
-        if end_date:
-            # Convert trading day to datetime range
-            if 'T' not in end_date:
-                # It's a date string, get the trading day range
-                _, end_range = get_trading_day_range(end_date, market_close_hour=15, timezone='America/Los_Angeles')
-                query = query.filter(Trade.exit_time <= end_range)
-            else:
-                # It's a full datetime, use as-is
-                end = datetime.fromisoformat(end_date)
-                query = query.filter(Trade.exit_time <= end)
+        # get all trades (as to_dict()-shaped dicts straight from row tuples)
+        query = _filter_trades_by_exit(db.select(*trade_columns()), start_date, end_date, symbol)
         
-        trades = query.all()
+        trades = trade_rows_to_dicts(db.session.execute(query))
 
         daily_pnl = {}
 
-        for trade in trades:
-            # Use trading day (3pm PST cutoff) instead of calendar day
-            trade_date = get_trading_day(trade.exit_time, market_close_hour=15, timezone='America/Los_Angeles')
+        # Use trading day (each product's session calendar) instead of calendar day
+        for trade, trade_date in _trades_in_days(trades, start_date, end_date):
 
             # Initialize date entry if not exists
             if trade_date not in daily_pnl:
@@ -165,14 +213,16 @@ def get_daily_pnl():
                     'pnl': 0.0,
                     'trade_count': 0,
                     'winning_trades': 0,
-                    'losing_trades': 0,
-                    'trades': []  # Include trades array for frontend
+                    'losing_trades': 0
                 }
+                if include_trades:
+                    daily_pnl[trade_date]['trades'] = []  # Include trades array for frontend
 
-            trade_pnl = float(trade.pnl)
+            trade_pnl = trade['pnl']
             daily_pnl[trade_date]['pnl'] += trade_pnl
             daily_pnl[trade_date]['trade_count'] += 1
-            daily_pnl[trade_date]['trades'].append(trade.to_dict())  # Add trade to array
+            if include_trades:
+                daily_pnl[trade_date]['trades'].append(trade)  # Add trade to array
 
             # track wins and losses
             if trade_pnl > 0 :
@@ -186,7 +236,7 @@ def get_daily_pnl():
         total_pnl = sum(day['pnl'] for day in daily_data)
         total_trades = sum(day['trade_count'] for day in daily_data)
 
-        return jsonify({
+        return json_response({
             'period': 'daily',
             'total_pnl': round(total_pnl, 2),
             'total_trades': total_trades,
@@ -207,29 +257,37 @@ def get_calendar_trades():
     
     year = request.args.get('year', type=int)
     month = request.args.get('month', type=int)
+
+    # include_trades=false: day totals from the daily_pnl rollup, no trade payload
+    if not _wants_trades():
+        from app.services.daily_rollup import read_daily_rollup
+        start_day = end_day = None
+        if year and month:
+            start_day = datetime(year, month, 1).date()
+            end_day = (datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)).date() - timedelta(days=1)
+        return jsonify({
+            'data': read_daily_rollup(start_day, end_day)
+        })
     
-    # Query trades (not orders)
-    query = Trade.query
+    # Query trades (not orders), as row tuples
+    query = db.select(*trade_columns())
+    start_date = end_date = None
     
     if year and month:
-        start_date = datetime(year, month, 1)
+        start_date = datetime(year, month, 1).date().isoformat()
         if month == 12:
-            end_date = datetime(year + 1, 1, 1)
+            end_date = (datetime(year + 1, 1, 1) - timedelta(days=1)).date().isoformat()
         else:
-            end_date = datetime(year, month + 1, 1)
+            end_date = (datetime(year, month + 1, 1) - timedelta(days=1)).date().isoformat()
         
-        # Filter by exit_time (trades are closed on exit date)
-        query = query.filter(
-            Trade.exit_time >= start_date,
-            Trade.exit_time < end_date
-        )
+        # Filter by exit_time (trades are closed on exit date): the sessions of the month's trading days
+        query = _filter_trades_by_exit(query, start_date, end_date, None)
     
-    trades = query.order_by(Trade.exit_time).all()
+    trades = trade_rows_to_dicts(db.session.execute(query.order_by(Trade.exit_time)))
     
-    # Group by trading day (3pm PST cutoff)
+    # Group by trading day (each product's session calendar)
     daily_data = {}
-    for trade in trades:
-        date_str = get_trading_day(trade.exit_time, market_close_hour=15, timezone='America/Los_Angeles')
+    for trade, date_str in _trades_in_days(trades, start_date, end_date):
         
         if date_str not in daily_data:
             daily_data[date_str] = {
@@ -238,9 +296,114 @@ def get_calendar_trades():
                 'trades': []
             }
         
-        daily_data[date_str]['pnl'] += float(trade.pnl)
-        daily_data[date_str]['trades'].append(trade.to_dict())
+        daily_data[date_str]['pnl'] += trade['pnl']
+        daily_data[date_str]['trades'].append(trade)
     
-    return jsonify({
+    return json_response({
         'data': list(daily_data.values())
-    })
\ No newline at end of file
+    })
+
+
+def _aggregate_trades_by_day(filtered, start_date=None, end_date=None):
+    """
+    per trading day pnl, count, wins, losses over the filtered trades, as one GROUP BY
+
+    The trading day can't be computed from exit_time in SQL (holidays, half days and
+    per-product closes), so the session calendar's precomputed windows for the range are
+    sent along as a VALUES list and each trade is range-joined to the window it exits in
+    (previous close < exit_time <= close) for its product's session.
+    """
+    start_day, end_day = _day_bound(start_date), _day_bound(end_date)
+    symbols = [row[0] for row in filtered.with_entities(Trade.symbol).distinct().all()]
+    if not symbols:
+        return []
+    sessions = {symbol: session_name(symbol) for symbol in symbols}
+
+    # open-ended or datetime bounds: the windows the filtered trades' exit times can fall in
+    # (a trading day is never before the exit's calendar date, and at most a long weekend after it)
+    if start_day is None or end_day is None:
+        first, last = filtered.with_entities(func.min(Trade.exit_time), func.max(Trade.exit_time)).one()
+        start_day = start_day or first.date()
+        end_day = end_day or last.date() + timedelta(days=7)
+
+    windows = values(
+        column('session', db.String), column('opens', db.DateTime),
+        column('closes', db.DateTime), column('trading_day', db.Date),
+        name='session_windows'
+    ).data(session_windows(start_day, end_day, sessions.values()))
+
+    trade_session = case(sessions, value=Trade.symbol, else_=DEFAULT_SESSION)
+    rows = (
+        filtered.with_entities(
+            windows.c.trading_day,
+            func.coalesce(func.sum(Trade.pnl), 0),
+            func.count(),
+            func.sum(case((Trade.pnl > 0, 1), else_=0)),
+            func.sum(case((Trade.pnl < 0, 1), else_=0)),
+        )
+        .join(windows, and_(windows.c.session == trade_session,
+                            Trade.exit_time > windows.c.opens,
+                            Trade.exit_time <= windows.c.closes))
+        .group_by(windows.c.trading_day)
+        .order_by(windows.c.trading_day)
+        .all()
+    )
+
+    return [
+        {
+            'date': trading_day if isinstance(trading_day, str) else trading_day.isoformat(),
+            'pnl': round(float(pnl), 2),
+            'trade_count': int(trade_count),
+            'winning_trades': int(winning_trades or 0),
+            'losing_trades': int(losing_trades or 0)
+        }
+        for trading_day, pnl, trade_count, winning_trades, losing_trades in rows
+    ]
+
+@pnl_bp.route('/api/pnl/daily/summary', methods=['GET'])
+def get_daily_pnl_summary():
+    """
+    Daily PnL totals without the trade payload.
+
+    Same filters and trading-day buckets as /api/pnl/daily. Trades are only included
+    with include_trades=true.
+
+    Day totals are read from the daily_pnl rollup when the range is whole trading
+    days; source=trades (or datetime bounds) groups the filtered trades by trading day
+    in the database, joined against the session calendar's windows.
+    """
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        symbol = request.args.get('symbol')
+        include_trades = _wants_trades(default='false')
+
+        filtered = _filter_trades_by_exit(db.session.query(Trade), start_date, end_date, symbol)
+
+        daily_data = None
+        if request.args.get('source', 'rollup') == 'rollup':
+            daily_data = _rollup_days(start_date, end_date, symbol)
+        if daily_data is None:
+            daily_data = _aggregate_trades_by_day(filtered, start_date, end_date)
+
+        if include_trades:
+            days = {day['date']: day for day in daily_data}
+            for day in daily_data:
+                day['trades'] = []
+            rows = filtered.with_entities(*trade_columns()).order_by(Trade.exit_time).all()
+            for trade, trade_date in _trades_in_days(trade_rows_to_dicts(rows)):
+                if trade_date in days:
+                    days[trade_date]['trades'].append(trade)
+
+        total_pnl = sum(day['pnl'] for day in daily_data)
+        total_trades = sum(day['trade_count'] for day in daily_data)
+
+        return json_response({
+            'period': 'daily',
+            'total_pnl': round(total_pnl, 2),
+            'total_trades': total_trades,
+            'data': daily_data
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': f'Failed to calculate daily PnL: {str(e)}'}), 500
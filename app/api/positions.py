@@ -0,0 +1,22 @@
+from flask import Blueprint, request, jsonify
+from app.services.positions import open_positions
+
+positions_bp = Blueprint('positions', __name__)
+
+@positions_bp.route('/api/positions', methods=['GET'])
+def get_positions():
+    """
+    Open positions (quantity, average entry price) with unrealised pnl against the
+    price feed's marks (PRICE_FEED_FILE, see app/services/price_feed.py).
+    Positions without a mark are listed with unrealized_pnl null.
+    Covers the position-walk matchers (CSV / Tradovate imports), not positions left
+    open by the lot engine (match_orders_to_trades), which keeps no PositionState.
+
+    Query params:
+    - account: only this account
+    - contract: only this contract (e.g. MGCG6)
+    """
+    try:
+        return jsonify(open_positions(request.args.get('account'), request.args.get('contract'))), 200
+    except Exception as e:
+        return jsonify({'error': f'Failed to load positions: {str(e)}'}), 500
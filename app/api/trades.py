@@ -1,13 +1,55 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from datetime import datetime
-from app.db.models import db, Trade
+import base64
+import json
+import os
+import uuid
+from sqlalchemy import or_, and_
+from app.db.models import db, Trade, TRADE_FIELDS, trade_columns, trade_rows_to_dicts
+from app.api.pnl import _filter_trades_by_exit
 from app.services.metrics import detect_trade_type
+from app.services.daily_rollup import apply_trades_to_rollup
+from app.services.jobs import JobIdInUse, finish_job, get_job, track_job
+from app.services.trade_cache import invalidate_trade_cache
+from app.services.trade_export import EXPORT_FORMATS, iter_trade_export
 from app.utils.csv_parser import parse_and_validate_csv
+from app.utils.instrumentation import get_logger, metrics
+from app.utils.serialization import json_response
+
+log = get_logger('api.trades')
 
 # create blueprint
 
 trade_bp = Blueprint('trades', __name__)
 
+# GET /api/trades page size
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def _parse_workers(value, default=None):
+    """
+    workers option -> (pool size capped at the CPU count, None) or (None, error message)
+    for a value that isn't a positive integer
+    """
+    if value is None or value == '':
+        return default, None
+    try:
+        workers = int(value)
+    except (TypeError, ValueError):
+        return None, 'workers must be an integer'
+    if workers < 1:
+        return None, 'workers must be at least 1'
+    return min(workers, os.cpu_count() or 1), None
+
+def _request_flag(name: str, default: bool = False) -> bool:
+    """read a boolean option from the JSON body or form fields"""
+    if request.is_json:
+        return bool((request.get_json() or {}).get(name, default))
+    if request.form and name in request.form:
+        return request.form.get(name, '').lower() in ['1', 'true', 'yes']
+    return default
+
 @trade_bp.route('/api/trades', methods=['POST'])
 def insert_trade():
     data = request.get_json()
@@ -50,7 +92,9 @@ def insert_trade():
         )
 
         db.session.add(trade)
+        apply_trades_to_rollup([trade])
         db.session.commit()
+        invalidate_trade_cache()
 
         return jsonify({'message': 'Trade inserted successfully', 'trade':trade.to_dict()}), 201
     
@@ -62,30 +106,141 @@ def insert_trade():
 
 # get all trades and filter optionally
 def get_trades():
+    """
+    Trades newest first, one page at a time.
+
+    Query params:
+    - symbol, id, account: exact filters
+    - start_date, end_date: exit time bounds (YYYY-MM-DD = trading day, or full ISO datetime)
+    - fields: comma separated to_dict keys to return, e.g. fields=id,symbol,exit_time,pnl
+    - limit: page size (max 5000; 500 when only cursor is given)
+    - cursor: next_cursor from the previous page
+
+    Without limit or cursor every matching trade comes back in one response, as
+    before paging existed (has_more false, next_cursor null).
+    """
     try:
-        symbol = request.args.get('symbol')
-        id = request.args.get('id')
+        limit = None
+        if 'limit' in request.args or 'cursor' in request.args:
+            try:
+                limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            except ValueError:
+                return jsonify({'error': 'limit must be an integer'}), 400
+            if limit < 1:
+                return jsonify({'error': 'limit must be at least 1'}), 400
 
-        # query
-        query = Trade.query
+        fields = None
+        if request.args.get('fields'):
+            fields = _requested_fields()
+            unknown = [f for f in fields if f not in TRADE_FIELDS]
+            if unknown:
+                return jsonify({'error': f"Unknown fields: {', '.join(unknown)}. Must be in {list(TRADE_FIELDS)}"}), 400
 
-        # Filters if provided in url
-        if symbol:
-            query = query.filter_by(symbol = symbol)
-        if id:
-            query = query.filter_by(id = id)
-        
-        trades = query.all()
+        # query, with the filters if provided in url
+        # plain row tuples, no Trade objects: the requested columns, then exit_time + id
+        # for the cursor (every to_dict key is a column of the same name)
+        try:
+            query = _filter_trades(db.select(*trade_columns(fields), Trade.exit_time, Trade.id))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid date filter: {str(e)}'}), 400
 
-        # convert trades object into dictionary
-        trades_list = [trade.to_dict() for trade in trades]
+        # keyset pagination: rows strictly after the last (exit_time, id) of the previous page
+        if request.args.get('cursor'):
+            try:
+                cursor_time, cursor_id = _decode_cursor(request.args['cursor'])
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(or_(
+                Trade.exit_time < cursor_time,
+                and_(Trade.exit_time == cursor_time, Trade.id < cursor_id)
+            ))
 
-        return jsonify({
+        # one extra row tells us whether there's another page
+        query = query.order_by(Trade.exit_time.desc(), Trade.id.desc())
+        if limit is not None:
+            query = query.limit(limit + 1)
+        rows = db.session.execute(query).all()
+        has_more = limit is not None and len(rows) > limit
+        rows = rows[:limit]
+
+        # same dicts as to_dict(fields)
+        trades_list = trade_rows_to_dicts(rows, fields)
+
+        return json_response({
             'count': len(trades_list),
-            'trades': trades_list
+            'trades': trades_list,
+            'has_more': has_more,
+            'next_cursor': _encode_cursor(rows[-1][-2], rows[-1][-1]) if has_more else None
         }), 200
     except Exception as e:
-        return jsonify({'Error': f'Failed to retrieve trades: {str(e)}'}), 500
+        return jsonify({'error': f'Failed to retrieve trades: {str(e)}'}), 500
+
+@trade_bp.route('/api/trades/export', methods=['GET'])
+def export_trades():
+    """
+    Stream every matching trade, oldest first, as NDJSON (one JSON object per line) or CSV.
+
+    Rows are read from a server-side cursor in batches and written out as they come,
+    so memory doesn't grow with the journal and the download starts right away.
+
+    Query params:
+    - format: ndjson (default) or csv
+    - symbol, id, account, start_date, end_date: same filters as GET /api/trades
+    - fields: comma separated to_dict keys (default: all of them except fills)
+    - fills: true to include each trade's fills (CSV puts them in one JSON cell)
+    """
+    fmt = request.args.get('format', 'ndjson').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"Invalid format: {fmt}. Must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    fields = _requested_fields() or [f for f in TRADE_FIELDS if f != 'fills']
+    unknown = [f for f in fields if f not in TRADE_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}. Must be in {list(TRADE_FIELDS)}"}), 400
+    if request.args.get('fills', 'false').lower() in ['1', 'true', 'yes'] and 'fills' not in fields:
+        fields.append('fills')
+
+    try:
+        statement = _filter_trades(db.select(*trade_columns(fields))).order_by(Trade.exit_time, Trade.id)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date filter: {str(e)}'}), 400
+
+    filename = f"trades-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(
+        stream_with_context(iter_trade_export(statement, fields, fmt)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'X-Accel-Buffering': 'no',  # don't let a proxy hold the stream back
+        }
+    )
+
+def _requested_fields():
+    """the fields= query param as a list (None if not given)"""
+    if not request.args.get('fields'):
+        return None
+    return [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+
+def _filter_trades(query):
+    """id / account / symbol / start_date / end_date query params, on a Query or a select()"""
+    if request.args.get('id'):
+        query = query.filter(Trade.id == request.args['id'])
+    if request.args.get('account'):
+        query = query.filter(Trade.acc_id == request.args['account'])
+    return _filter_trades_by_exit(query, request.args.get('start_date'), request.args.get('end_date'),
+                                  request.args.get('symbol'))
+
+def _encode_cursor(exit_time: datetime, trade_id: str) -> str:
+    """opaque page cursor: the (exit_time, id) of the last trade returned"""
+    raw = json.dumps([exit_time.isoformat(), trade_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor: str):
+    try:
+        exit_time, trade_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(exit_time), str(trade_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 @trade_bp.route('/api/trades/<trade_id>', methods=['PATCH'])
 def update_trade(trade_id):
@@ -116,6 +271,7 @@ def update_trade(trade_id):
             trade.notes = data['notes']
             
         db.session.commit()
+        invalidate_trade_cache()
 
         return jsonify({
             'message': 'Trade udpated successfully',
@@ -133,59 +289,97 @@ def import_trades_csv():
     1. Save all CSV rows to orders table (raw data)
     2. Optionally trigger matching (can be done separately)
     """
-    import sys
-    print("\n" + "="*80, file=sys.stderr)
-    print("🔍 DEBUG: CSV Import Started", file=sys.stderr)
-    print("="*80, file=sys.stderr)
+    with metrics.timer('import.request'):
+        return _import_trades_csv()
+
+def _import_trades_csv():
+    log.debug("CSV import started (content type=%s, file=%s, json=%s)",
+              request.content_type, 'file' in request.files, request.is_json)
     
     try:
         # Get CSV data
         csv_text = None
-        print(f"📥 DEBUG: Request method = {request.method}", file=sys.stderr)
-        print(f"📥 DEBUG: Request content type = {request.content_type}", file=sys.stderr)
-        print(f"📥 DEBUG: Has files = {'file' in request.files}", file=sys.stderr)
-        print(f"📥 DEBUG: Is JSON = {request.is_json}", file=sys.stderr)
         
+        # stream=true (file uploads only) parses + saves the upload in chunks instead of decoding it whole
+        # (werkzeug has already spooled the whole upload to a temp file before we get here)
+        stream = 'file' in request.files and _request_flag('stream')
+
         if 'file' in request.files:
             file = request.files['file']
-            csv_text = file.read().decode("utf-8")
-            print(f"📥 DEBUG: Received CSV file, length = {len(csv_text)} chars", file=sys.stderr)
+            if not stream:
+                csv_text = file.read().decode("utf-8")
         elif request.is_json:
             data = request.get_json()
             csv_text = data.get('csv_text') or data.get('csv_data')
-            print(f"📥 DEBUG: Received JSON, csv_text length = {len(csv_text) if csv_text else 0} chars", file=sys.stderr)
-            print(f"📥 DEBUG: JSON keys = {list(data.keys()) if data else 'None'}", file=sys.stderr)
         
-        if not csv_text:
-            print("❌ DEBUG: No CSV data found!", file=sys.stderr)
+        if not csv_text and not stream:
+            log.info("CSV import rejected: no CSV data in request")
             return jsonify({'error': 'No CSV data provided', 'debug': 'No csv_text or csv_data in request'}), 400
         
-        print(f"✅ DEBUG: CSV text received, first 200 chars: {csv_text[:200]}", file=sys.stderr)
-        
         # Get account
         account = "default"
         if request.is_json:
             account = request.get_json().get('default_acc_id', account)
         elif request.form:
             account = request.form.get('default_acc_id', account)
-        
-        print(f"📋 DEBUG: Using account = {account}", file=sys.stderr)
-        
+
+
+        # bulk=true switches to set-based dedupe + multi-row inserts (large exports)
+        bulk = _request_flag('bulk')
+        # parallel=true is bulk with the row parsing spread over a process pool (optional workers=N)
+        parallel = _request_flag('parallel')
+
         # Step 1: Save raw orders to database
-        print(f"\n📦 DEBUG: Step 1 - Saving raw orders to database...", file=sys.stderr)
-        from app.utils.csv_parser import save_raw_orders_to_db
-        saved_orders, errors = save_raw_orders_to_db(csv_text, account)
+        log.info("CSV import: %s chars for account %s (bulk=%s, parallel=%s, stream=%s)",
+                 len(csv_text) if csv_text else 'streamed', account, bulk, parallel, stream)
+        ingest_stats = None
+        import_id = None
+        if stream:
+            from app.utils.csv_parser import stream_save_raw_orders_to_db
+            # client can pick the id up front so it can poll progress while the upload runs
+            import_id = request.form.get('import_id') or uuid.uuid4().hex
+            chunk_size = request.form.get('chunk_size', 5000, type=int)
+            # progress lives in the job store, so finished imports get pruned like jobs
+            try:
+                progress = track_job('import.stream', import_id)
+            except JobIdInUse:
+                return jsonify({'error': f'Import {import_id} is already running'}), 409
+            try:
+                orders_saved, errors, ingest_stats = stream_save_raw_orders_to_db(
+                    request.files['file'].stream, account, chunk_size=chunk_size, progress=progress
+                )
+            except Exception as e:
+                finish_job(import_id, error=f"{type(e).__name__}: {e}")
+                raise
+            finish_job(import_id)
+        elif parallel:
+            from app.utils.csv_parser import parallel_save_raw_orders_to_db
+            workers, error = _parse_workers(
+                (request.get_json() or {}).get('workers') if request.is_json else request.form.get('workers')
+            )
+            if error:
+                return jsonify({'error': error}), 400
+            saved_orders, errors, ingest_stats = parallel_save_raw_orders_to_db(csv_text, account, workers=workers)
+            orders_saved = len(saved_orders)
+        elif bulk:
+            from app.utils.csv_parser import bulk_save_raw_orders_to_db
+            saved_orders, errors, ingest_stats = bulk_save_raw_orders_to_db(csv_text, account)
+            orders_saved = len(saved_orders)
+        else:
+            from app.utils.csv_parser import save_raw_orders_to_db
+            saved_orders, errors = save_raw_orders_to_db(csv_text, account)
+            orders_saved = len(saved_orders)
         
-        print(f"📦 DEBUG: Saved {len(saved_orders)} orders", file=sys.stderr)
-        print(f"📦 DEBUG: Encountered {len(errors)} errors/warnings", file=sys.stderr)
+        log.info("Saved %d orders, %d errors/warnings%s", orders_saved, len(errors),
+                 f", stats={ingest_stats}" if ingest_stats is not None else "")
         if errors:
-            print(f"📦 DEBUG: First 5 errors: {errors[:5]}", file=sys.stderr)
+            log.debug("First 5 errors: %s", errors[:5])
         
         # If no new orders were saved, this can still be a valid idempotent import
         # (e.g. user re-imported the same CSV). In that case, continue so matching
         # can still run on any previously-unmatched filled orders.
-        if not saved_orders and not errors:
-            print("❌ DEBUG: No orders saved and no errors - CSV may be empty", file=sys.stderr)
+        if not orders_saved and not errors:
+            log.info("No orders saved and no errors - CSV may be empty")
             return jsonify({
                 'error': 'No orders were saved',
                 'errors': ['CSV parsed but produced no rows'],
@@ -194,7 +388,6 @@ def import_trades_csv():
         
         # Step 2: Match filled orders into trades (position-based matching)
         auto_match = request.get_json().get('auto_match', True) if request.is_json else True
-        print(f"\n🔄 DEBUG: Step 2 - Matching orders to trades (auto_match={auto_match})...", file=sys.stderr)
         
         trades_created = 0
         created_trades = []
@@ -202,31 +395,28 @@ def import_trades_csv():
         match_result = {}
         
         if auto_match:
-            from app.utils.csv_parser import process_filled_orders_to_trades
-            match_result = process_filled_orders_to_trades(account=account)
+            # incremental=true only walks fills newer than each (account, contract) watermark
+            if _request_flag('incremental'):
+                from app.utils.csv_parser import process_new_fills_to_trades
+                match_result = process_new_fills_to_trades(account=account)
+            else:
+                from app.utils.csv_parser import process_filled_orders_to_trades
+                match_result = process_filled_orders_to_trades(account=account)
             trades_created = match_result.get('trades_created', 0)
             filled_count = match_result.get('filled_orders_count', 0)
             errors.extend(match_result.get('errors', []))
             
-            print(f"🔄 DEBUG: Matching result:", file=sys.stderr)
-            print(f"  - Filled orders found: {filled_count}", file=sys.stderr)
-            print(f"  - Trades created: {trades_created}", file=sys.stderr)
-            print(f"  - Errors: {len(match_result.get('errors', []))}", file=sys.stderr)
-            
             # Get the created trades from database
             if trades_created > 0:
                 # Query the most recently created trades (limit to 50 for response)
                 created_trades = Trade.query.order_by(Trade.exit_time.desc()).limit(50).all()
-                print(f"🔄 DEBUG: Retrieved {len(created_trades)} trades from database", file=sys.stderr)
-            else:
-                print(f"⚠️  DEBUG: No trades created! Check matching logic.", file=sys.stderr)
-                if match_result.get('errors'):
-                    print(f"⚠️  DEBUG: Matching errors: {match_result.get('errors')[:5]}", file=sys.stderr)
+            elif match_result.get('errors'):
+                log.info("No trades created, matching errors: %s", match_result.get('errors')[:5])
         
         # Return response
         response_data = {
-            'message': f'Imported {len(saved_orders)} new orders, created {trades_created} trades',
-            'orders_saved': len(saved_orders),
+            'message': f'Imported {orders_saved} new orders, created {trades_created} trades',
+            'orders_saved': orders_saved,
             'trades_created': trades_created,
             'trades': [t.to_dict() for t in created_trades],
             'errors': errors[:20],  # Limit errors in response
@@ -236,28 +426,27 @@ def import_trades_csv():
                 'auto_match_enabled': auto_match
             }
         }
+        if ingest_stats is not None:
+            response_data['ingest_stats'] = ingest_stats
+        if import_id is not None:
+            response_data['import_id'] = import_id
         
         # If no trades created but orders were saved, add helpful message
-        if trades_created == 0 and len(saved_orders) > 0:
+        if trades_created == 0 and orders_saved > 0:
             response_data['warning'] = (
                 'Orders were saved but no trades were created. '
                 'This might mean there are no filled orders, or matching failed. '
                 'Check the errors array for details.'
             )
         
-        print(f"\n✅ DEBUG: Returning response:", file=sys.stderr)
-        print(f"  - orders_saved: {response_data['orders_saved']}", file=sys.stderr)
-        print(f"  - trades_created: {response_data['trades_created']}", file=sys.stderr)
-        print(f"  - trades in response: {len(response_data['trades'])}", file=sys.stderr)
-        print(f"  - errors: {len(response_data['errors'])}", file=sys.stderr)
-        if 'warning' in response_data:
-            print(f"  - WARNING: {response_data['warning']}", file=sys.stderr)
-        print("="*80 + "\n", file=sys.stderr)
+        log.info("CSV import done: %d orders saved, %d trades created, %d errors",
+                 orders_saved, trades_created, len(errors))
         
         return jsonify(response_data), 201
         
     except Exception as e:
         db.session.rollback()
+        log.exception("CSV import failed")
         return jsonify({
             'error': f'Failed to import: {str(e)}',
             'orders_saved': 0,
@@ -272,12 +461,31 @@ def match_orders():
     - Re-running matching after fixing issues
     - Matching new orders after import
     - Testing matching logic
+
+    JSON options:
+    - incremental: only new fills since the last run (process_new_fills_to_trades)
+    - engine: "lots" runs the lot-relief matcher (match_orders_to_trades) with
+      relief ("fifo" / "lifo" / "average") and workers (process pool size)
     """
     try:
-        account = request.get_json().get('account') if request.is_json else None
+        data = (request.get_json() or {}) if request.is_json else {}
+        account = data.get('account')
         
-        from app.utils.csv_parser import process_filled_orders_to_trades
-        match_result = process_filled_orders_to_trades(account=account)
+        if data.get('engine') == 'lots':
+            from app.services.order_matching import RELIEF_METHODS, match_orders_to_trades
+            relief = data.get('relief', 'fifo')
+            if relief not in RELIEF_METHODS:
+                return jsonify({'error': f"Invalid relief: {relief}. Must be one of {', '.join(RELIEF_METHODS)}"}), 400
+            workers, error = _parse_workers(data.get('workers'), default=1)
+            if error:
+                return jsonify({'error': error}), 400
+            _, match_result = match_orders_to_trades(account=account, relief=relief, workers=workers)
+        elif _request_flag('incremental'):
+            from app.utils.csv_parser import process_new_fills_to_trades
+            match_result = process_new_fills_to_trades(account=account)
+        else:
+            from app.utils.csv_parser import process_filled_orders_to_trades
+            match_result = process_filled_orders_to_trades(account=account)
         
         # Get created trades count
         trades_created = match_result.get('trades_created', 0)
@@ -286,9 +494,22 @@ def match_orders():
             'message': f'Created {trades_created} trades',
             'trades_created': trades_created,
             'filled_orders_count': match_result.get('filled_orders_count', 0),
+            'unmatched_orders': match_result.get('unmatched_orders'),
             'errors': match_result.get('errors', [])
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@trade_bp.route('/api/trades/import/progress/<import_id>', methods=['GET'])
+def get_import_progress(import_id):
+    """Counters for a streaming import (stream=true), readable while it is still running"""
+    job = get_job(import_id)
+    if job is None or job['kind'] != 'import.stream':
+        return jsonify({'error': f'Unknown import {import_id}'}), 404
+    progress = job['progress']
+    if job['status'] == 'failed':
+        progress.update({'status': 'failed', 'error': job['error']})
+    return jsonify({'import_id': import_id, **progress}), 200
@@ -0,0 +1,129 @@
+import os
+from typing import Any, Dict, Optional
+
+# Database URI + engine (connection pool) profiles.
+#
+# Settings come from the environment, with the project's .env file (see .env.example)
+# loaded first (real env vars win):
+#
+#   DATABASE_URL            default postgresql://desmondjung@localhost/trading_journal
+#   DB_PROFILE              dev (default), prod-gunicorn or batch-import
+#   DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+#   DB_STATEMENT_TIMEOUT_MS override the profile's values
+#
+# Pool sizing: every process gets its own pool, so the connections the app can open
+# are processes x (pool_size + max_overflow). For gunicorn that is
+# workers x (pool_size + max_overflow), which has to stay under Postgres max_connections.
+# The web pool also serves the background import jobs (app/services/jobs.py).
+
+DEFAULT_DATABASE_URL = 'postgresql://desmondjung@localhost/trading_journal'
+DEFAULT_PROFILE = 'dev'
+
+ENGINE_PROFILES: Dict[str, Dict[str, Any]] = {
+    # flask dev server, one process with a thread per request
+    'dev': {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'statement_timeout_ms': 60_000,
+    },
+    # gunicorn gthread workers (e.g. 4 workers x 8 threads): a pool per worker, sized
+    # to its threads plus the import job threads, and fail fast instead of piling up
+    # requests behind a pool that's exhausted
+    'prod-gunicorn': {
+        'pool_size': 10,
+        'max_overflow': 5,
+        'pool_timeout': 5,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,  # idle connections past the busy set age out via recycle
+        'statement_timeout_ms': 30_000,
+        'idle_in_transaction_timeout_ms': 60_000,
+    },
+    # scripts / one-off bulk imports (DB_PROFILE=batch-import python wipe_and_reimport.py):
+    # a couple of long-lived connections, no statement timeout, and server-side cursors
+    # so large SELECTs stream instead of loading every row into memory on the client
+    'batch-import': {
+        'pool_size': 2,
+        'max_overflow': 0,
+        'pool_timeout': 30,
+        'pool_recycle': 3600,
+        'pool_pre_ping': True,
+        'statement_timeout_ms': 0,
+        'stream_results': True,
+    },
+}
+
+# env var -> (option, type)
+_ENV_OVERRIDES = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', float),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_STATEMENT_TIMEOUT_MS': ('statement_timeout_ms', int),
+}
+
+_POOL_OPTIONS = ['pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping', 'pool_use_lifo']
+
+
+def load_env(path: Optional[str] = None) -> None:
+    """load .env (if python-dotenv is installed and the file exists); existing env vars are kept"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(path, override=False)
+
+
+def database_uri() -> str:
+    return os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+
+def profile_name() -> str:
+    return os.environ.get('DB_PROFILE', DEFAULT_PROFILE)
+
+
+def engine_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    """the named profile (default DB_PROFILE) with the DB_* env overrides applied"""
+    name = name or profile_name()
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {name!r}, must be one of {', '.join(ENGINE_PROFILES)}")
+    profile = dict(ENGINE_PROFILES[name])
+    for env_var, (option, cast) in _ENV_OVERRIDES.items():
+        if os.environ.get(env_var):
+            profile[option] = cast(os.environ[env_var])
+    return profile
+
+
+def engine_options(name: Optional[str] = None, uri: Optional[str] = None) -> Dict[str, Any]:
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for a profile.
+
+    Postgres session settings (search_path, statement_timeout, ...) are passed as
+    libpq startup options so they apply to every pooled connection. Pool options
+    are left out for SQLite, which doesn't use a QueuePool.
+    """
+    name = name or profile_name()
+    profile = engine_profile(name)
+    uri = uri or database_uri()
+
+    options: Dict[str, Any] = {}
+    if not uri.startswith('sqlite'):
+        options.update({k: profile[k] for k in _POOL_OPTIONS if k in profile})
+
+    if uri.startswith('postgresql'):
+        pg_options = ['-csearch_path=trade']
+        if profile.get('statement_timeout_ms') is not None:
+            pg_options.append(f"-cstatement_timeout={profile['statement_timeout_ms']}")
+        if profile.get('idle_in_transaction_timeout_ms') is not None:
+            pg_options.append(f"-cidle_in_transaction_session_timeout={profile['idle_in_transaction_timeout_ms']}")
+        options['connect_args'] = {
+            'options': ' '.join(pg_options),
+            'application_name': f'trading_journal:{name}',
+        }
+
+    if profile.get('stream_results'):
+        options['execution_options'] = {'stream_results': True}
+    return options
@@ -6,7 +6,13 @@ db = SQLAlchemy()
 
 class Trade(db.Model):
     __tablename__ = 'trades'
-    __table_args__ = {'schema': 'trade'}
+    __table_args__ = (
+        # date-range reads (PnL, calendar) and symbol + date-range reads
+        # (exit_time, id) also backs keyset pagination on GET /api/trades
+        db.Index('ix_trades_exit_time_id', 'exit_time', 'id'),
+        db.Index('ix_trades_symbol_exit_time', 'symbol', 'exit_time'),
+        {'schema': 'trade'}
+    )
 
     id = db.Column(db.String(50), primary_key = True)
     acc_id = db.Column(db.String(20), nullable = False)
@@ -14,8 +20,9 @@ class Trade(db.Model):
     direction = db.Column(db.String(10), nullable = False)
     entry_time = db.Column(db.DateTime, nullable = False)
     exit_time = db.Column(db.DateTime, nullable = False)
-    entry_price = db.Column(db.Numeric(10,2), nullable = False)
-    exit_price = db.Column(db.Numeric(10,2), nullable = False)
+    # prices keep 6 places: HG / SI ticks (0.0005 / 0.005) don't fit in cents
+    entry_price = db.Column(db.Numeric(12,6), nullable = False)
+    exit_price = db.Column(db.Numeric(12,6), nullable = False)
     quantity = db.Column(db.Integer, nullable = False)
     pnl = db.Column(db.Numeric(10,2), nullable = False)
     strategy = db.Column(db.String(50), nullable = True)
@@ -29,28 +36,78 @@ class Trade(db.Model):
     notes = db.Column(db.Text)
 
     # convert trade object to dict
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'acc_id': self.acc_id,
-            'symbol': self.symbol,
-            'direction': self.direction,
-            'entry_time': self.entry_time.isoformat() if self.entry_time else None, 
-            'exit_time': self.exit_time.isoformat() if self.exit_time else None,
-            'entry_price': float(self.entry_price),
-            'exit_price': float(self.exit_price),
-            'quantity': int(self.quantity),
-            'pnl': float(self.pnl),
-            'strategy': self.strategy,
-            'trade_type': self.trade_type,
-            'fills': self.fills if self.fills else [],  # List of order dicts
-            'tags': self.tags if self.tags else [],  # Array of tag strings
-            'notes': self.notes if self.notes else None  # Free-form notes text
-        }
+    # fields: optional subset of keys to include (only those columns are touched,
+    # so a load_only() query never lazy-loads the rest)
+    def to_dict(self, fields=None):
+        return {name: serialize(self) for name, serialize in TRADE_FIELDS.items()
+                if fields is None or name in fields}
+
+# key -> how to serialize it, in to_dict order
+TRADE_FIELDS = {
+    'id': lambda t: t.id,
+    'acc_id': lambda t: t.acc_id,
+    'symbol': lambda t: t.symbol,
+    'direction': lambda t: t.direction,
+    'entry_time': lambda t: t.entry_time.isoformat() if t.entry_time else None,
+    'exit_time': lambda t: t.exit_time.isoformat() if t.exit_time else None,
+    'entry_price': lambda t: float(t.entry_price),
+    'exit_price': lambda t: float(t.exit_price),
+    'quantity': lambda t: int(t.quantity),
+    'pnl': lambda t: float(t.pnl),
+    'strategy': lambda t: t.strategy,
+    'trade_type': lambda t: t.trade_type,
+    'fills': lambda t: t.fills if t.fills else [],  # List of order dicts
+    'tags': lambda t: t.tags if t.tags else [],  # Array of tag strings
+    'notes': lambda t: t.notes if t.notes else None  # Free-form notes text
+}
+
+# Row-tuple version of to_dict for bulk reads (no Trade objects):
+#   rows = db.session.execute(db.select(*trade_columns(fields))...)
+#   trades = trade_rows_to_dicts(rows, fields)
+# Numerics come back as floats from SQL; datetimes are left as datetime objects for
+# the JSON encoder to format (app/utils/serialization.py), so the result encodes to
+# the same JSON as to_dict().
+# key -> how to fix up the raw column value (everything else is used as-is)
+TRADE_ROW_FIXUPS = {
+    'fills': lambda v: v if v else [],
+    'tags': lambda v: v if v else [],
+    'notes': lambda v: v if v else None,
+}
+
+def trade_columns(fields=None):
+    """select() columns for the given to_dict keys (default: all), labelled by key"""
+    columns = []
+    for name in fields or TRADE_FIELDS:
+        column = Trade.__table__.c[name]
+        if isinstance(column.type, db.Numeric):
+            column = db.cast(column, db.Float).label(name)
+        columns.append(column)
+    return columns
+
+def trade_rows_to_dicts(rows, fields=None):
+    """rows of trade_columns(fields) -> to_dict()-shaped dicts"""
+    keys = list(fields or TRADE_FIELDS)
+    fixups = [(name, TRADE_ROW_FIXUPS[name]) for name in keys if name in TRADE_ROW_FIXUPS]
+    trades = []
+    for row in rows:
+        trade = dict(zip(keys, row))
+        for name, fixup in fixups:
+            trade[name] = fixup(trade[name])
+        trades.append(trade)
+    return trades
 
 class Order(db.Model):
     __tablename__ = 'orders'
-    __table_args__ = {'schema': 'trade'}
+    __table_args__ = (
+        # per-(account, contract) position walks in fill order
+        db.Index('ix_orders_account_contract_fill_time', 'account', 'contract', 'fill_time'),
+        # matchers: filled orders in fill order / still-unmatched filled orders per account
+        db.Index('ix_orders_filled_fill_time', 'fill_time',
+                 postgresql_where=db.text('is_filled')),
+        db.Index('ix_orders_unmatched_filled', 'account', 'fill_time',
+                 postgresql_where=db.text('is_filled AND NOT is_matched')),
+        {'schema': 'trade'}
+    )
 
     # primary key
     id = db.Column(db.String(50), primary_key=True)
@@ -59,12 +116,12 @@ class Order(db.Model):
     b_s = db.Column(db.String(10))        # B/S column (Buy/Sell)
     contract = db.Column(db.String(20))  # Contract column (MGCG6, etc.)
     product = db.Column(db.String(50))    # Product column
-    avg_price = db.Column(db.Numeric(10,2))  # avgPrice or Avg Fill Price
+    avg_price = db.Column(db.Numeric(12,6))  # avgPrice or Avg Fill Price (6 places for sub-cent ticks)
     filled_qty = db.Column(db.Integer)   # filledQty or Filled Qty
     fill_time = db.Column(db.DateTime)   # Fill Time column
     status = db.Column(db.String(20))    # Status column (Filled, Canceled, etc.)
-    limit_price = db.Column(db.Numeric(10,2))
-    stop_price = db.Column(db.Numeric(10,2))
+    limit_price = db.Column(db.Numeric(12,6))
+    stop_price = db.Column(db.Numeric(12,6))
     order_type = db.Column(db.String(20))  # Type column (Limit, Market, Stop)
     text = db.Column(db.String(100))
 
@@ -97,4 +154,89 @@ class Order(db.Model):
             'is_buy': self.is_buy,
             'is_sell': self.is_sell,
             'is_matched': self.is_matched
-        }
\ No newline at end of file
+        }
+
+class PositionState(db.Model):
+    """Where position-based matching stopped for one (account, contract)"""
+    __tablename__ = 'position_states'
+    __table_args__ = {'schema': 'trade'}
+
+    account = db.Column(db.String(50), primary_key=True)
+    contract = db.Column(db.String(20), primary_key=True)
+    net_position = db.Column(db.Integer, nullable=False, default=0)  # positive = long, negative = short
+    avg_entry_price = db.Column(db.Numeric(12,4))  # average cost of the open position, None when flat
+    opened_at = db.Column(db.DateTime)  # first fill of the open position
+    open_order_ids = db.Column(db.JSON)  # orders in the trade that hasn't closed yet
+    last_fill_time = db.Column(db.DateTime)  # watermark: latest fill_time already processed
+    last_order_ids = db.Column(db.JSON)  # order ids processed at exactly last_fill_time (ties)
+    skipped_order_ids = db.Column(db.JSON)  # walked but left unmatched (unknown direction, no trade built): not late fills
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'account': self.account,
+            'contract': self.contract,
+            'net_position': self.net_position,
+            'avg_entry_price': float(self.avg_entry_price) if self.avg_entry_price is not None else None,
+            'opened_at': self.opened_at.isoformat() if self.opened_at else None,
+            'open_order_ids': self.open_order_ids if self.open_order_ids else [],
+            'last_fill_time': self.last_fill_time.isoformat() if self.last_fill_time else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class DailyPnl(db.Model):
+    """Per-(account, symbol, trading day) totals, kept in step with the trades table"""
+    __tablename__ = 'daily_pnl'
+    __table_args__ = {'schema': 'trade'}
+
+    acc_id = db.Column(db.String(20), primary_key=True)
+    symbol = db.Column(db.String(10), primary_key=True)
+    trading_day = db.Column(db.Date, primary_key=True)  # the product's session, see app.utils.session_calendar
+    pnl = db.Column(db.Numeric(14,2), nullable=False, default=0)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    winning_trades = db.Column(db.Integer, nullable=False, default=0)
+    losing_trades = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'acc_id': self.acc_id,
+            'symbol': self.symbol,
+            'date': self.trading_day.isoformat(),
+            'pnl': float(self.pnl),
+            'trade_count': self.trade_count,
+            'winning_trades': self.winning_trades,
+            'losing_trades': self.losing_trades
+        }
+
+
+class RollupVersion(db.Model):
+    """Which session calendar a rollup table was last built with (see daily_rollup.ensure_rollup_current)"""
+    __tablename__ = 'rollup_versions'
+    __table_args__ = {'schema': 'trade'}
+
+    name = db.Column(db.String(50), primary_key=True)  # e.g. 'daily_pnl'
+    calendar_version = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class Instrument(db.Model):
+    """Contract specs + fee schedule per product root (MGC, NQ, ...), see app/services/instruments.py"""
+    __tablename__ = 'instruments'
+    __table_args__ = {'schema': 'trade'}
+
+    root = db.Column(db.String(10), primary_key=True)
+    tick_size = db.Column(db.Numeric(12,6), nullable=False)
+    point_value = db.Column(db.Numeric(12,4), nullable=False)  # $ per 1.0 of price per contract
+    commission_per_side = db.Column(db.Numeric(8,2), nullable=False, default=0)  # $ per contract per fill side
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'root': self.root,
+            'tick_size': float(self.tick_size),
+            'point_value': float(self.point_value),
+            'commission_per_side': float(self.commission_per_side or 0),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -1,157 +1,409 @@
-import requests
+import json
+import os
+import random
+import threading
+import time
 import uuid
-
-access_token = None
-
-def authenticate():
-    global access_token
-
-    username = "Google:115790771135467284232"
-    password = "Djm0nd!23"  
-
-    url = "https://demo.tradovateapi.com/v1/auth/accesstokenrequest"
-
-    body = {
-    "name": username,
-    "password": password,
-    "appId": "tradovate",  # Changed from "TradingJournal"
-    "appVersion": "0.0.1",  # Changed from "1.0"
-    "deviceId": str(uuid.uuid4()),
-    "cid": "9574",  # Changed to string
-    "sec": "94bbf03e-a583-4df7-b96e-78df5500f5b8"
-    }
-
-    headers = {
-        "accept": "application/json",
-        "Content-Type": "application/json"
-    }
-
-    print("Authenticating...")
-    response = requests.post(url, json=body, headers = headers)
-
-    if response.status_code == 200:
-        data = response.json()
-        access_token = data.get('accessToken')
-        print("Authenticated! Token saved")
-        return True
-    else:
-        print(f"Failed{response.json()}")
-        return False
-    
-def get_headers():
-        if not access_token:
-            raise Exception("Not authenticated")
-        return {
-            "Authorization": f"Bearer {access_token}",
-            "accept": "application/json",
-            "Content-Type": "application/json"
-        }   
-
-def get_fills():
-    headers = get_headers()
-
-    url = 'https://demo.tradovateapi.com/v1/fill/list'
-
-    response = requests.get(url, headers=headers)
-
-    if response.status_code == 200:
-        fills = response.json()
-        print(f"Success: Got {len(fills)} fills")
-
-        # show first fill to see schema
-        if len(fills) > 0:
-            import json
-            print("Fill schema")
-            print(json.dumps(fills, indent=2))
-        else:
-            print("No fills found")
-        
-        return fills
-    else:
-        print(f"Error: {response.text}")
-        return []
-
-def get_fill_dependents(order_id: int):
-    """call filldependents for one order ID"""
-
-    headers = get_headers()
-    
-    url = 'https://demo.tradovateapi.com/v1/fill/deps'
-
-    params = {
-        "masterid": order_id
-    }
-
-    print(f"Calling fillDependents for {order_id}")
-
-    response = requests.get(url, headers=headers, params=params)
-    print("Status:", response.status_code)
-
-    try:
-        data = response.json()
-    except Exception:
-        print("Non-JSON response:", response.text)
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+import pytz
+import requests
+from requests.adapters import HTTPAdapter
+from app.utils.instrumentation import get_logger, metrics
+
+log = get_logger('tradovate')
+
+# Tradovate REST sync client.
+#
+# One pooled requests.Session per client: connections are reused across calls and
+# the auth / accept headers are set once. The access token is cached until shortly
+# before its expirationTime (optionally in TRADOVATE_TOKEN_CACHE, so separate runs
+# don't log in again - Tradovate rate-limits auth hard), renewed through
+# /auth/renewaccesstoken, and a 401 drops it and retries once.
+#
+# Throttled / failed calls (connection errors, 429, 5xx) are retried with exponential
+# backoff + jitter, honouring Retry-After. Fill dependents are fetched concurrently,
+# capped at max_in_flight requests per client by a bounded semaphore (which is also
+# the connection pool size).
+#
+# Settings come from the environment (see .env.example):
+#   TRADOVATE_URL                      default the demo API
+#   TRADOVATE_USERNAME / _PASSWORD     login
+#   TRADOVATE_CID / _SECRET            API key
+#   TRADOVATE_APP_ID / _APP_VERSION / _DEVICE_ID
+#   TRADOVATE_CONCURRENCY              max in-flight requests (default 8)
+#   TRADOVATE_TOKEN_CACHE              file to keep the token in between runs
+#
+# sync_orders() writes filled orders, with their fills rolled up, into the Order table.
+
+DEMO_URL = 'https://demo.tradovateapi.com/v1'
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RENEW_MARGIN = timedelta(minutes=5)  # renew this long before the token expires
+
+LA = pytz.timezone('America/Los_Angeles')
+
+
+class TradovateError(Exception):
+    """a Tradovate call that failed for good (after retries)"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    """Tradovate ISO timestamp (UTC, '...Z') -> aware UTC datetime"""
+    if not value:
         return None
-    import json
-    print(json.dumps(data if isinstance(data, dict) else data[:2], indent=2))
-    return data
-    
-def get_orders_list(ord_status = None):
-    # Call GET /v1/order/list. Optional query param ord_status (e.g. "Filled") to filter by ordStatus. Return list of order objects. Use for bracket/OCO structure (parentId, linkedId, ocoId).
-    """"
-    Canceled" "Completed" "Expired" "Filled" "PendingCancel" 
-    "PendingNew" "PendingReplace" "Rejected" "Suspended" "Unknown" "Working"
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class TradovateClient:
+
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None,
+                 password: Optional[str] = None, cid: Optional[str] = None, secret: Optional[str] = None,
+                 app_id: Optional[str] = None, app_version: Optional[str] = None, device_id: Optional[str] = None,
+                 max_in_flight: Optional[int] = None, max_retries: int = 4, backoff_sec: float = 0.5,
+                 timeout_sec: float = 15.0, token_cache_path: Optional[str] = None):
+        env = os.environ.get
+        self.base_url = (base_url or env('TRADOVATE_URL') or DEMO_URL).rstrip('/')
+        self.credentials = {
+            'name': username or env('TRADOVATE_USERNAME'),
+            'password': password or env('TRADOVATE_PASSWORD'),
+            'appId': app_id or env('TRADOVATE_APP_ID') or 'tradovate',
+            'appVersion': app_version or env('TRADOVATE_APP_VERSION') or '0.0.1',
+            'deviceId': device_id or env('TRADOVATE_DEVICE_ID') or str(uuid.uuid4()),
+            'cid': cid or env('TRADOVATE_CID'),
+            'sec': secret or env('TRADOVATE_SECRET'),
+        }
+        self.max_in_flight = max_in_flight or int(env('TRADOVATE_CONCURRENCY') or 8)
+        self.max_retries = max_retries
+        self.backoff_sec = backoff_sec
+        self.timeout_sec = timeout_sec
+        self.token_cache_path = token_cache_path or env('TRADOVATE_TOKEN_CACHE')
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'accept': 'application/json', 'Content-Type': 'application/json'})
+
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._token_lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires: Optional[datetime] = None
+        self._load_cached_token()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---- token ----
+
+    def _load_cached_token(self) -> None:
+        if not self.token_cache_path or not os.path.exists(self.token_cache_path):
+            return
+        try:
+            with open(self.token_cache_path) as f:
+                cached = json.load(f)
+            if cached.get('base_url') == self.base_url:
+                self._set_token(cached['accessToken'], cached['expirationTime'], persist=False)
+        except (OSError, ValueError, KeyError):
+            log.warning("Ignoring unreadable token cache %s", self.token_cache_path)
+
+    def _set_token(self, token: str, expiration_time: str, persist: bool = True) -> None:
+        self._token = token
+        self._expires = _parse_timestamp(expiration_time)
+        self.session.headers['Authorization'] = f"Bearer {token}"
+        if persist and self.token_cache_path:
+            with open(self.token_cache_path, 'w') as f:
+                json.dump({'base_url': self.base_url, 'accessToken': token, 'expirationTime': expiration_time}, f)
+
+    def _token_valid(self, margin: timedelta = timedelta(0)) -> bool:
+        return (self._token is not None and self._expires is not None
+                and datetime.now(timezone.utc) + margin < self._expires)
+
+    def invalidate_token(self, token: Optional[str] = None) -> None:
+        """drop the cached token (only if it's still `token`, when given)"""
+        with self._token_lock:
+            if token is None or token == self._token:
+                self._token = self._expires = None
+                self.session.headers.pop('Authorization', None)
+
+    def ensure_token(self) -> str:
+        """a token good for at least RENEW_MARGIN: cached, renewed, or from a fresh login"""
+        if self._token_valid(RENEW_MARGIN):
+            return self._token
+        with self._token_lock:
+            if self._token_valid(RENEW_MARGIN):
+                return self._token
+            if self._token_valid():
+                try:
+                    data = self._send('GET', '/auth/renewaccesstoken', auth=False,
+                                      headers={'Authorization': f"Bearer {self._token}"})
+                    if data.get('accessToken'):
+                        self._set_token(data['accessToken'], data['expirationTime'])
+                        return self._token
+                except TradovateError as e:
+                    log.info("Token renewal failed (%s), logging in again", e)
+            self._authenticate()
+            return self._token
+
+    def _authenticate(self) -> None:
+        if not self.credentials['name'] or not self.credentials['password']:
+            raise TradovateError("TRADOVATE_USERNAME / TRADOVATE_PASSWORD are not set")
+        body = dict(self.credentials)
+        for _ in range(self.max_retries + 1):
+            data = self._send('POST', '/auth/accesstokenrequest', json_body=body, auth=False)
+            if data.get('p-ticket'):
+                # login throttled: wait p-time seconds, then retry with the ticket
+                wait = float(data.get('p-time') or 1)
+                log.warning("Login throttled, retrying in %.1fs", wait)
+                time.sleep(wait)
+                body = dict(self.credentials, **{'p-ticket': data['p-ticket']})
+                continue
+            if not data.get('accessToken'):
+                raise TradovateError(f"Authentication failed: {data.get('errorText') or data}")
+            self._set_token(data['accessToken'], data['expirationTime'])
+            metrics.incr('tradovate.auth')
+            log.info("Authenticated with Tradovate, token expires %s", data['expirationTime'])
+            return
+        raise TradovateError("Authentication throttled too many times")
+
+    # ---- requests ----
+
+    def _send(self, method: str, path: str, params: Optional[Dict] = None, json_body: Optional[Dict] = None,
+              auth: bool = True, headers: Optional[Dict] = None) -> Any:
+        """one call with retries; returns the decoded JSON body"""
+        url = f"{self.base_url}{path}"
+        reauthed = False
+        attempt = 0
+        while True:
+            token = self.ensure_token() if auth else None
+            response, error = None, None
+            with self._in_flight:
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, params=params, json=json_body,
+                                                    headers=headers, timeout=self.timeout_sec)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+                finally:
+                    metrics.observe('tradovate.request', time.perf_counter() - started)
+
+            if response is not None and response.status_code == 401 and auth and not reauthed:
+                # token revoked / expired early: log in again once
+                self.invalidate_token(token)
+                reauthed = True
+                continue
+
+            retryable = response is None or response.status_code in RETRY_STATUSES
+            if retryable and attempt < self.max_retries:
+                delay = self.backoff_sec * (2 ** attempt) * (0.5 + random.random())
+                retry_after = response.headers.get('Retry-After') if response is not None else None
+                if retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                attempt += 1
+                metrics.incr('tradovate.retries')
+                log.debug("%s %s failed (%s), retry %d in %.2fs", method, path,
+                          error if response is None else response.status_code, attempt, delay)
+                time.sleep(delay)
+                continue
+
+            if response is None:
+                raise TradovateError(f"{method} {path}: {error}")
+            if response.status_code != 200:
+                raise TradovateError(f"{method} {path}: HTTP {response.status_code} {response.text[:200]}",
+                                     response.status_code)
+            try:
+                return response.json()
+            except ValueError:
+                raise TradovateError(f"{method} {path}: non-JSON response {response.text[:200]}")
+
+    def get(self, path: str, **params) -> Any:
+        return self._send('GET', path, params=params or None)
+
+    # ---- endpoints ----
+
+    def accounts(self) -> List[Dict]:
+        return self.get('/account/list')
+
+    def orders(self, ord_status: Optional[str] = None) -> List[Dict]:
+        """
+        /order/list, optionally only one ordStatus: "Canceled" "Completed" "Expired" "Filled"
+        "PendingCancel" "PendingNew" "PendingReplace" "Rejected" "Suspended" "Unknown" "Working"
+        """
+        orders = self.get('/order/list')
+        if ord_status:
+            orders = [o for o in orders if o.get('ordStatus') == ord_status]
+        return orders
+
+    def order(self, order_id: int) -> Dict:
+        return self.get('/order/item', id=order_id)
+
+    def fills(self) -> List[Dict]:
+        return self.get('/fill/list')
+
+    def fill_dependents(self, order_id: int) -> List[Dict]:
+        """fills of one order"""
+        return self.get('/fill/deps', masterid=order_id)
+
+    def contracts(self, contract_ids: Iterable[int]) -> Dict[int, Dict]:
+        """contract id -> contract (name e.g. MGCG6), in one /contract/items call"""
+        ids = sorted(set(contract_ids))
+        if not ids:
+            return {}
+        return {c['id']: c for c in self.get('/contract/items', ids=','.join(str(i) for i in ids))}
+
+    def fills_by_order_ids(self, order_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+        """
+        order id -> its fills, fetched concurrently (max_in_flight at a time).
+        Raises the first TradovateError once every request has finished.
+        """
+        order_ids = list(dict.fromkeys(order_ids))
+        if not order_ids:
+            return {}
+        with metrics.timer('tradovate.fills'), ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            # one token for the batch, instead of every worker racing to log in
+            self.ensure_token()
+            results = list(pool.map(self._fill_dependents_or_error, order_ids))
+        for result in results:
+            if isinstance(result, TradovateError):
+                raise result
+        return dict(zip(order_ids, results))
+
+    def _fill_dependents_or_error(self, order_id: int):
+        try:
+            return self.fill_dependents(order_id)
+        except TradovateError as e:
+            return e
+
+
+# ---- writing fills into the Order table ----
+
+def order_fields_from_api(order: Dict, fills: List[Dict], contract_name: str, account_name: str) -> Dict[str, Any]:
     """
+    Order column values for one Tradovate order and its fills, the same shape
+    _order_fields_from_row gives a CSV row: filled qty summed over the fills, price
+    qty-weighted, fill_time the last fill's (Pacific wall-clock, like the CSV exports).
+    """
+    from app.utils.session_calendar import product_root
+
+    fills = [f for f in fills if f.get('active', True)]
+    filled_qty = sum(int(f['qty']) for f in fills)
+    avg_price = round(sum(f['price'] * f['qty'] for f in fills) / filled_qty, 6) if filled_qty else None
+    last_fill = max((_parse_timestamp(f['timestamp']) for f in fills), default=None)
+    action = order.get('action') or (fills[0].get('action') if fills else '')
+    status = order.get('ordStatus', '')
+    return {
+        'id': f"tv-{order['id']}",
+        'order_id': str(order['id']),
+        'account': account_name,
+        'b_s': action,
+        'contract': contract_name,
+        'product': product_root(contract_name),
+        'avg_price': avg_price,
+        'filled_qty': filled_qty,
+        'fill_time': last_fill.astimezone(LA).replace(tzinfo=None) if last_fill else None,
+        'status': status,
+        'limit_price': None,
+        'stop_price': None,
+        'order_type': '',
+        'text': '',
+        'raw_csv_data': {'order': order, 'fills': fills},
+        'is_filled': status == 'Filled' and filled_qty > 0,
+        'is_buy': action.upper() == 'BUY',
+        'is_sell': action.upper() == 'SELL',
+    }
 
-    headers = get_headers()
-    url = 'https://demo.tradovateapi.com/v1/order/list'
-
-    params = {}
-    if ord_status:
-        params["ordStatus"] = ord_status
 
-    response = requests.get(url, headers=headers, params=params)
+def sync_orders(client: TradovateClient, match: bool = True) -> Dict[str, Any]:
+    """
+    Pull filled orders + their fills from Tradovate into the Order table, then
+    (match=True) turn new fills into trades with the incremental matcher.
 
-    if response.status_code != 200:
-        print("Error:", response.text)
-        return None
- 
-    import json
-    data = response.json()
-    print(json.dumps(data[-3:]))
+    Orders already stored - from an earlier sync (id tv-<orderId>) or a CSV import
+    of the same order id and account - are left alone.
 
-def get_order_item(order_id):
-    headers = get_headers()
-    url = 'https://demo.tradovateapi.com/v1/order/item'
+    Note: This function must be called within app.app_context()
+    """
+    from app.db.models import Order, db
+    from app.utils.csv_parser import _bulk_upsert_mapped_orders, process_new_fills_to_trades
+
+    started = time.perf_counter()
+    orders = client.orders(ord_status='Filled')
+    accounts = {a['id']: a.get('name') or str(a['id']) for a in client.accounts()}
+    contracts = client.contracts(o['contractId'] for o in orders if o.get('contractId') is not None)
+
+    def account_name(order):
+        return accounts.get(order.get('accountId')) or str(order.get('accountId'))
+
+    # skip order ids the CSV path already stored for the same account
+    known = set()
+    order_ids = [str(o['id']) for o in orders]
+    for start in range(0, len(order_ids), 1000):
+        known.update(db.session.execute(
+            db.select(Order.order_id, Order.account).where(Order.order_id.in_(order_ids[start:start + 1000]))
+        ).all())
+    orders = [o for o in orders if (str(o['id']), account_name(o)) not in known]
+
+    fills = client.fills_by_order_ids(o['id'] for o in orders)
+
+    mapped = []
+    for row_num, order in enumerate(orders, start=1):
+        try:
+            contract = contracts.get(order.get('contractId'), {}).get('name') or str(order.get('contractId'))
+            mapped.append((row_num, order_fields_from_api(order, fills.get(order['id'], []), contract,
+                                                          account_name(order)), None))
+        except Exception as e:
+            mapped.append((row_num, None, f"order {order.get('id')}: {e}"))
 
-    params = {
-        id = order_id
+    try:
+        _, errors, counts = _bulk_upsert_mapped_orders(mapped)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise TradovateError(f"Database error saving orders: {e}")
+
+    result = {
+        'orders_fetched': len(order_ids),
+        'orders_new': len(orders),
+        'orders_inserted': counts['inserted'],
+        'errors': [e for e in errors if 'already exists' not in e],
     }
+    if match:
+        matched = process_new_fills_to_trades()
+        result['trades_created'] = matched['trades_created']
+        result['errors'] += matched['errors']
+    result['elapsed_sec'] = round(time.perf_counter() - started, 3)
+    log.info("Tradovate sync: %d filled orders, %d new, %d inserted in %.2fs", result['orders_fetched'],
+             result['orders_new'], result['orders_inserted'], result['elapsed_sec'])
+    return result
 
-    response = requests.get(url, headers=headers, params=params)
-
-    if response.status_code != 200:
-        print("Error:", response.text)
-        return None
- 
-    import json
-    data = response.json()
-
-def get_filled_orders():
-    # Return only orders that have fills. Call get_orders(ord_status="Filled") and return that list (or thin wrapper). Used so we only fetch fills for orders that can have them.
-    get_orders_list(ord_status = "Filled")
-    return None
 
-def parse_order_relationships(order):
-    # Return only orders that have fills. Call get_orders(ord_status="Filled") and return that list (or thin wrapper). Used so we only fetch fills for orders that can have them.
-    return None
+# ---- bracket / OCO helpers ----
+#
+# Entry / exit pairing and pnl aren't done here: sync_orders stores the filled orders
+# and the position matcher builds the trades (partial fills, scaling, flips included).
 
 def build_bracket_oco_groups(orders):
     # Take the full list of orders from order/list. Group by parentId (brackets) and by ocoId (OCO). Return a dict: key = group identifier (e.g. "parent:<id>" or "oco:<id>" or "standalone:<id>"), value = list of order IDs in that group. Used so we know which order IDs belong together for fetching fills and pairing entry/exi
-    
+
     if not orders:
         return {}
-    
+
     order_ids = {o.get("id") for o in orders if o.get("id") is not None}
     by_parent = {}
     by_oco = {}
@@ -186,38 +438,10 @@ def build_bracket_oco_groups(orders):
 
     return groups
 
-def get_fills_by_order_ids(order_ids: int):
-    # Given a list of order IDs (e.g. from one bracket/OCO group), return a dict order_id -> list of fills. Either call get_fill_dependents(order_id) for each ID, or call get_fills() once and filter by orderId in that list. Used to gather all fills for a group before pairing entry/exit.
-    return None
-def pair_entry_exit_fills(fills_for_group):
-    # ake a list of fill dicts for one bracket/OCO group (or single order), sorted by time. Identify entry fill(s) and exit fill(s) (e.g. by action Buy/Sell and timestamp). Return a list of (entry_fill, exit_fill) pairs (or equivalent structure) so PnL can be computed per pair.
-    return None
-def compute_pnl_for_pair(entry_fill, exit_fill, contract_multiplier):
-    # Given one entry fill and one exit fill, compute realized PnL: (exit_price - entry_price) * qty * multiplier, with sign corrected for direction (Buy vs Sell). Return a number (or a small dict with pnl and metadata). Used after pairing entry/exit
-    return None
-
 
 if __name__ == '__main__':
-    authenticate()
-    print("Token stored")
-    get_orders_list()
-    #get_fills()
-
-
-# 1.  authenticate()
-
-# 2.  orders = get_filled_orders()                    # uses get_orders("Filled") under the hood
-# 3.  groups = build_bracket_oco_groups(orders)      # group_key -> [order_id, ...]
-
-# 4.  for each (group_key, order_ids) in groups:
-# 5.      fills_by_order = get_fills_by_order_ids(order_ids)   # uses get_fill_dependents (or get_fills) per id
-# 6.      all_fills_for_group = flatten fills_by_order into one list, sort by timestamp
-# 7.      pairs = pair_entry_exit_fills(all_fills_for_group)
-# 8.      for each (entry_fill, exit_fill) in pairs:
-# 9.          pnl = compute_pnl_for_pair(entry_fill, exit_fill)
-# 10.         # store or send (group_key, entry_fill, exit_fill, pnl) to journal/UI
-
-# get_headers is used inside get_filled_orders, get_fills, and get_fill_dependents (and thus inside get_fills_by_order_ids).
-# get_orders is used only by get_filled_orders.
-# get_fill_dependents is used by get_fills_by_order_ids (or you substitute get_fills + filter by orderId).
-# parse_order_relationships is optional and doesn’t drive the flow; it’s for inspecting one order.
\ No newline at end of file
+    with TradovateClient() as client:
+        client.ensure_token()
+        print("Token stored")
+        orders = client.orders(ord_status='Filled')
+        print(json.dumps(orders[-3:], indent=2))
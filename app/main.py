@@ -1,24 +1,43 @@
 from flask import Flask, request, jsonify
 from app.db.models import db
+from app.db.config import load_env, database_uri, engine_options
 from app.api.trades import trade_bp
 from app.api.pnl import pnl_bp
+from app.api.analytics import analytics_bp
+from app.api.jobs import jobs_bp
+from app.api.metrics import metrics_bp
+from app.api.instruments import instruments_bp
+from app.api.positions import positions_bp
+from app.utils.instrumentation import configure_logging
+from app.utils.profiling import init_profiling
 from flask_cors import CORS
 
+load_env()
+
 app = Flask(__name__)
 CORS(app)
 
-# database configs
-app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://desmondjung@localhost/trading_journal'
+# LOG_LEVEL=DEBUG for per-row / per-group import detail
+configure_logging()
+
+# database configs: DATABASE_URL / DB_PROFILE from the env or .env, see app/db/config.py
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'connect_args': {'options': '-csearch_path=trade'}
-}
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options()
 
 db.init_app(app)
 
+# PROFILE_REQUESTS=1 (optionally PROFILE_DUMP_MS=500) to profile requests, see app/utils/profiling.py
+init_profiling(app)
+
 # register blueprints
 app.register_blueprint(trade_bp)
 app.register_blueprint(pnl_bp)
+app.register_blueprint(analytics_bp)
+app.register_blueprint(jobs_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(instruments_bp)
+app.register_blueprint(positions_bp)
 
 @app.route('/')
 def home():
@@ -27,7 +46,17 @@ def home():
         'endpoints': [
             'POST /api/trades',
             'GET /api/trades',
-            'GET /api/pnl/daily'
+            'GET /api/pnl/daily',
+            'GET /api/pnl/daily/summary',
+            'GET /api/analytics/summary',
+            'GET /api/analytics/cache',
+            'POST /api/jobs/import',
+            'GET /api/jobs/<job_id>',
+            'GET /api/metrics',
+            'GET /api/instruments',
+            'PUT /api/instruments/<root>',
+            'POST /api/instruments/reprice',
+            'GET /api/positions'
             ]
         })
 
@@ -35,4 +64,8 @@ if __name__ == '__main__':
     # create tables
     with app.app_context():
         db.create_all()
+        # trading days moved (session calendar changed): rebuild the daily_pnl rollup once
+        from app.services.daily_rollup import ensure_rollup_current
+        if ensure_rollup_current():
+            app.logger.info("daily_pnl rollup rebuilt for the current session calendar")
     app.run(debug=True, host='0.0.0.0', port=5001)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import random
+import time
+from datetime import datetime, timedelta
+from app.utils.csv_parser import _parse_datetime_maybe, new_fill_time_parser
+
+# Microbenchmark: per-file fill time parser vs the multi-format _parse_datetime_maybe.
+# No database needed:
+#   python -m app.scripts.bench_fill_time
+
+ROWS = 200_000
+
+FORMATS = {
+    'us short (1/15/26 7:40)': lambda t: f"{t.month}/{t.day}/{t:%y} {t.hour}:{t.minute:02d}",
+    'us full (01/15/2026 07:40:22)': lambda t: t.strftime("%m/%d/%Y %H:%M:%S"),
+    'iso (2026-01-15 07:40:22)': lambda t: t.strftime("%Y-%m-%d %H:%M:%S"),
+}
+
+
+def fill_times(fmt, rows, repeat_share):
+    """timestamps in fill order; repeat_share of them repeat the previous one (bracket legs)"""
+    rng = random.Random(7)
+    current = datetime(2026, 1, 15, 6, 30)
+    values = []
+    for _ in range(rows):
+        if not values or rng.random() >= repeat_share:
+            current += timedelta(seconds=rng.randint(1, 90))
+        values.append(fmt(current))
+    return values
+
+
+def timed(parse, values):
+    started = time.perf_counter()
+    results = [parse(v) for v in values]
+    return time.perf_counter() - started, results
+
+
+def main():
+    print(f"Parsing {ROWS} fill times per case\n")
+    print(f"{'format':32} {'repeats':>8} {'current':>10} {'new':>10} {'speedup':>8}")
+    for name, fmt in FORMATS.items():
+        for repeat_share in (0.0, 0.5):
+            values = fill_times(fmt, ROWS, repeat_share)
+            old_elapsed, old_results = timed(_parse_datetime_maybe, values)
+            new_elapsed, new_results = timed(new_fill_time_parser(), values)
+            assert old_results == new_results, f"results differ for {name}"
+            print(f"{name:32} {repeat_share:>8.0%} {old_elapsed:>9.3f}s {new_elapsed:>9.3f}s {old_elapsed / new_elapsed:>7.1f}x")
+    print("\n✅ Same datetimes from both parsers")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from app.main import app
+from app.db.config import database_uri
+from app.db.models import db, Order, Trade
+from app.scripts.migrate_indexes import create_indexes, drop_indexes
+
+# Seeds a large synthetic journal and prints EXPLAIN ANALYZE plans for the hot
+# order/trade queries without and with the managed indexes.
+# It drops/creates indexes and bulk inserts rows, so it only runs against an explicit
+# --db that isn't the app's own DATABASE_URL:
+#   python -m app.scripts.bench_indexes --db postgresql://localhost/trading_journal_test --orders 500000 --trades 200000
+
+BENCH_PREFIX = 'bench-'
+ACCOUNTS = [f'ACC{i:02d}' for i in range(20)]
+CONTRACTS = ['MGCG6', 'MGCJ6', 'NQH6', 'NQM6', 'ESH6', 'ESM6']
+START = datetime(2023, 1, 1)
+
+
+def seed(order_count: int, trade_count: int, batch_size: int = 10000):
+    rng = random.Random(42)
+    print(f"Seeding {order_count} orders and {trade_count} trades...")
+
+    for table, count, make_row in [
+        (Order.__table__, order_count, lambda i: {
+            'id': f'{BENCH_PREFIX}ord-{i}',
+            'account': rng.choice(ACCOUNTS),
+            'contract': rng.choice(CONTRACTS),
+            'b_s': 'Buy' if i % 2 == 0 else 'Sell',
+            'avg_price': 2000 + rng.random() * 100,
+            'filled_qty': 1,
+            'fill_time': START + timedelta(seconds=i * 60),
+            'status': 'Filled',
+            'is_filled': rng.random() < 0.7,
+            'is_buy': i % 2 == 0,
+            'is_sell': i % 2 == 1,
+            # most of history is already matched; the tail is what matchers look for
+            'is_matched': i < order_count * 0.98,
+        }),
+        (Trade.__table__, trade_count, lambda i: {
+            'id': f'{BENCH_PREFIX}trade-{i}',
+            'acc_id': rng.choice(ACCOUNTS),
+            'symbol': rng.choice(CONTRACTS),
+            'direction': 'LONG',
+            'entry_time': START + timedelta(seconds=i * 150),
+            'exit_time': START + timedelta(seconds=i * 150 + 60),
+            'entry_price': 2000,
+            'exit_price': 2001,
+            'quantity': 1,
+            'pnl': rng.uniform(-100, 100),
+        }),
+    ]:
+        for offset in range(0, count, batch_size):
+            rows = [make_row(i) for i in range(offset, min(count, offset + batch_size))]
+            db.session.execute(table.insert(), rows)
+        db.session.commit()
+
+    for model in (Order, Trade):
+        db.session.execute(db.text(f"ANALYZE {model.__table__.fullname}"))
+    db.session.commit()
+
+
+def cleanup():
+    Order.query.filter(Order.id.like(f'{BENCH_PREFIX}%')).delete(synchronize_session=False)
+    Trade.query.filter(Trade.id.like(f'{BENCH_PREFIX}%')).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def hot_queries():
+    """the query shapes the matchers and PnL endpoints run"""
+    account = ACCOUNTS[3]
+    range_start = START + timedelta(days=200)
+    range_end = range_start + timedelta(days=31)
+    return {
+        'unmatched filled orders (order_matching)':
+            Order.query.filter_by(is_filled=True, is_matched=False, account=account).order_by(Order.fill_time),
+        'filled orders by fill_time (csv_parser)':
+            Order.query.filter_by(is_filled=True, account=account).filter(Order.fill_time.isnot(None)).order_by(Order.fill_time),
+        'one (account, contract) in fill order':
+            Order.query.filter_by(account=account, contract=CONTRACTS[0]).order_by(Order.fill_time),
+        'trades in a month (pnl/daily, calendar)':
+            Trade.query.filter(Trade.exit_time >= range_start, Trade.exit_time <= range_end),
+        'symbol trades in a month':
+            Trade.query.filter(Trade.symbol == CONTRACTS[2], Trade.exit_time >= range_start, Trade.exit_time <= range_end),
+    }
+
+
+def explain_all(label: str):
+    print(f"\n{'=' * 80}\n{label}\n{'=' * 80}")
+    connection = db.session.connection()
+    for name, query in hot_queries().items():
+        compiled = query.statement.compile(dialect=connection.dialect)
+        started = time.perf_counter()
+        plan = connection.exec_driver_sql("EXPLAIN (ANALYZE, BUFFERS) " + compiled.string, compiled.params).fetchall()
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"\n--- {name} ({elapsed:.1f} ms) ---")
+        for (line,) in plan:
+            print(f"  {line}")
+    db.session.rollback()
+
+
+def build_app(uri: str) -> Flask:
+    """
+    a fresh app with its own engine on uri (app.main's engine was created by init_app
+    already, so changing its config afterwards would still hit DATABASE_URL)
+    """
+    bench_app = Flask('bench_indexes')
+    for blueprint in app.blueprints.values():
+        bench_app.register_blueprint(blueprint)
+    bench_app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    bench_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(bench_app)
+    return bench_app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query plans for the hot queries before/after the managed indexes")
+    parser.add_argument('--db', required=True, help="scratch database URI (not the app's DATABASE_URL)")
+    parser.add_argument('--orders', type=int, default=500000)
+    parser.add_argument('--trades', type=int, default=200000)
+    parser.add_argument('--keep', action='store_true', help="keep the seeded rows afterwards")
+    args = parser.parse_args()
+
+    if args.db == database_uri():
+        parser.error("--db is the app's own database; point it at a scratch database")
+
+    with build_app(args.db).app_context():
+        db.create_all()
+        cleanup()
+        seed(args.orders, args.trades)
+        try:
+            drop_indexes()
+            explain_all("BEFORE: primary keys only")
+            create_indexes()
+            explain_all("AFTER: managed indexes")
+        finally:
+            if not args.keep:
+                cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from app.db.models import Trade, TRADE_FIELDS, trade_rows_to_dicts
+from app.utils import serialization
+
+# Payload encode time for a page of trades (no database).
+# before: Trade objects -> to_dict() -> Flask's default JSON provider (what jsonify does)
+# after:  row tuples -> trade_rows_to_dicts() -> serialization.dumps (orjson, or the stdlib fallback)
+#   python -m app.scripts.bench_json [trades] [fills_per_trade]
+
+REPEATS = 5
+
+
+def synthetic_trades(count: int, fills_per_trade: int):
+    """the same trades as Trade objects (what the ORM hands back) and as row tuples (what a select gives)"""
+    rng = random.Random(7)
+    start = datetime(2025, 1, 2, 6, 30)
+    objects, rows = [], []
+    for i in range(count):
+        entry_time = start + timedelta(minutes=7 * i, microseconds=rng.randint(0, 999_999))
+        exit_time = entry_time + timedelta(minutes=rng.randint(1, 90))
+        entry_price = Decimal(f"{2000 + rng.random() * 100:.2f}")
+        exit_price = Decimal(f"{2000 + rng.random() * 100:.2f}")
+        fills = [{
+            'id': f'ord-{i}-{f}', 'order_id': str(100000 + i * 10 + f), 'account': 'ACC01', 'b_s': 'Buy' if f % 2 else 'Sell',
+            'contract': 'MGCG6', 'avg_price': float(entry_price), 'filled_qty': 1,
+            'fill_time': (entry_time + timedelta(seconds=f)).isoformat(), 'status': 'Filled',
+            'is_filled': True, 'is_buy': bool(f % 2), 'is_sell': not f % 2, 'is_matched': True,
+        } for f in range(fills_per_trade)]
+        values = {
+            'id': f'trade_{i:08d}', 'acc_id': 'ACC01', 'symbol': 'MGC', 'direction': 'LONG',
+            'entry_time': entry_time, 'exit_time': exit_time,
+            'entry_price': entry_price, 'exit_price': exit_price, 'quantity': rng.randint(1, 5),
+            'pnl': Decimal(f"{rng.uniform(-500, 500):.2f}"), 'strategy': 'ORB' if i % 3 else None,
+            'trade_type': 'day_trade', 'fills': fills, 'tags': ['a'] if i % 5 == 0 else None,
+            'notes': None,
+        }
+        objects.append(Trade(**values))
+        # a select of trade_columns() casts numerics to float in SQL
+        rows.append(tuple(float(values[k]) if isinstance(values[k], Decimal) else values[k] for k in TRADE_FIELDS))
+    return objects, rows
+
+
+def best_of(fn):
+    best = float('inf')
+    result = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    fills_per_trade = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    objects, rows = synthetic_trades(count, fills_per_trade)
+    provider = DefaultJSONProvider(Flask(__name__))
+    encoder = 'orjson' if serialization.orjson is not None else 'stdlib json (orjson not installed)'
+
+    def before():
+        return provider.dumps({'count': count, 'trades': [t.to_dict() for t in objects]}).encode('utf-8')
+
+    def after():
+        return serialization.dumps({'count': count, 'trades': trade_rows_to_dicts(rows)})
+
+    def after_stdlib():
+        payload = {'count': count, 'trades': trade_rows_to_dicts(rows)}
+        return json.dumps(payload, default=serialization._default, separators=(',', ':')).encode('utf-8')
+
+    print(f"📦 {count:,} trades x {fills_per_trade} fills, best of {REPEATS}, encoder: {encoder}\n")
+    baseline = before_bytes = None
+    per_10k = 10_000 / count
+    for name, fn in [('to_dict + jsonify', before), ('rows + dumps', after), ('rows + stdlib fallback', after_stdlib)]:
+        elapsed, payload = best_of(fn)
+        if baseline is None:
+            baseline, before_bytes = elapsed, payload
+        same = "✅ same JSON" if json.loads(payload) == json.loads(before_bytes) else "❌ differs"
+        print(f"   {name:<24} {elapsed * 1000:8.1f} ms  ({elapsed * per_10k * 1000:7.1f} ms / 10k trades)  "
+              f"{baseline / elapsed:5.1f}x  {len(payload) / 1e6:5.2f} MB  {same}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+from app.utils.csv_parser import _map_order_rows, parse_csv_text, parallel_map_order_rows
+
+# Parse/hash throughput of the parallel ingest mode vs the serial path (no database).
+# Uses a synthetic multi-account Orders.csv, or your own export:
+#   python -m app.scripts.bench_parallel_ingest [path/to/Orders.csv] [rows]
+
+HEADER = "orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status,Type,Text\n"
+
+
+def synthetic_orders_csv(rows: int, accounts: int = 40) -> bytes:
+    lines = [HEADER]
+    for i in range(rows):
+        lines.append(
+            f"{i},PROP{i % accounts:03d},{'Buy' if i % 2 else 'Sell'},MGCG6,MGC,{2000 + i % 37}.{i % 10},"
+            f"{1 + i % 3},1/{1 + i % 28}/26 {7 + i % 8}:{i % 60:02d}:{i % 59:02d},"
+            f"{'Filled' if i % 5 else 'Canceled'},Limit,\"bracket, leg {i % 3}\"\n"
+        )
+    return ''.join(lines).encode('utf-8')
+
+
+def main():
+    if len(sys.argv) > 1 and os.path.exists(sys.argv[1]):
+        with open(sys.argv[1], 'rb') as f:
+            data = f.read()
+    else:
+        rows = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else 300_000
+        data = synthetic_orders_csv(rows)
+
+    print(f"📄 {len(data) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+    started = time.perf_counter()
+    serial = _map_order_rows(parse_csv_text(data.decode('utf-8')), 'default')
+    serial_elapsed = time.perf_counter() - started
+    print(f"   serial:     {serial_elapsed:7.2f}s  ({len(serial) / serial_elapsed:,.0f} rows/s)")
+
+    for workers in sorted({1, 2, 4, 8, os.cpu_count() or 1}):
+        started = time.perf_counter()
+        mapped = parallel_map_order_rows(data, 'default', workers=workers)
+        elapsed = time.perf_counter() - started
+        same = "✅" if mapped == serial else "❌ differs from serial"
+        print(f"   {workers:2d} workers: {elapsed:7.2f}s  ({len(mapped) / elapsed:,.0f} rows/s, "
+              f"{serial_elapsed / elapsed:.1f}x) {same}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from app.services.order_matching import match_fill_groups
+
+# Throughput of the lot-relief matcher with 1, 4 and 16 workers (no database).
+# Synthetic prop-firm style book: many accounts x contracts, scaled entries/exits.
+#   python -m app.scripts.bench_parallel_matching [groups] [fills_per_group]
+
+WORKER_COUNTS = [1, 4, 16]
+
+
+def synthetic_fill_groups(groups: int, fills_per_group: int) -> dict:
+    rng = random.Random(5)
+    contracts = ['MGCG6', 'MGCJ6', 'NQH6', 'ESH6', 'CLG6']
+    fill_groups = {}
+    for g in range(groups):
+        key = (contracts[g % len(contracts)], f'PROP{g // len(contracts):04d}')
+        t = datetime(2026, 1, 5, 6, 30)
+        fills = []
+        position = 0
+        for i in range(fills_per_group):
+            t += timedelta(seconds=rng.randint(1, 120))
+            # lean towards flattening so most fills end up in trades
+            is_buy = position < 0 or (position == 0 and rng.random() < 0.5) or (position > 0 and rng.random() < 0.3)
+            qty = rng.randint(1, 3)
+            position += qty if is_buy else -qty
+            fills.append((f'{key[1]}-{key[0]}-{i}', is_buy, qty, 2000 + rng.random() * 20, t))
+        fill_groups[key] = fills
+    return fill_groups
+
+
+def main():
+    groups = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    fills_per_group = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    fill_groups = synthetic_fill_groups(groups, fills_per_group)
+    total_fills = groups * fills_per_group
+
+    print(f"📊 {groups} groups x {fills_per_group} fills = {total_fills:,} fills, {os.cpu_count()} CPUs\n")
+
+    baseline = None
+    for workers in WORKER_COUNTS:
+        started = time.perf_counter()
+        results = match_fill_groups(fill_groups, 'fifo', workers)
+        elapsed = time.perf_counter() - started
+
+        trades = sum(len(records) for _, records, _ in results)
+        if baseline is None:
+            baseline = results
+        same = "✅ identical" if results == baseline else "❌ differs from 1 worker"
+        print(f"   {workers:2d} workers: {elapsed:6.2f}s  {total_fills / elapsed:>12,.0f} fills/s  {trades:,} trades  {same}")
+
+if __name__ == '__main__':
+    main()
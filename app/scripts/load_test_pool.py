@@ -0,0 +1,175 @@
+import argparse
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import requests
+from flask import Flask
+from sqlalchemy import event
+from werkzeug.serving import make_server
+from app.main import app
+from app.db.config import database_uri, engine_options
+from app.db.models import db, Order, Trade, PositionState, DailyPnl
+
+# Load test for the connection pool: concurrent GET /api/pnl/daily readers plus
+# POST /api/trades/import writers against a local threaded server, once per engine
+# profile. 'baseline' is the old config (search_path only, SQLAlchemy's default
+# 5 + 10 pool with a 30s wait). For each profile it prints latency percentiles and
+# the peak number of checked-out connections - peak == pool capacity means requests
+# were queueing for a connection.
+# Point it at a scratch database - imports write loadtest-* accounts (removed at the end):
+#   python -m app.scripts.load_test_pool --db postgresql://localhost/trading_journal_test
+#   python -m app.scripts.load_test_pool --profiles baseline,prod-gunicorn --clients 40 --seconds 20
+
+LOADTEST_PREFIX = 'loadtest-'
+BASELINE_OPTIONS = {'connect_args': {'options': '-csearch_path=trade'}}
+
+
+def build_app(profile: str, uri: str) -> Flask:
+    """a fresh app with the API blueprints and its own engine for this profile"""
+    profile_app = Flask(f'load_test_{profile}')
+    for blueprint in app.blueprints.values():
+        profile_app.register_blueprint(blueprint)
+    profile_app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    profile_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    profile_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = (
+        BASELINE_OPTIONS if profile == 'baseline' else engine_options(profile, uri)
+    )
+    db.init_app(profile_app)
+    return profile_app
+
+
+def orders_csv(account: str, fills: int) -> str:
+    start = datetime(2026, 1, 5, 6, 30)
+    lines = ["orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status,Type"]
+    for i in range(fills):
+        fill_time = start + timedelta(seconds=37 * i)
+        lines.append(f"{i},{account},{'Buy' if i % 2 == 0 else 'Sell'},MGCG6,MGC,{2000 + i % 7}.5,1,"
+                     f"{fill_time:%m/%d/%Y %H:%M:%S},Filled,Market")
+    return "\n".join(lines) + "\n"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile: str, uri: str, clients: int, seconds: float, import_every: int, fills: int) -> dict:
+    profile_app = build_app(profile, uri)
+    with profile_app.app_context():
+        engine = db.engine
+        db.create_all()
+
+    # peak checked-out connections, from pool events
+    pool_stats = {'out': 0, 'peak': 0}
+    pool_lock = threading.Lock()
+
+    def on_checkout(*_):
+        with pool_lock:
+            pool_stats['out'] += 1
+            pool_stats['peak'] = max(pool_stats['peak'], pool_stats['out'])
+
+    def on_checkin(*_):
+        with pool_lock:
+            pool_stats['out'] -= 1
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+
+    server = make_server('127.0.0.1', 0, profile_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    latencies = {'pnl': [], 'import': []}
+    failures = {'pnl': 0, 'import': 0}
+    counter = itertools.count()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            n = next(counter)
+            if n % import_every == 0:
+                kind = 'import'
+                account = f"{LOADTEST_PREFIX}{profile[:4]}{n}"
+                call = lambda: session.post(f"{base_url}/api/trades/import", json={
+                    'csv_text': orders_csv(account, fills), 'default_acc_id': account,
+                    'bulk': True, 'incremental': True,
+                }, timeout=120)
+            else:
+                kind = 'pnl'
+                call = lambda: session.get(f"{base_url}/api/pnl/daily",
+                                           params={'start_date': '2026-01-01', 'end_date': '2026-01-31'},
+                                           timeout=120)
+            started = time.perf_counter()
+            try:
+                ok = call().status_code < 400
+            except requests.RequestException:
+                ok = False
+            latencies[kind].append(time.perf_counter() - started)
+            if not ok:
+                failures[kind] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(client)
+    elapsed = time.perf_counter() - started
+
+    server.shutdown()
+    capacity = engine.pool.size() + max(0, getattr(engine.pool, '_max_overflow', 0))
+    with profile_app.app_context():
+        cleanup()
+    engine.dispose()
+
+    return {
+        'profile': profile,
+        'requests': sum(len(v) for v in latencies.values()),
+        'rps': sum(len(v) for v in latencies.values()) / elapsed,
+        'latencies': latencies,
+        'failures': failures,
+        'peak_connections': pool_stats['peak'],
+        'capacity': capacity,
+    }
+
+
+def cleanup():
+    pattern = f"{LOADTEST_PREFIX}%"
+    Trade.query.filter(Trade.acc_id.like(pattern)).delete(synchronize_session=False)
+    Order.query.filter(Order.account.like(pattern)).delete(synchronize_session=False)
+    PositionState.query.filter(PositionState.account.like(pattern)).delete(synchronize_session=False)
+    DailyPnl.query.filter(DailyPnl.acc_id.like(pattern)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pool load test: concurrent /api/pnl/daily + imports per engine profile")
+    parser.add_argument('--db', default=None, help="database URL (default: DATABASE_URL / the app's default)")
+    parser.add_argument('--profiles', default="baseline,dev,prod-gunicorn",
+                        help="comma separated, 'baseline' = the old search_path-only options")
+    parser.add_argument('--clients', type=int, default=32, help="concurrent client threads")
+    parser.add_argument('--seconds', type=float, default=15, help="duration per profile")
+    parser.add_argument('--import-every', type=int, default=10, help="every Nth request is an import")
+    parser.add_argument('--fills', type=int, default=200, help="orders per imported CSV")
+    args = parser.parse_args()
+    uri = args.db or database_uri()
+
+    print(f"🔌 {uri}: {args.clients} clients x {args.seconds:.0f}s per profile, 1 in {args.import_every} requests imports {args.fills} orders\n")
+    print(f"   {'profile':<14} {'req/s':>7} {'pnl p50':>8} {'pnl p95':>8} {'pnl max':>8} "
+          f"{'imp p50':>8} {'imp p95':>8} {'fails':>6} {'peak/capacity':>14}")
+    for profile in args.profiles.split(','):
+        result = run_profile(profile.strip(), uri, args.clients, args.seconds, args.import_every, args.fills)
+        pnl, imports = result['latencies']['pnl'], result['latencies']['import']
+        saturated = "⚠️ " if result['peak_connections'] >= result['capacity'] else "✅"
+        print(f"   {result['profile']:<14} {result['rps']:7.1f} "
+              f"{percentile(pnl, 50) * 1000:7.0f}ms {percentile(pnl, 95) * 1000:7.0f}ms {max(pnl, default=0) * 1000:7.0f}ms "
+              f"{percentile(imports, 50) * 1000:7.0f}ms {percentile(imports, 95) * 1000:7.0f}ms "
+              f"{sum(result['failures'].values()):6d} {saturated} {result['peak_connections']:>3}/{result['capacity']:<3}")
+
+    print("\n   ⚠️  = every pooled connection was checked out at some point, so requests waited on the pool")
+
+if __name__ == '__main__':
+    main()
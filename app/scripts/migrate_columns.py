@@ -0,0 +1,81 @@
+import argparse
+from sqlalchemy import inspect
+from app.main import app
+from app.db.models import db, Order, PositionState, Trade
+
+# db.create_all() only creates missing tables, it never changes the columns of an
+# existing one. This brings the columns of an existing database in line with the
+# models (safe to re-run, columns that already match are skipped):
+#   python -m app.scripts.migrate_columns            # alter / add columns
+#   python -m app.scripts.migrate_columns --dry-run  # just print the DDL
+
+# (model, column) whose type changed: ALTER COLUMN ... TYPE <the model's type>
+RETYPED_COLUMNS = [
+    # prices keep 6 places (HG / SI ticks are 0.0005 / 0.005), were NUMERIC(10,2)
+    (Trade, 'entry_price'),
+    (Trade, 'exit_price'),
+    (Order, 'avg_price'),
+    (Order, 'limit_price'),
+    (Order, 'stop_price'),
+]
+
+
+# (model, column) added to a table that already existed: ADD COLUMN (nullable)
+ADDED_COLUMNS = [
+    # open position cost for /api/positions
+    (PositionState, 'avg_entry_price'),
+    (PositionState, 'opened_at'),
+    # incremental matcher: walked-but-unmatchable orders aren't late fills
+    (PositionState, 'skipped_order_ids'),
+]
+
+
+def _same_type(existing, wanted) -> bool:
+    precision = getattr(wanted, 'precision', None)
+    if precision is None:
+        return existing._type_affinity is wanted._type_affinity
+    return (getattr(existing, 'precision', None), getattr(existing, 'scale', None)) == (precision, wanted.scale)
+
+
+def migrate_columns(dry_run: bool = False) -> int:
+    """run the column DDL the database is missing, returns the number of statements"""
+    dialect = db.engine.dialect
+    inspector = inspect(db.engine)
+    statements = []
+
+    for model, name in RETYPED_COLUMNS:
+        table = model.__table__
+        existing = {c['name']: c for c in inspector.get_columns(table.name, schema=table.schema)}
+        column = table.c[name]
+        if name in existing and not _same_type(existing[name]['type'], column.type):
+            statements.append(f"ALTER TABLE {table.fullname} ALTER COLUMN {name} "
+                              f"TYPE {column.type.compile(dialect=dialect)}")
+
+    for model, name in ADDED_COLUMNS:
+        table = model.__table__
+        existing = {c['name'] for c in inspector.get_columns(table.name, schema=table.schema)}
+        if existing and name not in existing:
+            statements.append(f"ALTER TABLE {table.fullname} ADD COLUMN {name} "
+                              f"{table.c[name].type.compile(dialect=dialect)}")
+
+    for statement in statements:
+        print(f"  {statement}")
+        if not dry_run:
+            db.session.execute(db.text(statement))
+    if not dry_run:
+        db.session.commit()
+    return len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alter / add columns of an existing database to match the models")
+    parser.add_argument('--dry-run', action='store_true', help="print the DDL without running it")
+    args = parser.parse_args()
+
+    with app.app_context():
+        print("Migrating columns")
+        count = migrate_columns(args.dry_run)
+        print(f"Done ({count} statements)" if count else "Done (nothing to change)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+import argparse
+from sqlalchemy.schema import CreateIndex, DropIndex
+from app.main import app
+from app.db.models import db, Order, Trade
+
+# Indexes declared in __table_args__ are only created by db.create_all() for new tables.
+# This brings an existing database in line (safe to re-run):
+#   python -m app.scripts.migrate_indexes            # create missing indexes
+#   python -m app.scripts.migrate_indexes --drop     # drop them again (e.g. for before/after benchmarks)
+#   python -m app.scripts.migrate_indexes --dry-run  # just print the DDL
+
+MANAGED_TABLES = [Order, Trade]
+
+# indexes an earlier version of this script created that have since been replaced
+RETIRED_INDEXES = [
+    'trade.ix_trades_exit_time',  # superseded by ix_trades_exit_time_id
+]
+
+
+def managed_indexes():
+    indexes = []
+    for model in MANAGED_TABLES:
+        indexes.extend(sorted(model.__table__.indexes, key=lambda i: i.name))
+    return indexes
+
+
+def create_indexes(dry_run: bool = False):
+    for name in RETIRED_INDEXES:
+        print(f"  DROP INDEX IF EXISTS {name}")
+        if not dry_run:
+            db.session.execute(db.text(f"DROP INDEX IF EXISTS {name}"))
+    for index in managed_indexes():
+        ddl = CreateIndex(index, if_not_exists=True)
+        print(f"  {ddl.compile(dialect=db.engine.dialect)}")
+        if not dry_run:
+            db.session.execute(ddl)
+    if not dry_run:
+        db.session.commit()
+        # fresh statistics so the planner picks the new indexes up right away
+        for model in MANAGED_TABLES:
+            db.session.execute(db.text(f"ANALYZE {model.__table__.fullname}"))
+        db.session.commit()
+
+
+def drop_indexes(dry_run: bool = False):
+    for index in managed_indexes():
+        ddl = DropIndex(index, if_exists=True)
+        print(f"  {ddl.compile(dialect=db.engine.dialect)}")
+        if not dry_run:
+            db.session.execute(ddl)
+    if not dry_run:
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or drop the managed trade/order indexes")
+    parser.add_argument('--drop', action='store_true', help="drop the managed indexes instead of creating them")
+    parser.add_argument('--dry-run', action='store_true', help="print the DDL without running it")
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.drop:
+            print("Dropping managed indexes")
+            drop_indexes(args.dry_run)
+        else:
+            print("Creating managed indexes")
+            create_indexes(args.dry_run)
+        print("Done")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+from app.main import app
+from app.db.models import db, DailyPnl, Trade
+from app.services.daily_rollup import rebuild_daily_rollup
+
+# Recomputes the trade.daily_pnl rollup from the trades table.
+# Run once after upgrading (trades created before the rollup existed aren't in it, and
+# rows written under an older session calendar are on the wrong trading day - the dev
+# server does this on start, see ensure_rollup_current) or any time the rollup looks off:
+#   python -m app.scripts.rebuild_daily_pnl
+
+def main():
+
+    print("Rebuilding daily_pnl rollup")
+
+    with app.app_context():
+        db.create_all()  # make sure the rollup table exists
+
+        trades_count = Trade.query.count()
+        rows = rebuild_daily_rollup()
+
+        print(f"\n📊 Summary:")
+        print(f"   📈 Trades aggregated: {trades_count}")
+        print(f"   🗓️  Rollup rows written: {rows}")
+        print(f"   💰 Total PnL in rollup: {float(db.session.query(db.func.coalesce(db.func.sum(DailyPnl.pnl), 0)).scalar()):.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+import argparse
+from app.main import app
+from app.db.models import db
+from app.ingestion.tradovate import TradovateClient, TradovateError, sync_orders
+
+# Pulls filled orders + fills from the Tradovate API into the orders table and matches
+# the new fills into trades. Credentials / URL come from TRADOVATE_* (see .env.example):
+#   python -m app.scripts.sync_tradovate
+#   python -m app.scripts.sync_tradovate --no-match --concurrency 16
+# Offline, against the mock server: python -m app.tests.mock_tradovate, then
+#   TRADOVATE_URL=http://127.0.0.1:8765/v1 TRADOVATE_USERNAME=demo TRADOVATE_PASSWORD=demo python -m app.scripts.sync_tradovate
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync filled orders from Tradovate")
+    parser.add_argument('--no-match', action='store_true', help="only store the orders, don't match them into trades")
+    parser.add_argument('--concurrency', type=int, default=None, help="max in-flight API requests (TRADOVATE_CONCURRENCY)")
+    args = parser.parse_args()
+
+    print("Syncing orders from Tradovate")
+
+    with app.app_context(), TradovateClient(max_in_flight=args.concurrency) as client:
+        db.create_all()
+        print(f"   🌐 API: {client.base_url} ({client.max_in_flight} requests in flight max)")
+        try:
+            result = sync_orders(client, match=not args.no_match)
+        except TradovateError as e:
+            print(f"❌ Sync failed: {e}")
+            return
+
+        print(f"\n📊 Summary:")
+        print(f"   📥 Filled orders fetched: {result['orders_fetched']}")
+        print(f"   🆕 New orders: {result['orders_new']}")
+        print(f"   💾 Orders inserted: {result['orders_inserted']}")
+        if 'trades_created' in result:
+            print(f"   📈 Trades created: {result['trades_created']}")
+        print(f"   ⏱️  Elapsed: {result['elapsed_sec']}s")
+        for error in result['errors'][:20]:
+            print(f"   ⚠️  {error}")
+
+if __name__ == '__main__':
+    main()
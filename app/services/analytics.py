@@ -0,0 +1,206 @@
+from typing import Dict, Optional, Sequence
+import numpy as np
+from app.utils.session_calendar import session_day_array
+from app.utils.trading_day import trading_day_array
+
+# Performance stats over a set of trades, computed on column arrays (one numpy
+# array per field) instead of looping over Trade objects.
+# Same definitions as the frontend's AnalyticsDashboard so the numbers line up.
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def load_trade_columns(query) -> Dict[str, np.ndarray]:
+    """
+    Pull exit_time / pnl for a (filtered) Trade query into numpy arrays, oldest exit first.
+
+    Only exit_time, symbol (for the session calendar) and pnl leave the database, pnl
+    already cast to float.
+
+    Returns:
+        {'exit_time': datetime64[us] array, 'pnl': float64 array, 'trading_day': datetime64[D] array}
+    """
+    from app.db.models import db, Trade
+
+    rows = (
+        query.with_entities(Trade.exit_time, Trade.symbol, db.cast(Trade.pnl, db.Float))
+        .order_by(Trade.exit_time, Trade.id)
+        .all()
+    )
+
+    exit_time = np.array([row[0] for row in rows], dtype='datetime64[us]')
+    pnl = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    return {
+        'exit_time': exit_time,
+        'pnl': pnl,
+        'trading_day': trading_days(exit_time, [row[1] for row in rows]),
+    }
+
+
+def trading_days(exit_time: np.ndarray, symbols: Optional[Sequence[str]] = None,
+                 market_close_hour: int = 15) -> np.ndarray:
+    """
+    Trading day of each naive exit time as datetime64[D]: on each symbol's session
+    calendar, or with symbols=None the default cutoff (vectorised get_trading_day).
+    """
+    if symbols is None:
+        return trading_day_array(exit_time, market_close_hour)
+    return session_day_array(exit_time, symbols)
+
+
+def compute_summary(pnl: np.ndarray, trading_day: Optional[np.ndarray] = None) -> Dict:
+    """
+    Summary stats for per-trade pnl in exit order.
+
+    trading_day (same length as pnl) enables the daily stats: Sharpe / Sortino are
+    on daily PnL (annualised with 252 days), since per-trade returns depend on how
+    often you trade. Without it those come back as None.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    count = int(pnl.size)
+    if count == 0:
+        return _empty_summary()
+
+    win_count = int(np.count_nonzero(pnl > 0))
+    loss_count = int(np.count_nonzero(pnl < 0))
+    total_wins = float(np.maximum(pnl, 0.0).sum())
+    total_losses = float(-np.minimum(pnl, 0.0).sum())
+
+    equity = np.cumsum(pnl)
+    drawdown = drawdown_series(equity)
+    max_dd_at = int(np.argmax(drawdown))
+
+    streaks = _streaks(pnl)
+
+    summary = {
+        'total_pnl': round(float(equity[-1]), 2),
+        'total_trades': count,
+        'winning_trades': win_count,
+        'losing_trades': loss_count,
+        'breakeven_trades': count - win_count - loss_count,
+        'win_rate': win_count / count * 100,
+        'avg_win': total_wins / win_count if win_count else 0.0,
+        'avg_loss': total_losses / loss_count if loss_count else 0.0,
+        'largest_win': max(float(pnl.max()), 0.0),
+        'largest_loss': min(float(pnl.min()), 0.0),
+        # 0 when there are no losses, same as the dashboard
+        'profit_factor': total_wins / total_losses if total_losses > 0 else 0.0,
+        # average pnl per trade = win% * avg win - loss% * avg loss
+        'expectancy': float(pnl.mean()),
+        'max_drawdown': float(drawdown[max_dd_at]),
+        'max_drawdown_trade_index': max_dd_at if drawdown[max_dd_at] > 0 else None,
+        **streaks,
+        'sharpe_ratio': None,
+        'sortino_ratio': None,
+        'trading_days': None,
+    }
+
+    if trading_day is not None:
+        days, daily_pnl = daily_totals(pnl, trading_day)
+        summary['trading_days'] = int(days.size)
+        summary['sharpe_ratio'], summary['sortino_ratio'] = _sharpe_sortino(daily_pnl)
+
+    return summary
+
+
+def drawdown_series(equity: np.ndarray) -> np.ndarray:
+    """distance below the running equity peak (peak starts at 0, the flat account)"""
+    peak = np.maximum.accumulate(np.maximum(equity, 0.0))
+    return peak - equity
+
+
+def daily_totals(pnl: np.ndarray, trading_day: np.ndarray):
+    """(sorted unique trading days, pnl summed per day)"""
+    if trading_day.size == 0:
+        return trading_day, pnl[:0]
+    if np.all(trading_day[1:] >= trading_day[:-1]):
+        # already in exit order (load_trade_columns): days are contiguous runs, no sort needed
+        starts = np.flatnonzero(np.concatenate(([True], trading_day[1:] != trading_day[:-1])))
+        return trading_day[starts], np.add.reduceat(pnl, starts)
+    days, day_index = np.unique(trading_day, return_inverse=True)
+    return days, np.bincount(day_index.ravel(), weights=pnl, minlength=days.size)
+
+
+def equity_curve(pnl: np.ndarray, trading_day: Optional[np.ndarray] = None,
+                 exit_time: Optional[np.ndarray] = None, by: str = 'daily') -> list:
+    """
+    Equity + drawdown points for charting.
+
+    by='daily': one point per trading day (end-of-day equity), needs trading_day
+    by='trade': one point per trade, needs exit_time
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    if by == 'daily':
+        days, daily_pnl = daily_totals(pnl, trading_day)
+        labels = days.astype(str)
+        equity = np.cumsum(daily_pnl)
+        key = 'date'
+    elif by == 'trade':
+        labels = np.datetime_as_string(exit_time, unit='s')
+        equity = np.cumsum(pnl)
+        key = 'exit_time'
+    else:
+        raise ValueError(f"Unknown equity curve granularity: {by}. Must be 'daily' or 'trade'")
+
+    drawdown = drawdown_series(equity)
+    return [
+        {key: label, 'equity': round(eq, 2), 'drawdown': round(dd, 2)}
+        for label, eq, dd in zip(labels.tolist(), equity.tolist(), drawdown.tolist())
+    ]
+
+
+def _streaks(pnl: np.ndarray) -> Dict:
+    """longest winning / losing runs and the current run (+n wins, -n losses), breakevens break a run"""
+    sign = (pnl > 0).view(np.int8) - (pnl < 0).view(np.int8)
+    # start index of every run of equal signs
+    starts = np.flatnonzero(np.concatenate(([True], sign[1:] != sign[:-1])))
+    lengths = np.diff(np.append(starts, sign.size))
+    run_sign = sign[starts]
+
+    win_runs = lengths[run_sign > 0]
+    loss_runs = lengths[run_sign < 0]
+    return {
+        'max_win_streak': int(win_runs.max()) if win_runs.size else 0,
+        'max_loss_streak': int(loss_runs.max()) if loss_runs.size else 0,
+        'current_streak': int(lengths[-1] * run_sign[-1]),
+    }
+
+
+def _sharpe_sortino(daily_pnl: np.ndarray):
+    """annualised Sharpe / Sortino of daily PnL (risk-free rate 0); None when undefined"""
+    if daily_pnl.size < 2:
+        return None, None
+    mean = daily_pnl.mean()
+    scale = np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    std = daily_pnl.std(ddof=1)
+    sharpe = float(mean / std * scale) if std > 0 else None
+
+    downside = np.sqrt(np.mean(np.minimum(daily_pnl, 0.0) ** 2))
+    sortino = float(mean / downside * scale) if downside > 0 else None
+    return sharpe, sortino
+
+
+def _empty_summary() -> Dict:
+    return {
+        'total_pnl': 0.0,
+        'total_trades': 0,
+        'winning_trades': 0,
+        'losing_trades': 0,
+        'breakeven_trades': 0,
+        'win_rate': 0.0,
+        'avg_win': 0.0,
+        'avg_loss': 0.0,
+        'largest_win': 0.0,
+        'largest_loss': 0.0,
+        'profit_factor': 0.0,
+        'expectancy': 0.0,
+        'max_drawdown': 0.0,
+        'max_drawdown_trade_index': None,
+        'max_win_streak': 0,
+        'max_loss_streak': 0,
+        'current_streak': 0,
+        'sharpe_ratio': None,
+        'sortino_ratio': None,
+        'trading_days': 0,
+    }
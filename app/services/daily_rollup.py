@@ -0,0 +1,156 @@
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, select
+from app.db.models import DailyPnl, RollupVersion, Trade, db
+from app.utils.session_calendar import CALENDAR_VERSION, session_day_ordinals
+
+ROLLUP_NAME = 'daily_pnl'
+
+
+def _upsert_insert():
+    """the dialect's insert() with on_conflict_do_update (PostgreSQL, or SQLite for local runs)"""
+    if db.session.connection().dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+
+def apply_trades_to_rollup(trades: Iterable[Trade]) -> int:
+    """
+    Add newly created trades to the daily_pnl rollup.
+
+    Runs inside the caller's session: call it before the commit that writes the
+    trades so both land in the same transaction.
+
+    Returns:
+        number of (account, symbol, trading_day) rows touched
+    """
+    trades = list(trades)
+    ordinals = session_day_ordinals([trade.exit_time for trade in trades], [trade.symbol for trade in trades])
+
+    deltas: Dict[tuple, list] = {}
+    for trade, ordinal in zip(trades, ordinals.tolist()):
+        day = date.fromordinal(ordinal)
+        pnl = Decimal(str(trade.pnl))
+        delta = deltas.setdefault((trade.acc_id, trade.symbol, day), [Decimal('0'), 0, 0, 0])
+        delta[0] += pnl
+        delta[1] += 1
+        delta[2] += 1 if pnl > 0 else 0
+        delta[3] += 1 if pnl < 0 else 0
+
+    if not deltas:
+        return 0
+
+    # one INSERT ... ON CONFLICT DO UPDATE adding the deltas to the stored totals, so two
+    # imports landing on the same day can't both read the old row and lose an update
+    now = datetime.utcnow()
+    table = DailyPnl.__table__
+    stmt = _upsert_insert()(table).values([
+        {'acc_id': acc_id, 'symbol': symbol, 'trading_day': day, 'pnl': pnl, 'trade_count': count,
+         'winning_trades': wins, 'losing_trades': losses, 'updated_at': now}
+        for (acc_id, symbol, day), (pnl, count, wins, losses) in deltas.items()
+    ])
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.acc_id, table.c.symbol, table.c.trading_day],
+        set_={
+            'pnl': table.c.pnl + stmt.excluded.pnl,
+            'trade_count': table.c.trade_count + stmt.excluded.trade_count,
+            'winning_trades': table.c.winning_trades + stmt.excluded.winning_trades,
+            'losing_trades': table.c.losing_trades + stmt.excluded.losing_trades,
+            'updated_at': stmt.excluded.updated_at,
+        }
+    ))
+
+    return len(deltas)
+
+
+def rebuild_daily_rollup() -> int:
+    """
+    Recompute the whole daily_pnl table from the trades table: one select of
+    acc_id / symbol / exit_time / pnl, bucketed on each product's session calendar,
+    then one bulk insert. Commits.
+
+    Returns:
+        number of rollup rows written
+    """
+    rows = db.session.execute(select(Trade.acc_id, Trade.symbol, Trade.exit_time, Trade.pnl)).all()
+    ordinals = session_day_ordinals([row[2] for row in rows], [row[1] for row in rows])
+
+    totals: Dict[tuple, list] = {}
+    for (acc_id, symbol, _, pnl), ordinal in zip(rows, ordinals.tolist()):
+        pnl = Decimal(str(pnl or 0))
+        total = totals.setdefault((acc_id, symbol, ordinal), [Decimal('0'), 0, 0, 0])
+        total[0] += pnl
+        total[1] += 1
+        total[2] += 1 if pnl > 0 else 0
+        total[3] += 1 if pnl < 0 else 0
+
+    now = datetime.utcnow()
+    try:
+        DailyPnl.query.delete()
+        # the rows written below are on the current session calendar
+        db.session.merge(RollupVersion(name=ROLLUP_NAME, calendar_version=CALENDAR_VERSION, updated_at=now))
+        if totals:
+            db.session.execute(DailyPnl.__table__.insert(), [
+                {'acc_id': acc_id, 'symbol': symbol, 'trading_day': date.fromordinal(ordinal), 'pnl': pnl,
+                 'trade_count': count, 'winning_trades': wins, 'losing_trades': losses, 'updated_at': now}
+                for (acc_id, symbol, ordinal), (pnl, count, wins, losses) in totals.items()
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(totals)
+
+
+def ensure_rollup_current() -> bool:
+    """
+    Rebuild the daily_pnl rollup if it was built on an older session calendar (or
+    before versions were recorded), so days written under the old trading-day rule
+    don't stay wrong. Cheap when it's current: one primary key lookup. Commits.
+
+    Returns:
+        True if the rollup was rebuilt
+    """
+    version = db.session.get(RollupVersion, ROLLUP_NAME)
+    if version is not None and version.calendar_version == CALENDAR_VERSION:
+        return False
+    rebuild_daily_rollup()
+    return True
+
+
+def read_daily_rollup(start_day: Optional[date] = None, end_day: Optional[date] = None,
+                      symbol: Optional[str] = None) -> List[Dict]:
+    """
+    Daily totals across accounts (and symbols, unless one is given) from the rollup,
+    one dict per trading day in date order.
+    """
+    query = db.session.query(
+        DailyPnl.trading_day,
+        func.sum(DailyPnl.pnl),
+        func.sum(DailyPnl.trade_count),
+        func.sum(DailyPnl.winning_trades),
+        func.sum(DailyPnl.losing_trades),
+    )
+    if start_day:
+        query = query.filter(DailyPnl.trading_day >= start_day)
+    if end_day:
+        query = query.filter(DailyPnl.trading_day <= end_day)
+    if symbol:
+        query = query.filter(DailyPnl.symbol == symbol)
+
+    rows = query.group_by(DailyPnl.trading_day).order_by(DailyPnl.trading_day).all()
+    return [
+        {
+            'date': trading_day.isoformat(),
+            'pnl': round(float(pnl), 2),
+            'trade_count': int(trade_count),
+            'winning_trades': int(winning_trades),
+            'losing_trades': int(losing_trades)
+        }
+        for trading_day, pnl, trade_count, winning_trades, losing_trades in rows
+        if trade_count
+    ]
@@ -0,0 +1,230 @@
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+import numpy as np
+from app.utils.session_calendar import product_root
+
+# Instrument master: tick size, point value and per-side commission per product root.
+#
+# Trade pnl is in dollars:
+#   (exit - entry) * direction * quantity * point_value - 2 * commission_per_side * quantity
+# (a round trip pays the commission on the entry and on the exit of every contract).
+#
+# Specs come from the instruments table, falling back to DEFAULT_INSTRUMENTS. Roots in
+# neither are priced at point value 1 with no fees, i.e. the old points-only pnl.
+# The table is tiny and read on every match, so it's cached in-process and dropped by
+# invalidate_instrument_cache() after writes (other processes pick changes up after
+# MAX_AGE_SEC). When the fee schedule changes, run_reprice_job re-prices the stored
+# matcher-built trades from their fills, in batches.
+
+MAX_AGE_SEC = 300
+
+
+class InstrumentSpec(NamedTuple):
+    tick_size: float
+    point_value: float  # $ per 1.0 of price per contract
+    commission_per_side: float = 0.0  # $ per contract per fill side
+
+
+# CME / COMEX contract specs; commissions depend on the broker, set them in the table
+DEFAULT_INSTRUMENTS: Dict[str, InstrumentSpec] = {
+    'ES': InstrumentSpec(0.25, 50.0), 'MES': InstrumentSpec(0.25, 5.0),
+    'NQ': InstrumentSpec(0.25, 20.0), 'MNQ': InstrumentSpec(0.25, 2.0),
+    'YM': InstrumentSpec(1.0, 5.0), 'MYM': InstrumentSpec(1.0, 0.5),
+    'RTY': InstrumentSpec(0.1, 50.0), 'M2K': InstrumentSpec(0.1, 5.0),
+    'GC': InstrumentSpec(0.1, 100.0), 'MGC': InstrumentSpec(0.1, 10.0),
+    'SI': InstrumentSpec(0.005, 5000.0), 'SIL': InstrumentSpec(0.005, 1000.0),
+    'HG': InstrumentSpec(0.0005, 25000.0), 'MHG': InstrumentSpec(0.0005, 2500.0),
+}
+
+UNKNOWN_INSTRUMENT = InstrumentSpec(0.01, 1.0, 0.0)
+
+DIRECTION_SIGN = {'LONG': 1.0, 'SHORT': -1.0}
+
+_instruments: Optional[Dict[str, InstrumentSpec]] = None
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def get_instruments() -> Dict[str, InstrumentSpec]:
+    """root -> spec: the defaults overlaid with the instruments table (cached)"""
+    global _instruments, _loaded_at
+    instruments = _instruments
+    if instruments is not None and time.monotonic() - _loaded_at < MAX_AGE_SEC:
+        return instruments
+    from app.db.models import db, Instrument
+
+    with _lock:
+        rows = db.session.execute(db.select(
+            Instrument.root, db.cast(Instrument.tick_size, db.Float), db.cast(Instrument.point_value, db.Float),
+            db.cast(Instrument.commission_per_side, db.Float),
+        )).all()
+        instruments = dict(DEFAULT_INSTRUMENTS)
+        instruments.update({root: InstrumentSpec(tick, value, commission or 0.0) for root, tick, value, commission in rows})
+        _instruments, _loaded_at = instruments, time.monotonic()
+        return instruments
+
+
+def invalidate_instrument_cache() -> None:
+    """drop the cached specs; call after committing a change to the instruments table"""
+    global _instruments
+    _instruments = None
+
+
+def instrument_for(symbol: Optional[str], instruments: Optional[Dict[str, InstrumentSpec]] = None) -> InstrumentSpec:
+    """spec for a contract (MGCG6) or root (MGC)"""
+    instruments = get_instruments() if instruments is None else instruments
+    return instruments.get(product_root(symbol), UNKNOWN_INSTRUMENT)
+
+
+def price_pnl(direction_sign: np.ndarray, entry_price: np.ndarray, exit_price: np.ndarray,
+              quantity: np.ndarray, spec: InstrumentSpec) -> np.ndarray:
+    """dollar pnl, net of commissions and rounded to cents, for arrays of round trips on one instrument"""
+    gross = (exit_price - entry_price) * direction_sign * quantity * spec.point_value
+    return np.round(gross - 2.0 * spec.commission_per_side * quantity, 2)
+
+
+def trade_pnl(direction: str, entry_price: float, exit_price: float, quantity: int, symbol: Optional[str]) -> float:
+    """price_pnl for a single trade"""
+    return float(price_pnl(np.float64(DIRECTION_SIGN[direction]), np.float64(entry_price),
+                           np.float64(exit_price), np.float64(quantity), instrument_for(symbol)))
+
+
+def price_trade_records(records: List[Dict[str, Any]], symbol: str) -> None:
+    """
+    Replace the points pnl of match_fills records for one contract with dollar pnl,
+    one vectorised pass for the whole group.
+    """
+    if not records:
+        return
+    pnl = price_pnl(
+        np.array([DIRECTION_SIGN[record['direction']] for record in records]),
+        np.array([record['entry_price'] for record in records], dtype=np.float64),
+        np.array([record['exit_price'] for record in records], dtype=np.float64),
+        np.array([record['quantity'] for record in records], dtype=np.float64),
+        instrument_for(symbol),
+    )
+    for record, value in zip(records, pnl.tolist()):
+        record['pnl'] = value
+
+
+def upsert_instrument(root: str, tick_size: float, point_value: float, commission_per_side: float = 0.0) -> Dict:
+    """add or change a root's spec (commits and drops the cache)"""
+    from app.db.models import db, Instrument
+
+    root = product_root(root)
+    instrument = db.session.get(Instrument, root)
+    if instrument is None:
+        instrument = Instrument(root=root)
+        db.session.add(instrument)
+    instrument.tick_size = Decimal(str(tick_size))
+    instrument.point_value = Decimal(str(point_value))
+    instrument.commission_per_side = Decimal(str(commission_per_side))
+    instrument.updated_at = datetime.utcnow()
+    db.session.commit()
+    invalidate_instrument_cache()
+    return instrument.to_dict()
+
+
+def fills_round_trip(direction: str, fills: Optional[List[Dict[str, Any]]]) -> Optional[tuple]:
+    """
+    (entry price, exit price, quantity) of a matcher-built trade from its fills, the
+    way the matchers priced it: qty-weighted entry / exit prices, quantity = entry qty.
+    None if the fills don't describe a round trip (e.g. manual trades have none).
+    """
+    if not fills or direction not in DIRECTION_SIGN:
+        return None
+    entry_is_buy = direction == 'LONG'
+    entry_qty = exit_qty = 0
+    entry_value = exit_value = 0.0
+    for fill in fills:
+        qty, price = fill.get('filled_qty'), fill.get('avg_price')
+        if not qty or price is None:
+            continue
+        if bool(fill.get('is_buy')) == entry_is_buy:
+            entry_qty += qty
+            entry_value += price * qty
+        else:
+            exit_qty += qty
+            exit_value += price * qty
+    if entry_qty == 0 or exit_qty == 0:
+        return None
+    return entry_value / entry_qty, exit_value / exit_qty, entry_qty
+
+
+def run_reprice_job(progress: Dict[str, Any], roots: Optional[Iterable[str]] = None,
+                    batch_size: int = 2000) -> Dict[str, Any]:
+    """
+    Re-price matcher-built trades with the current instrument specs (all of them, or
+    only the given roots), then rebuild the daily_pnl rollup and drop the trade snapshot.
+
+    pnl is re-derived from each trade's fills (the order prices and quantities it was
+    matched from), not from the rounded entry/exit columns. Trades without fills -
+    manual POST /api/trades rows, trade-CSV imports - keep the pnl they were given.
+    Trades are read in id order a batch at a time (keyset, so updates don't disturb the
+    scan) and only rows whose pnl changes are written, one bulk UPDATE + commit per batch.
+
+    progress goes through stage 'repricing' -> 'rollup' -> 'done' with trades_scanned,
+    trades_skipped (no fills) and trades_updated along the way.
+    """
+    from app.db.models import db, Trade
+    from app.services.daily_rollup import rebuild_daily_rollup
+    from app.services.trade_cache import invalidate_trade_cache
+
+    roots = {product_root(root) for root in roots} if roots else None
+    instruments = get_instruments()
+    progress.update({'stage': 'repricing', 'trades_scanned': 0, 'trades_skipped': 0, 'trades_updated': 0})
+
+    query = db.select(Trade.id, Trade.symbol, Trade.direction, Trade.fills, db.cast(Trade.pnl, db.Float))
+    if roots:
+        # contracts start with their root; exact roots are checked below
+        query = query.where(db.or_(*[Trade.symbol.like(f"{root}%") for root in roots]))
+
+    last_id = None
+    while True:
+        page = query.order_by(Trade.id).limit(batch_size)
+        if last_id is not None:
+            page = page.where(Trade.id > last_id)
+        rows = db.session.execute(page).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        progress['trades_scanned'] += len(rows)
+
+        updates = []
+        by_symbol: Dict[str, List[tuple]] = {}
+        for trade_id, symbol, direction, fills, old_pnl in rows:
+            if roots and product_root(symbol) not in roots:
+                continue
+            round_trip = fills_round_trip(direction, fills)
+            if round_trip is None:
+                progress['trades_skipped'] += 1
+                continue
+            by_symbol.setdefault(symbol, []).append((trade_id, DIRECTION_SIGN[direction], *round_trip, old_pnl))
+        for symbol, group in by_symbol.items():
+            ids, signs, entry, exit_, quantity, old_pnl = zip(*group)
+            pnl = price_pnl(np.array(signs), np.array(entry, dtype=np.float64), np.array(exit_, dtype=np.float64),
+                            np.array(quantity, dtype=np.float64), instrument_for(symbol, instruments))
+            old = np.array([p if p is not None else np.nan for p in old_pnl], dtype=np.float64)
+            changed = ~np.isclose(pnl, old, rtol=0, atol=0.005)
+            updates.extend({'id': ids[i], 'pnl': Decimal(f"{pnl[i]:.2f}")} for i in np.flatnonzero(changed))
+
+        if updates:
+            db.session.execute(db.update(Trade), updates)
+            db.session.commit()
+            progress['trades_updated'] += len(updates)
+
+    progress['stage'] = 'rollup'
+    rollup_rows = rebuild_daily_rollup()
+    invalidate_trade_cache()
+
+    progress['stage'] = 'done'
+    return {
+        'roots': sorted(roots) if roots else None,
+        'trades_scanned': progress['trades_scanned'],
+        'trades_skipped': progress['trades_skipped'],
+        'trades_updated': progress['trades_updated'],
+        'rollup_rows': rollup_rows,
+    }
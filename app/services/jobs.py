@@ -0,0 +1,195 @@
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# Local background job runner.
+#
+# Jobs run on a small thread pool inside the API process, each in its own app
+# context (so its own DB session). State lives in memory: a job id is only valid
+# on the process that created it and is lost on restart.
+#
+# A job function takes a `progress` dict as its first argument and updates it in
+# place while it runs; GET /api/jobs/<id> returns that dict as-is.
+
+MAX_WORKERS = 2
+MAX_FINISHED_JOBS = 200  # finished jobs kept for polling, oldest dropped first
+
+_jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='job')
+        return _executor
+
+
+def submit_job(app, kind: str, target: Callable[..., Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+    """
+    Queue target(progress, **kwargs) to run in the background.
+
+    Args:
+        app: the Flask app (current_app._get_current_object()), for the job's app context
+        kind: job type shown in the status, e.g. 'import'
+
+    Returns:
+        snapshot of the new job (id, status 'queued', ...)
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        'id': job_id,
+        'kind': kind,
+        'status': 'queued',
+        'progress': {},
+        'result': None,
+        'error': None,
+        'created_at': datetime.utcnow().isoformat(),
+        'started_at': None,
+        'finished_at': None,
+    }
+    with _lock:
+        _jobs[job_id] = job
+        _prune_finished()
+
+    _get_executor().submit(_run_job, app, job, target, kwargs)
+    return get_job(job_id)
+
+
+def _run_job(app, job: Dict[str, Any], target: Callable[..., Dict[str, Any]], kwargs: Dict[str, Any]) -> None:
+    job['status'] = 'running'
+    job['started_at'] = datetime.utcnow().isoformat()
+    with app.app_context():
+        try:
+            job['result'] = target(job['progress'], **kwargs)
+            job['status'] = 'succeeded'
+        except Exception as e:
+            from app.db.models import db
+            db.session.rollback()
+            job['status'] = 'failed'
+            job['error'] = f"{type(e).__name__}: {e}"
+            app.logger.error("Job %s failed:\n%s", job['id'], traceback.format_exc())
+    job['finished_at'] = datetime.utcnow().isoformat()
+
+
+class JobIdInUse(ValueError):
+    """track_job was given the id of a job that hasn't finished"""
+
+
+def track_job(kind: str, job_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Register work that runs in the calling request (not on the pool) so it can be
+    polled like a job; it's pruned with the other finished jobs. Call finish_job
+    when it's done.
+
+    A caller-chosen job_id may reuse a finished job's id, but raises JobIdInUse if
+    that job is still queued or running.
+
+    Returns:
+        the job's live progress dict, to update in place
+    """
+    job_id = job_id or uuid.uuid4().hex
+    now = datetime.utcnow().isoformat()
+    job = {
+        'id': job_id,
+        'kind': kind,
+        'status': 'running',
+        'progress': {},
+        'result': None,
+        'error': None,
+        'created_at': now,
+        'started_at': now,
+        'finished_at': None,
+    }
+    with _lock:
+        current = _jobs.get(job_id)
+        if current is not None and current['status'] not in ('succeeded', 'failed'):
+            raise JobIdInUse(f"Job {job_id} is still {current['status']}")
+        _jobs.pop(job_id, None)  # a reused id goes to the end, with the newest jobs
+        _jobs[job_id] = job
+        _prune_finished()
+    return job['progress']
+
+
+def finish_job(job_id: str, error: Optional[str] = None) -> None:
+    """mark a track_job job succeeded (or failed with error)"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        job['status'] = 'failed' if error else 'succeeded'
+        job['error'] = error
+        job['finished_at'] = datetime.utcnow().isoformat()
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """copy of the job's current state, or None if unknown"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {**job, 'progress': dict(job['progress'])}
+
+
+def list_jobs(limit: int = 50) -> List[Dict[str, Any]]:
+    """most recent jobs first"""
+    with _lock:
+        job_ids = list(_jobs)[-limit:]
+    return [job for job in (get_job(job_id) for job_id in reversed(job_ids)) if job]
+
+
+def _prune_finished() -> None:
+    finished = [job_id for job_id, job in _jobs.items() if job['status'] in ('succeeded', 'failed')]
+    for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+        del _jobs[job_id]
+
+
+def run_import_job(progress: Dict[str, Any], csv_text: str, account: str = "default",
+                   bulk: bool = False, incremental: bool = False, auto_match: bool = True) -> Dict[str, Any]:
+    """
+    Background version of /api/trades/import: save the raw orders, then match them.
+
+    progress goes through stage 'saving' -> 'matching' -> 'done' with rows_total,
+    rows_parsed, orders_saved and trades_created along the way.
+    """
+    from app.utils.csv_parser import (
+        save_raw_orders_to_db, bulk_save_raw_orders_to_db,
+        process_filled_orders_to_trades, process_new_fills_to_trades,
+    )
+
+    progress.update({'stage': 'saving', 'rows_total': None, 'rows_parsed': 0,
+                     'orders_saved': 0, 'trades_created': 0, 'error_count': 0})
+
+    if bulk:
+        saved_orders, errors, ingest_stats = bulk_save_raw_orders_to_db(csv_text, account)
+        progress['rows_total'] = progress['rows_parsed'] = ingest_stats.get('rows', 0)
+    else:
+        saved_orders, errors = save_raw_orders_to_db(csv_text, account, progress=progress)
+    progress['orders_saved'] = len(saved_orders)
+    progress['error_count'] = len(errors)
+
+    match_result = {}
+    if auto_match:
+        progress['stage'] = 'matching'
+        if incremental:
+            match_result = process_new_fills_to_trades(account=account)
+        else:
+            match_result = process_filled_orders_to_trades(account=account)
+        errors.extend(match_result.get('errors', []))
+        progress['trades_created'] = match_result.get('trades_created', 0)
+        progress['error_count'] = len(errors)
+
+    progress['stage'] = 'done'
+    return {
+        'orders_saved': len(saved_orders),
+        'trades_created': match_result.get('trades_created', 0),
+        'filled_orders_count': match_result.get('filled_orders_count', 0),
+        'errors': errors[:20],
+        'error_count': len(errors),
+    }
@@ -1,14 +1,29 @@
 from typing import List, Dict, Tuple
 from app.db.models import Order, Trade, db
 from app.services.metrics import detect_trade_type
+from app.services.daily_rollup import apply_trades_to_rollup
+from app.services.trade_cache import invalidate_trade_cache
+from app.services.instruments import price_trade_records
+from collections import deque
 from datetime import datetime
-import uuid
+import hashlib
 
-def match_orders_to_trades(account:str = None) -> tuple[List[Trade], Dict]:
-    # Match filled orders using FIFO
+# One fill as the matching engine sees it: (order_id, is_buy, quantity, price, fill_time)
+Fill = Tuple[str, bool, int, float, datetime]
+
+# How an exit relieves open lots
+RELIEF_METHODS = ('fifo', 'lifo', 'average')
+
+
+def match_orders_to_trades(account:str = None, relief: str = 'fifo', workers: int = 1) -> tuple[List[Trade], Dict]:
+    # Match filled orders using FIFO (or LIFO / average cost, see match_fills)
+    # workers > 1 matches the (contract, account) groups in a process pool (see match_fill_groups)
 
     # Returns list of created trades, summary dict
 
+    if relief not in RELIEF_METHODS:
+        raise ValueError(f"Unknown relief method: {relief}. Must be one of {RELIEF_METHODS}")
+
     # get all unmatched filled orders
     query = Order.query.filter_by(is_filled=True, is_matched = False)
     if account:
@@ -30,19 +45,16 @@ def match_orders_to_trades(account:str = None) -> tuple[List[Trade], Dict]:
             'errors': [f"{len(orders_missing_time)} filled orders missing fill_time; cannot match until timestamps parse correctly."]
         }
 
-    
-    # separate by sumbol and account
+    # separate by symbol and account
     orders_by_key = {}
     for order in all_orders:
-        key = (order.contract, order.account)
-        if key not in orders_by_key:
-            orders_by_key[key] = {'buy': [], 'sell': []}
-        if order.is_buy:
-            orders_by_key[key]['buy'].append(order)
-        elif order.is_sell:
-            orders_by_key[key]['sell'].append(order)
-        
-    
+        if not (order.is_buy or order.is_sell):
+            continue
+        orders_by_key.setdefault((order.contract, order.account), []).append(order)
+
+    # id -> order, so matched flags are back-filled without a query per order
+    orders_by_id = {order.id: order for order in all_orders}
+
     trades = []
     summary = {
         'trades_created': 0,
@@ -50,266 +62,333 @@ def match_orders_to_trades(account:str = None) -> tuple[List[Trade], Dict]:
         'errors': []
     }
 
+    # plain fill tuples per symbol acc combo, so the groups can go to other processes
+    fill_groups = {}
+    for key, orders in orders_by_key.items():
+        fills, fill_errors = _orders_to_fills(orders)
+        summary['errors'].extend(fill_errors)
+        fill_groups[key] = fills
+
     # match orders for each symbol acc combo
-    for (symbol, acc), order_lists in orders_by_key.items():
-        buy_orders = sorted(order_lists['buy'], key=lambda x: x.fill_time)
-        sell_orders = sorted(order_lists['sell'], key=lambda x: x.fill_time)
-        
-        # Match LONG trades (Buy → Sell)
-        long_trades, long_errors = _match_long_trades(buy_orders, sell_orders, symbol, acc)
-        trades.extend(long_trades)
-        summary['errors'].extend(long_errors)
-        
-        # Match SHORT trades (Sell → Buy) - reverse logic
-        short_trades, short_errors = _match_short_trades(sell_orders, buy_orders, symbol, acc)
-        trades.extend(short_trades)
-        summary['errors'].extend(short_errors)
+    for (symbol, acc), trade_records, match_errors in match_fill_groups(fill_groups, relief, workers):
+        summary['errors'].extend(match_errors)
+
+        # points -> dollars (point value, commissions) for the whole group at once
+        price_trade_records(trade_records, symbol)
+        for record in trade_records:
+            trades.append(_trade_from_record(record, symbol, acc))
+        _mark_matched_orders(trade_records, orders_by_id)
 
     if trades:
         try:
             db.session.bulk_save_objects(trades)
+            apply_trades_to_rollup(trades)
             db.session.commit()
+            invalidate_trade_cache()
             summary['trades_created'] = len(trades)
         except Exception as e:
             db.session.rollback()
             summary['errors'].append(f"Failed to save trades: {str(e)}")
             return [], summary
-    
+
     # Count unmatched orders
     unmatched = Order.query.filter_by(is_filled=True, is_matched=False).count()
     summary['unmatched_orders'] = unmatched
-    
+
     return trades, summary
 
 
-def _match_long_trades(buy_orders: List[Order], sell_orders: List[Order],
-                      symbol: str, account: str) -> tuple[List[Trade], List[str]]:
+def match_fill_groups(fill_groups: Dict[tuple, List[Fill]], relief: str = 'fifo',
+                      workers: int = 1) -> List[tuple]:
     """
-    Match Buy orders (entries) with Sell orders (exits) for LONG trades.
-    Handles scaled exits.
-    
-    Algorithm: FIFO (First In, First Out)
-    - First Buy matches with first Sell
-    - If Sell quantity < Buy quantity, create partial trade
-    - If Sell quantity > Buy quantity, use remaining for next Buy
+    Run match_fills over independent (contract, account) groups.
+
+    With workers > 1 the groups are fanned out to a process pool as plain tuples.
+    Results come back in fill_groups order whatever the worker count, and trade ids
+    are derived from order ids, so the output is the same for any number of workers.
+
+    Returns:
+        [(group key, trade records, errors)] in fill_groups order
     """
-    trades = []
+    if relief not in RELIEF_METHODS:
+        raise ValueError(f"Unknown relief method: {relief}. Must be one of {RELIEF_METHODS}")
+
+    tasks = [(key, fills, relief) for key, fills in fill_groups.items()]
+    if workers <= 1 or len(tasks) <= 1:
+        return [_match_group(task) for task in tasks]
+
+    from app.utils.process_pool import process_pool
+
+    # a few groups per task keeps the pickling overhead down when groups are small
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with process_pool(workers) as pool:
+        return list(pool.map(_match_group, tasks, chunksize=chunksize))
+
+
+def _match_group(task: tuple) -> tuple:
+    """process pool worker: (key, fills, relief) -> (key, trade records, errors)"""
+    key, fills, relief = task
+    trade_records, errors = match_fills(fills, relief)
+    return key, trade_records, errors
+
+
+def _orders_to_fills(orders: List[Order]) -> tuple[List[Fill], List[str]]:
+    """convert ORM orders into plain fill tuples, sorted by fill_time"""
+    fills = []
     errors = []
-    
-    # Create position queue (FIFO)
-    buy_queue = buy_orders.copy()
-    sell_queue = sell_orders.copy()
-    
-    while buy_queue and sell_queue:
-        buy_order = buy_queue[0]  # Get first buy order
-        
-        # Find sell orders that come AFTER this buy order
-        matching_sells = [
-            s for s in sell_queue 
-            if s.fill_time > buy_order.fill_time and s.filled_qty > 0 and not s.is_matched
-        ]
-        
-        if not matching_sells:
-            # No matching sell found, this buy order is orphaned
-            buy_queue.pop(0)
-            errors.append(f"Orphaned buy order: {buy_order.id} (no matching sell)")
+    for order in orders:
+        if not order.filled_qty or order.avg_price is None:
+            errors.append(f"Order {order.id}: missing filled quantity or price, skipped")
             continue
-        
-        # Match buy order with sell orders (FIFO)
-        remaining_buy_qty = buy_order.filled_qty
-        exit_orders = []  # For scaled exits
-        total_exit_qty = 0
-        weighted_exit_price = 0.0
-        
-        for sell_order in matching_sells:
-            if remaining_buy_qty <= 0:
-                break
-            # How much to match
-            match_qty = min(remaining_buy_qty, sell_order.filled_qty)
-            
-            exit_orders.append({
-                'order_id': sell_order.id,
+        # contracts an earlier run already used (partly relieved lot / flipping exit)
+        remaining = int(order.filled_qty) - (order.matched_quantity or 0)
+        if remaining <= 0:
+            continue
+        fills.append((order.id, bool(order.is_buy), remaining, float(order.avg_price), order.fill_time))
+    fills.sort(key=lambda f: f[4])
+    return fills, errors
+
+
+def match_fills(fills: List[Fill], relief: str = 'fifo') -> tuple[List[Dict], List[str]]:
+    """
+    Lot-relief matching engine for the fills of one (contract, account), in fill_time order.
+
+    Fills on the same side as the open position (or into a flat position) open a lot.
+    Fills on the opposite side relieve open lots:
+    - fifo: oldest lot first
+    - lifo: newest lot first
+    - average: all open lots are one position at average cost
+      (a position still open at the end isn't booked: its round trip is matched
+      as a whole on a later run, so the average isn't split)
+
+    A lot that is fully relieved becomes one trade, with every exit fill that
+    closed part of it as an exit leg (scaled exits). An exit bigger than the
+    open position closes it and opens a lot in the other direction with the rest.
+    Lots still partly open at the end produce a trade for the relieved part.
+
+    Every record has entry_quantities (order id -> contracts of it used as entry),
+    which with the exit legs says how much of each order a run used up.
+
+    Each fill is pushed and popped at most once, so this is linear in len(fills).
+    Works on plain tuples (no ORM objects or queries).
+
+    Returns:
+        (trade records as dicts, errors for entries that were never closed)
+    """
+    if relief not in RELIEF_METHODS:
+        raise ValueError(f"Unknown relief method: {relief}. Must be one of {RELIEF_METHODS}")
+
+    if relief == 'average':
+        return _match_average_cost(fills)
+
+    trades = []
+    errors = []
+
+    # open lots, all on the same side: [order_id, is_buy, open_qty, price, fill_time, exit_legs]
+    lots = deque()
+
+    for order_id, is_buy, quantity, price, fill_time in fills:
+        remaining = quantity
+
+        # relieve lots on the other side first
+        while remaining > 0 and lots and lots[0][1] != is_buy:
+            lot = lots[0] if relief == 'fifo' else lots[-1]
+            match_qty = min(remaining, lot[2])
+            lot[5].append({
+                'order_id': order_id,
                 'quantity': match_qty,
-                'price': float(sell_order.avg_price),
-                'fill_time': sell_order.fill_time.isoformat()
+                'price': price,
+                'fill_time': fill_time.isoformat()
             })
-            
-            total_exit_qty += match_qty
-            weighted_exit_price += float(sell_order.avg_price) * match_qty
-            
-            # Update sell order
-            sell_order.filled_qty -= match_qty
-            if sell_order.filled_qty <= 0:
-                sell_order.is_matched = True
-                sell_order.matched_trade_id = None  # Will set after trade created
-                sell_queue.remove(sell_order)
-            else:
-                # Partial match - order still has remaining quantity
-                pass
-
-        if total_exit_qty > 0:
-            # Calculate average exit price
-            avg_exit_price = weighted_exit_price / total_exit_qty
-            
-            # Calculate PnL
-            pnl = (avg_exit_price - float(buy_order.avg_price)) * total_exit_qty
-            
-            # Get exit time (latest exit order)
-            exit_time = max([datetime.fromisoformat(e['fill_time']) for e in exit_orders])
-            
-            # Create trade
-            trade_id = f"trade-{uuid.uuid4().hex[:12]}"
-            trade = Trade(
-                id=trade_id,
-                acc_id=account,
-                symbol=symbol,
-                direction='LONG',
-                entry_time=buy_order.fill_time,
-                entry_price=buy_order.avg_price,
-                entry_order_id=buy_order.id,
-                exit_time=exit_time,
-                exit_price=avg_exit_price,
-                exit_order_id=exit_orders[0]['order_id'] if len(exit_orders) == 1 else None,
-                exit_orders=exit_orders if len(exit_orders) > 1 else None,
-                quantity=total_exit_qty,
-                pnl=pnl,
-                is_scaled=len(exit_orders) > 1,
-                trade_type=detect_trade_type(buy_order.fill_time, exit_time)
-            )
-            
-            trades.append(trade)
-
-
-            # Mark buy order as matched
-            buy_order.is_matched = True
-            buy_order.matched_trade_id = trade_id
-            buy_order.matched_quantity = total_exit_qty
-            
-            # Update sell orders with trade_id
-            for exit_order_data in exit_orders:
-                sell_order = Order.query.filter_by(id=exit_order_data['order_id']).first()
-                if sell_order:
-                    sell_order.matched_trade_id = trade_id
-                    sell_order.matched_quantity = exit_order_data['quantity']
-            
-            # If buy order not fully matched, keep remainder
-            if remaining_buy_qty > 0:
-                buy_order.filled_qty = remaining_buy_qty
-            else:
-                buy_queue.pop(0)
-    
+            lot[2] -= match_qty
+            remaining -= match_qty
+
+            if lot[2] == 0:
+                if relief == 'fifo':
+                    lots.popleft()
+                else:
+                    lots.pop()
+                trades.append(_record_from_lot(lot))
+
+        # whatever is left opens (or adds to) a position on this side
+        if remaining > 0:
+            lots.append([order_id, is_buy, remaining, price, fill_time, []])
+
+    for lot in lots:
+        side = 'buy' if lot[1] else 'sell'
+        other = 'sell' if lot[1] else 'buy'
+        if lot[5]:
+            # partially relieved: keep the matched part as a trade
+            trades.append(_record_from_lot(lot))
+            errors.append(f"Orphaned {side} order: {lot[0]} ({lot[2]} contracts with no matching {other})")
+        else:
+            errors.append(f"Orphaned {side} order: {lot[0]} (no matching {other})")
+
     return trades, errors
 
-def _match_short_trades(sell_orders: List[Order], buy_orders: List[Order],
-                       symbol: str, account: str) -> tuple[List[Trade], List[str]]:
+
+def _match_average_cost(fills: List[Fill]) -> tuple[List[Dict], List[str]]:
     """
-    Match Sell orders (entries) with Buy orders (exits) for SHORT trades.
-    Similar logic but reversed.
+    Average-cost relief: the open position carries one average entry price; exits
+    realise PnL against it. One trade per round trip (flat → open → flat).
     """
-
     trades = []
     errors = []
-    
-    # Create position queue (FIFO)
-    buy_queue = buy_orders.copy()
-    sell_queue = sell_orders.copy()
-    
-    while buy_queue and sell_queue:
-        sell_order = sell_queue[0]  # Get first sell order
-        
-        # Find buy orders that come AFTER this sell order
-        matching_buys = [
-            b for b in buy_queue 
-            if b.fill_time > sell_order.fill_time and b.filled_qty > 0 and not b.is_matched
-        ]
-        
-        if not matching_buys:
-            # No matching buy found, this sell order is orphaned
-            sell_queue.pop(0)
-            errors.append(f"Orphaned sell order: {sell_order.id} (no matching buy)")
-            continue
-        
-        # Match sell order with buy orders (FIFO)
-        remaining_sell_qty = sell_order.filled_qty
-        exit_orders = []  # For scaled exits
-        total_exit_qty = 0
-        weighted_exit_price = 0.0
-        
-        for buy_order in matching_buys:
-            if remaining_sell_qty <= 0:
-                break
-            # How much to match
-            match_qty = min(remaining_sell_qty, buy_order.filled_qty)
-            
-            exit_orders.append({
-                'order_id': buy_order.id,
+
+    position = None  # dict while a position is open
+
+    for order_id, is_buy, quantity, price, fill_time in fills:
+        remaining = quantity
+
+        if position is not None and position['is_buy'] != is_buy:
+            match_qty = min(remaining, position['open_qty'])
+            position['exit_legs'].append({
+                'order_id': order_id,
                 'quantity': match_qty,
-                'price': float(buy_order.avg_price),
-                'fill_time': buy_order.fill_time.isoformat()
+                'price': price,
+                'fill_time': fill_time.isoformat()
             })
-            
-            total_exit_qty += match_qty
-            weighted_exit_price += float(buy_order.avg_price) * match_qty
-            
-            # Update buy order
-            buy_order.filled_qty -= match_qty
-            if buy_order.filled_qty <= 0:
-                buy_order.is_matched = True
-                buy_order.matched_trade_id = None  # Will set after trade created
-                buy_queue.remove(buy_order)
-            else:
-                # Partial match - order still has remaining quantity
-                pass
-
-        if total_exit_qty > 0:
-            # Calculate average exit price
-            avg_exit_price = weighted_exit_price / total_exit_qty
-            
-            # Calculate PnL
-            pnl = (float(sell_order.avg_price) - avg_exit_price) * total_exit_qty
-            
-            # Get exit time (latest exit order)
-            exit_time = max([datetime.fromisoformat(e['fill_time']) for e in exit_orders])
-            
-            # Create trade
-            trade_id = f"trade-{uuid.uuid4().hex[:12]}"
-            trade = Trade(
-                id=trade_id,
-                acc_id=account,
-                symbol=symbol,
-                direction='SHORT',
-                entry_time=sell_order.fill_time,
-                entry_price=sell_order.avg_price,
-                entry_order_id=sell_order.id,
-                exit_time=exit_time,
-                exit_price=avg_exit_price,
-                exit_order_id=exit_orders[0]['order_id'] if len(exit_orders) == 1 else None,
-                exit_orders=exit_orders if len(exit_orders) > 1 else None,
-                quantity=total_exit_qty,
-                pnl=pnl,
-                is_scaled=len(exit_orders) > 1,
-                trade_type=detect_trade_type(sell_order.fill_time, exit_time)
-            )
-            
-            trades.append(trade)
-
-
-            # Mark buy order as matched
-            sell_order.is_matched = True
-            sell_order.matched_trade_id = trade_id
-            sell_order.matched_quantity = total_exit_qty
-            
-            # Update sell orders with trade_id
-            for exit_order_data in exit_orders:
-                buy_order = Order.query.filter_by(id=exit_order_data['order_id']).first()
-                if buy_order:
-                    buy_order.matched_trade_id = trade_id
-                    buy_order.matched_quantity = exit_order_data['quantity']
-            
-            # If buy order not fully matched, keep remainder
-            if remaining_sell_qty > 0:
-                sell_order.filled_qty = remaining_sell_qty
-            else:
-                sell_queue.pop(0)
-    
-    return trades, errors
\ No newline at end of file
+            position['relieved_cost'] += position['avg_price'] * match_qty
+            position['open_qty'] -= match_qty
+            remaining -= match_qty
+
+            if position['open_qty'] == 0:
+                trades.append(_record_from_position(position))
+                position = None
+
+        if remaining > 0:
+            if position is None:
+                position = {
+                    'is_buy': is_buy,
+                    'open_qty': 0,
+                    'avg_price': 0.0,
+                    'entry_time': fill_time,
+                    'entry_order_ids': [],
+                    'entry_quantities': {},
+                    'exit_legs': [],
+                    'relieved_cost': 0.0,
+                }
+            total_qty = position['open_qty'] + remaining
+            position['avg_price'] = (position['avg_price'] * position['open_qty'] + price * remaining) / total_qty
+            position['open_qty'] = total_qty
+            position['entry_order_ids'].append(order_id)
+            position['entry_quantities'][order_id] = remaining
+
+    if position is not None:
+        # not booked: the whole round trip is matched once it closes
+        side = 'buy' if position['is_buy'] else 'sell'
+        other = 'sell' if position['is_buy'] else 'buy'
+        errors.append(
+            f"Orphaned {side} order: {position['entry_order_ids'][0]} "
+            f"({position['open_qty']} contracts with no matching {other})"
+        )
+
+    return trades, errors
+
+
+def _record_from_lot(lot: list) -> Dict:
+    """trade record for one entry lot and the exit legs that relieved it"""
+    order_id, is_buy, _, entry_price, entry_time, exit_legs = lot
+    relieved = sum(leg['quantity'] for leg in exit_legs)
+    return _build_record(is_buy, [order_id], entry_price, entry_time, exit_legs, {order_id: relieved})
+
+
+def _record_from_position(position: Dict) -> Dict:
+    """trade record for an average-cost round trip"""
+    quantity = sum(leg['quantity'] for leg in position['exit_legs'])
+    entry_price = position['relieved_cost'] / quantity
+    return _build_record(position['is_buy'], position['entry_order_ids'], entry_price,
+                         position['entry_time'], position['exit_legs'], position['entry_quantities'])
+
+
+def _build_record(is_buy: bool, entry_order_ids: List[str], entry_price: float,
+                  entry_time: datetime, exit_legs: List[Dict], entry_quantities: Dict[str, int]) -> Dict:
+    total_exit_qty = sum(leg['quantity'] for leg in exit_legs)
+    # Calculate average exit price
+    avg_exit_price = sum(leg['price'] * leg['quantity'] for leg in exit_legs) / total_exit_qty
+
+    # Calculate PnL in price points x quantity (price_trade_records turns it into dollars)
+    if is_buy:
+        pnl = (avg_exit_price - entry_price) * total_exit_qty
+    else:
+        pnl = (entry_price - avg_exit_price) * total_exit_qty
+
+    # Get exit time (latest exit order)
+    exit_time = max(datetime.fromisoformat(leg['fill_time']) for leg in exit_legs)
+
+    # Deterministic id from the orders involved, so re-running gives the same trades
+    key = "|".join(entry_order_ids) + ">" + "|".join(f"{leg['order_id']}:{leg['quantity']}" for leg in exit_legs)
+    trade_id = "trade-" + hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+    # same shape as Order.to_dict() (what the position walk stores), so the reprice job
+    # reads both the same way; filled_qty is the part of the order used by this trade
+    entry_leg = {'id': entry_order_ids[0], 'avg_price': entry_price, 'filled_qty': total_exit_qty,
+                 'fill_time': entry_time.isoformat(), 'is_buy': is_buy, 'is_sell': not is_buy}
+    if len(entry_order_ids) > 1:
+        entry_leg['order_ids'] = entry_order_ids  # average cost: one leg at the average entry
+    fills = [entry_leg] + [
+        {'id': leg['order_id'], 'avg_price': leg['price'], 'filled_qty': leg['quantity'],
+         'fill_time': leg['fill_time'], 'is_buy': not is_buy, 'is_sell': is_buy}
+        for leg in exit_legs
+    ]
+
+    return {
+        'id': trade_id,
+        'direction': 'LONG' if is_buy else 'SHORT',
+        'entry_time': entry_time,
+        'entry_price': entry_price,
+        'entry_order_id': entry_order_ids[0],
+        'entry_order_ids': entry_order_ids,
+        'entry_quantities': entry_quantities,
+        'exit_time': exit_time,
+        'exit_price': avg_exit_price,
+        'exit_order_id': exit_legs[0]['order_id'] if len(exit_legs) == 1 else None,
+        'exit_orders': exit_legs if len(exit_legs) > 1 else None,
+        'exit_legs': exit_legs,
+        'quantity': total_exit_qty,
+        'pnl': pnl,
+        'is_scaled': len(exit_legs) > 1,
+        'fills': fills,
+    }
+
+
+def _trade_from_record(record: Dict, symbol: str, account: str) -> Trade:
+    return Trade(
+        id=record['id'],
+        acc_id=account,
+        symbol=symbol,
+        direction=record['direction'],
+        entry_time=record['entry_time'],
+        entry_price=record['entry_price'],
+        entry_order_id=record['entry_order_id'],
+        exit_time=record['exit_time'],
+        exit_price=record['exit_price'],
+        exit_order_id=record['exit_order_id'],
+        exit_orders=record['exit_orders'],
+        quantity=record['quantity'],
+        pnl=record['pnl'],
+        is_scaled=record['is_scaled'],
+        fills=record['fills'],
+        trade_type=detect_trade_type(record['entry_time'], record['exit_time'])
+    )
+
+
+def _mark_matched_orders(trade_records: List[Dict], orders_by_id: Dict[str, Order]) -> None:
+    """
+    Back-fill matched_trade_id / matched_quantity from the in-memory id→order map.
+
+    matched_quantity is the running total of the order's contracts used by trades
+    (entry or exit), across runs; an order is only is_matched once all of its
+    filled_qty is used. A partly relieved entry lot or a flipping exit keeps the rest
+    for the next run (see _orders_to_fills).
+    """
+    for record in trade_records:
+        used = dict(record['entry_quantities'])
+        for leg in record['exit_legs']:
+            used[leg['order_id']] = used.get(leg['order_id'], 0) + leg['quantity']
+        for order_id, quantity in used.items():
+            order = orders_by_id[order_id]
+            order.matched_quantity = (order.matched_quantity or 0) + quantity
+            order.matched_trade_id = record['id']
+            if order.matched_quantity >= order.filled_qty:
+                order.is_matched = True
@@ -0,0 +1,67 @@
+from typing import Any, Dict, Optional
+import numpy as np
+from app.services.instruments import get_instruments, instrument_for, price_pnl
+from app.services.price_feed import PriceFeed, get_price_feed
+
+# Open positions with unrealised pnl.
+#
+# The position-walk matchers leave each (account, contract)'s open position on its PositionState row
+# (net position, average entry price, opened_at), so this is one query for the open
+# rows plus a dict lookup per position for its mark and instrument spec - no walk over
+# the orders.
+#
+# Only the position-walk matchers (process_filled_orders_to_trades /
+# process_new_fills_to_trades, i.e. the import endpoints) keep PositionState; the lot
+# engine (match_orders_to_trades) tracks its open contracts on the orders themselves
+# (Order.matched_quantity), so positions opened only through it aren't listed here.
+#
+# Unrealised pnl is what the trade would book if it were closed at the mark, i.e. the
+# same formula as realised pnl (point value and round-trip commissions included).
+
+
+def open_positions(account: Optional[str] = None, contract: Optional[str] = None,
+                   feed: Optional[PriceFeed] = None) -> Dict[str, Any]:
+    from app.db.models import PositionState
+
+    feed = get_price_feed() if feed is None else feed
+    instruments = get_instruments()
+
+    query = PositionState.query.filter(PositionState.net_position != 0)
+    if account:
+        query = query.filter(PositionState.account == account)
+    if contract:
+        query = query.filter(PositionState.contract == contract.strip().upper())
+    states = query.order_by(PositionState.account, PositionState.contract).all()
+
+    positions = []
+    total = 0.0
+    priced = 0
+    for state in states:
+        quantity = abs(state.net_position)
+        avg_entry = float(state.avg_entry_price) if state.avg_entry_price is not None else None
+        mark = feed.mark(state.contract) if feed is not None else None
+        unrealized = None
+        if mark is not None and avg_entry is not None:
+            sign = 1.0 if state.net_position > 0 else -1.0
+            unrealized = float(price_pnl(np.float64(sign), np.float64(avg_entry), np.float64(mark.price),
+                                         np.float64(quantity), instrument_for(state.contract, instruments)))
+            total += unrealized
+            priced += 1
+        positions.append({
+            'account': state.account,
+            'contract': state.contract,
+            'side': 'LONG' if state.net_position > 0 else 'SHORT',
+            'quantity': quantity,
+            'avg_entry_price': avg_entry,
+            'opened_at': state.opened_at.isoformat() if state.opened_at else None,
+            'mark': mark.price if mark is not None else None,
+            'mark_time': mark.time.isoformat() if mark is not None and mark.time else None,
+            'unrealized_pnl': unrealized,
+        })
+
+    return {
+        'positions': positions,
+        'total_unrealized_pnl': round(total, 2),
+        'priced_positions': priced,
+        'price_feed': feed.source if feed is not None else None,
+    }
@@ -0,0 +1,168 @@
+import csv
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from app.utils.session_calendar import product_root
+
+# Marks for open positions (/api/positions).
+#
+# A feed keeps symbol -> latest mark in a dict, so pricing a position is one dict
+# lookup: the exact contract (MGCG6) first, then its root (MGC) for feeds that only
+# publish a front-month / continuous price.
+#
+# - FilePriceFeed: a local file written by whatever fetches quotes, re-read when its
+#   mtime changes. CSV with symbol,price[,time] columns (the latest row per symbol
+#   wins) or a JSON object {"MGCG6": 2051.3} / {"MGCG6": {"price": 2051.3, "time": ...}}.
+# - ReplayPriceFeed: recorded ticks played back against a clock you advance, for tests
+#   and for replaying a session.
+#
+# PRICE_FEED_FILE picks the file the app serves; set_price_feed() swaps in another feed.
+
+
+class Mark(NamedTuple):
+    price: float
+    time: Optional[datetime] = None
+
+
+def _parse_time(value) -> Optional[datetime]:
+    if value in (None, ''):
+        return None
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _symbol(value) -> str:
+    return str(value or '').strip().upper()
+
+
+class PriceFeed:
+    """base: subclasses keep self._marks current"""
+
+    source = 'none'
+
+    def __init__(self):
+        self._marks: Dict[str, Mark] = {}
+
+    def marks(self) -> Dict[str, Mark]:
+        return self._marks
+
+    def mark(self, symbol: Optional[str]) -> Optional[Mark]:
+        marks = self.marks()
+        symbol = _symbol(symbol)
+        found = marks.get(symbol)
+        if found is None:
+            found = marks.get(product_root(symbol))
+        return found
+
+
+def read_marks_csv(path: str) -> List[Tuple[Optional[datetime], str, float]]:
+    """(time, symbol, price) rows of a symbol,price[,time] csv, in file order"""
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if 'symbol' not in columns or 'price' not in columns:
+            raise ValueError(f"{path}: expected symbol and price columns, got {reader.fieldnames}")
+        ticks = []
+        for row in reader:
+            symbol = _symbol(row[columns['symbol']])
+            price = (row[columns['price']] or '').strip()
+            if not symbol or not price:
+                continue
+            tick_time = _parse_time(row[columns['time']]) if 'time' in columns else None
+            ticks.append((tick_time, symbol, float(price)))
+        return ticks
+
+
+class FilePriceFeed(PriceFeed):
+    """marks from a local csv / json file, reloaded when the file changes"""
+
+    source = 'file'
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def marks(self) -> Dict[str, Mark]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._marks = self._load()
+                    self._mtime = mtime
+        return self._marks
+
+    def _load(self) -> Dict[str, Mark]:
+        if self.path.endswith('.json'):
+            with open(self.path) as f:
+                data = json.load(f)
+            marks = {}
+            for symbol, value in data.items():
+                if isinstance(value, dict):
+                    marks[_symbol(symbol)] = Mark(float(value['price']), _parse_time(value.get('time')))
+                else:
+                    marks[_symbol(symbol)] = Mark(float(value))
+            return marks
+
+        marks = {}
+        for tick_time, symbol, price in read_marks_csv(self.path):
+            current = marks.get(symbol)
+            if current is None or tick_time is None or current.time is None or tick_time >= current.time:
+                marks[symbol] = Mark(price, tick_time)
+        return marks
+
+
+class ReplayPriceFeed(PriceFeed):
+    """
+    Recorded (time, symbol, price) ticks; advance(until) applies every tick up to
+    that time, so marks() is what a live feed would have shown then.
+    """
+
+    source = 'replay'
+
+    def __init__(self, ticks: Iterable[Tuple[datetime, str, float]]):
+        super().__init__()
+        self._ticks = sorted(((t, _symbol(s), float(p)) for t, s, p in ticks), key=lambda tick: tick[0])
+        self._next = 0
+        self.clock: Optional[datetime] = None
+
+    @classmethod
+    def from_csv(cls, path: str) -> 'ReplayPriceFeed':
+        ticks = read_marks_csv(path)
+        if any(tick_time is None for tick_time, _, _ in ticks):
+            raise ValueError(f"{path}: every tick needs a time to be replayed")
+        return cls(ticks)
+
+    def advance(self, until: datetime) -> int:
+        """apply ticks up to and including until; returns how many were applied"""
+        start = self._next
+        while self._next < len(self._ticks) and self._ticks[self._next][0] <= until:
+            tick_time, symbol, price = self._ticks[self._next]
+            self._marks[symbol] = Mark(price, tick_time)
+            self._next += 1
+        self.clock = until
+        return self._next - start
+
+
+_feed: Optional[PriceFeed] = None
+_feed_lock = threading.Lock()
+
+
+def get_price_feed() -> Optional[PriceFeed]:
+    """the app's feed: whatever set_price_feed() installed, else PRICE_FEED_FILE, else None"""
+    global _feed
+    if _feed is None and os.environ.get('PRICE_FEED_FILE'):
+        with _feed_lock:
+            if _feed is None:
+                _feed = FilePriceFeed(os.environ['PRICE_FEED_FILE'])
+    return _feed
+
+
+def set_price_feed(feed: Optional[PriceFeed]) -> None:
+    global _feed
+    _feed = feed
@@ -0,0 +1,170 @@
+import threading
+import time
+from datetime import datetime, date
+from typing import Dict, List, Optional
+import numpy as np
+from app.services.analytics import trading_days
+
+# In-process columnar snapshot of the trades table for read-heavy endpoints.
+#
+# One numpy array per field (pnl, times, quantity, ...) with symbol / account / direction
+# stored as small integer codes into a lookup list, so reads never touch the ORM.
+#
+# Built on first use, dropped by invalidate_trade_cache() after every write that goes
+# through the API or the matchers. Writes from elsewhere (scripts, other processes)
+# are picked up when the snapshot is older than MAX_AGE_SEC.
+
+MAX_AGE_SEC = 300
+
+DIRECTION_CODES = {'LONG': 1, 'SHORT': -1}
+
+
+class TradeSnapshot:
+    """column arrays for every trade, sorted by (exit_time, id)"""
+
+    def __init__(self, exit_time: np.ndarray, entry_time: np.ndarray, pnl: np.ndarray,
+                 quantity: np.ndarray, direction: np.ndarray,
+                 symbol_code: np.ndarray, symbols: List[str],
+                 account_code: np.ndarray, accounts: List[str]):
+        self.exit_time = exit_time
+        self.entry_time = entry_time
+        self.pnl = pnl
+        self.quantity = quantity
+        self.direction = direction
+        self.symbol_code = symbol_code
+        self.symbols = symbols
+        self.account_code = account_code
+        self.accounts = accounts
+        self.trading_day = trading_days(exit_time, [symbols[code] for code in symbol_code.tolist()])
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return int(self.pnl.size)
+
+    def select(self, start_date: Optional[str] = None, end_date: Optional[str] = None,
+               symbol: Optional[str] = None, account: Optional[str] = None,
+               direction: Optional[str] = None) -> np.ndarray:
+        """
+        Boolean mask of the trades matching the filters.
+
+        start_date / end_date: YYYY-MM-DD is an inclusive trading day, a full ISO
+        datetime bounds exit_time directly.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if symbol:
+            mask &= _code_mask(self.symbol_code, self.symbols, symbol)
+        if account:
+            mask &= _code_mask(self.account_code, self.accounts, account)
+        if direction:
+            mask &= self.direction == DIRECTION_CODES.get(direction.upper(), 0)
+        if start_date:
+            if 'T' in start_date:
+                mask &= self.exit_time >= np.datetime64(datetime.fromisoformat(start_date), 'us')
+            else:
+                mask &= self.trading_day >= np.datetime64(date.fromisoformat(start_date), 'D')
+        if end_date:
+            if 'T' in end_date:
+                mask &= self.exit_time <= np.datetime64(datetime.fromisoformat(end_date), 'us')
+            else:
+                mask &= self.trading_day <= np.datetime64(date.fromisoformat(end_date), 'D')
+        return mask
+
+    def memory_report(self) -> Dict:
+        """bytes held per column, in total, and scaled to a million trades"""
+        columns = {
+            'exit_time': self.exit_time.nbytes,
+            'entry_time': self.entry_time.nbytes,
+            'trading_day': self.trading_day.nbytes,
+            'pnl': self.pnl.nbytes,
+            'quantity': self.quantity.nbytes,
+            'direction': self.direction.nbytes,
+            'symbol_code': self.symbol_code.nbytes,
+            'account_code': self.account_code.nbytes,
+        }
+        total = sum(columns.values())
+        bytes_per_trade = total / len(self) if len(self) else sum(_ITEM_BYTES.values())
+        return {
+            'trades': len(self),
+            'symbols': len(self.symbols),
+            'accounts': len(self.accounts),
+            'columns_bytes': columns,
+            'total_bytes': total,
+            'bytes_per_trade': bytes_per_trade,
+            'mb_per_million_trades': round(bytes_per_trade * 1_000_000 / (1024 * 1024), 2),
+            'age_sec': round(time.monotonic() - self.built_at, 1),
+        }
+
+
+# per-row sizes of the arrays above, for the report on an empty snapshot
+_ITEM_BYTES = {'exit_time': 8, 'entry_time': 8, 'trading_day': 8, 'pnl': 8,
+               'quantity': 4, 'direction': 1, 'symbol_code': 4, 'account_code': 4}
+
+
+def _code_mask(codes: np.ndarray, names: List[str], name: str) -> np.ndarray:
+    try:
+        return codes == names.index(name)
+    except ValueError:
+        return np.zeros(codes.size, dtype=bool)
+
+
+def _intern(values: List[str]):
+    """strings -> (int32 codes, code -> string list)"""
+    lookup: Dict[str, int] = {}
+    codes = np.fromiter((lookup.setdefault(v, len(lookup)) for v in values), dtype=np.int32, count=len(values))
+    return codes, list(lookup)
+
+
+def build_trade_snapshot() -> TradeSnapshot:
+    """one Core select of the needed columns straight into arrays (no Trade objects)"""
+    from app.db.models import db, Trade
+
+    rows = db.session.execute(
+        db.select(Trade.exit_time, Trade.entry_time, db.cast(Trade.pnl, db.Float),
+                  Trade.quantity, Trade.direction, Trade.symbol, Trade.acc_id)
+        .order_by(Trade.exit_time, Trade.id)
+    ).all()
+    exit_times, entry_times, pnls, quantities, directions, symbols, accounts = zip(*rows) if rows else ([],) * 7
+    count = len(rows)
+
+    symbol_code, symbol_names = _intern(symbols)
+    account_code, account_names = _intern(accounts)
+    return TradeSnapshot(
+        exit_time=np.array(exit_times, dtype='datetime64[us]'),
+        entry_time=np.array(entry_times, dtype='datetime64[us]'),
+        pnl=np.fromiter(pnls, dtype=np.float64, count=count),
+        quantity=np.fromiter(quantities, dtype=np.int32, count=count),
+        direction=np.fromiter((DIRECTION_CODES.get(d, 0) for d in directions), dtype=np.int8, count=count),
+        symbol_code=symbol_code,
+        symbols=symbol_names,
+        account_code=account_code,
+        accounts=account_names,
+    )
+
+
+_snapshot: Optional[TradeSnapshot] = None
+# bumped by every invalidation, so a build that raced with a write isn't kept
+_generation = 0
+_lock = threading.Lock()
+
+
+def get_trade_snapshot() -> TradeSnapshot:
+    """the current snapshot, (re)built if missing or older than MAX_AGE_SEC"""
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and time.monotonic() - snapshot.built_at < MAX_AGE_SEC:
+        return snapshot
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is None or time.monotonic() - snapshot.built_at >= MAX_AGE_SEC:
+            generation = _generation
+            snapshot = build_trade_snapshot()
+            if generation == _generation:
+                _snapshot = snapshot
+        return snapshot
+
+
+def invalidate_trade_cache() -> None:
+    """drop the snapshot; call after committing any change to trades"""
+    global _snapshot, _generation
+    _generation += 1
+    _snapshot = None
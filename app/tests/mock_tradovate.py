@@ -0,0 +1,208 @@
+"""
+Local stand-in for the Tradovate REST API, for tests and for trying the sync offline.
+
+Serves the endpoints TradovateClient uses (auth, account/order/fill/contract lists)
+from in-memory data on 127.0.0.1, with knobs for the failure modes the client has to
+handle: throttling / server errors on the next N calls of a path, slow responses,
+short-lived tokens. It counts calls per path and the peak number of concurrent
+requests so tests can check connection reuse and the concurrency cap.
+
+    python -m app.tests.mock_tradovate          # serve sample data on :8765
+    TRADOVATE_URL=http://127.0.0.1:8765/v1 TRADOVATE_USERNAME=demo TRADOVATE_PASSWORD=demo \\
+        python -m app.scripts.sync_tradovate
+"""
+
+import json
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def sample_data():
+    """two accounts' worth of MGC / MNQ orders: a closed round trip and an open long"""
+    return {
+        'accounts': [{'id': 1, 'name': 'DEMO1'}, {'id': 2, 'name': 'DEMO2'}],
+        'contracts': [{'id': 100, 'name': 'MGCG6'}, {'id': 200, 'name': 'MNQH6'}],
+        'orders': [
+            {'id': 11, 'accountId': 1, 'contractId': 100, 'action': 'Buy', 'ordStatus': 'Filled'},
+            {'id': 12, 'accountId': 1, 'contractId': 100, 'action': 'Sell', 'ordStatus': 'Filled'},
+            {'id': 13, 'accountId': 1, 'contractId': 100, 'action': 'Buy', 'ordStatus': 'Canceled'},
+            {'id': 21, 'accountId': 2, 'contractId': 200, 'action': 'Buy', 'ordStatus': 'Filled'},
+        ],
+        'fills': [
+            # order 11 filled in two pieces
+            {'id': 1101, 'orderId': 11, 'contractId': 100, 'timestamp': '2026-01-16T15:40:00.000Z',
+             'action': 'Buy', 'qty': 1, 'price': 2000.0, 'active': True},
+            {'id': 1102, 'orderId': 11, 'contractId': 100, 'timestamp': '2026-01-16T15:40:02.500Z',
+             'action': 'Buy', 'qty': 1, 'price': 2001.0, 'active': True},
+            {'id': 1201, 'orderId': 12, 'contractId': 100, 'timestamp': '2026-01-16T15:45:00.000Z',
+             'action': 'Sell', 'qty': 2, 'price': 2003.0, 'active': True},
+            {'id': 2101, 'orderId': 21, 'contractId': 200, 'timestamp': '2026-01-16T16:00:00.000Z',
+             'action': 'Buy', 'qty': 1, 'price': 18000.25, 'active': True},
+        ],
+    }
+
+
+class MockTradovate:
+
+    def __init__(self, data=None, username='demo', password='demo', token_ttl=timedelta(minutes=80),
+                 latency_sec=0.0, port=0):
+        self.data = data if data is not None else sample_data()
+        self.username = username
+        self.password = password
+        self.token_ttl = token_ttl
+        self.latency_sec = latency_sec
+        self.calls = Counter()  # path -> requests served
+        self.failures = {}  # path -> [status, ...] returned by the next calls of that path
+        self.tokens = {}  # token -> expiry
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+
+            def setup(self):
+                super().setup()
+                # headers and body go out as separate writes; don't let Nagle hold the body back
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with mock._lock:
+                    mock.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                mock._handle(self, 'GET')
+
+            def do_POST(self):
+                mock._handle(self, 'POST')
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def fail_next(self, path, *statuses):
+        """the next len(statuses) calls of path get these HTTP statuses instead"""
+        with self._lock:
+            self.failures.setdefault(path, []).extend(statuses)
+
+    def expire_tokens(self):
+        with self._lock:
+            self.tokens.clear()
+
+    # ---- request handling ----
+
+    def _issue_token(self):
+        token = uuid.uuid4().hex
+        expires = datetime.now(timezone.utc) + self.token_ttl
+        self.tokens[token] = expires
+        return {'accessToken': token, 'expirationTime': expires.isoformat().replace('+00:00', 'Z'),
+                'userId': 1, 'userStatus': 'Active'}
+
+    def _authorized(self, handler):
+        header = handler.headers.get('Authorization', '')
+        token = header[len('Bearer '):] if header.startswith('Bearer ') else None
+        with self._lock:
+            expires = self.tokens.get(token)
+        return expires is not None and expires > datetime.now(timezone.utc)
+
+    def _handle(self, handler, method):
+        parsed = urlparse(handler.path)
+        path = parsed.path[len('/v1'):] if parsed.path.startswith('/v1') else parsed.path
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = json.loads(handler.rfile.read(length)) if length else {}
+
+        with self._lock:
+            self.calls[path] += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            failure = self.failures[path].pop(0) if self.failures.get(path) else None
+        try:
+            if self.latency_sec:
+                time.sleep(self.latency_sec)
+            if failure is not None:
+                headers = {'Retry-After': '0'} if failure == 429 else {}
+                return self._reply(handler, failure, {'errorText': 'injected failure'}, headers)
+            status, payload = self._route(handler, method, path, query, body)
+            return self._reply(handler, status, payload)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _route(self, handler, method, path, query, body):
+        if method == 'POST' and path == '/auth/accesstokenrequest':
+            if body.get('name') != self.username or body.get('password') != self.password:
+                return 200, {'errorText': 'Incorrect username or password'}
+            with self._lock:
+                return 200, self._issue_token()
+
+        if not self._authorized(handler):
+            return 401, {'errorText': 'Access is denied'}
+
+        if path == '/auth/renewaccesstoken':
+            with self._lock:
+                return 200, self._issue_token()
+        if path == '/account/list':
+            return 200, self.data['accounts']
+        if path == '/order/list':
+            return 200, self.data['orders']
+        if path == '/order/item':
+            order = next((o for o in self.data['orders'] if str(o['id']) == query.get('id')), None)
+            return (200, order) if order else (404, {'errorText': 'not found'})
+        if path == '/fill/list':
+            return 200, self.data['fills']
+        if path == '/fill/deps':
+            return 200, [f for f in self.data['fills'] if str(f['orderId']) == query.get('masterid')]
+        if path == '/contract/items':
+            ids = set(query.get('ids', '').split(','))
+            return 200, [c for c in self.data['contracts'] if str(c['id']) in ids]
+        return 404, {'errorText': f'unknown endpoint {path}'}
+
+    def _reply(self, handler, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+
+if __name__ == '__main__':
+    with MockTradovate(port=8765) as mock:
+        print(f"🧪 Mock Tradovate API on {mock.url} (user demo / demo), Ctrl-C to stop")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
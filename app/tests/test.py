@@ -2,6 +2,7 @@ import unittest
 import os
 from app.main import app
 from app.db.models import db, Trade
+from app.services.trade_cache import invalidate_trade_cache
 
 class TestTrades(unittest.TestCase):
     """ Set up test client and database before test"""
@@ -30,6 +31,8 @@ class TestTrades(unittest.TestCase):
         with app.app_context():
             db.session.remove()
             db.drop_all()
+        # the trade snapshot outlives the dropped tables otherwise
+        invalidate_trade_cache()
         print("Cleaned up test db")
         
     def test_insert_trade(self):
@@ -307,9 +310,373 @@ class TestTrades(unittest.TestCase):
         self.assertEqual(day2['trade_count'], 2)
         self.assertEqual(day2['winning_trades'], 1)
         self.assertEqual(day2['losing_trades'], 1)
-            
 
 
+    def test_daily_pnl_summary_matches_daily(self):
+        """Starting Test SQL-side daily PnL summary against the per-trade endpoint"""
+        trades = [
+            {
+                'id': 'TEST_SUM_001',
+                'acc_id': 'ACC01',
+                'symbol': 'MGC',
+                'direction': 'LONG',
+                'entry_time': '2024-01-16T09:30:00',
+                'exit_time': '2024-01-16T14:00:00',  # exactly at the CME close (4pm CT): same trading day
+                'entry_price': 4000,
+                'exit_price': 4100,
+                'quantity': 1,
+                'pnl': 100.0,
+                'strategy': 'Test'
+            },
+            {
+                'id': 'TEST_SUM_002',
+                'acc_id': 'ACC01',
+                'symbol': 'NQ',
+                'direction': 'LONG',
+                'entry_time': '2024-01-16T13:00:00',
+                'exit_time': '2024-01-16T14:00:01',  # after the close: next trading day
+                'entry_price': 25000,
+                'exit_price': 24950,
+                'quantity': 1,
+                'pnl': -50.0,
+                'strategy': 'Test'
+            }
+        ]
+        for trade in trades:
+            self.app.post('/api/trades', json=trade)
+
+        daily = self.app.get('/api/pnl/daily').get_json()
+        summary_response = self.app.get('/api/pnl/daily/summary')
+        summary = summary_response.get_json()
+
+        self.assertEqual(summary_response.status_code, 200)
+        self.assertEqual(summary['total_pnl'], daily['total_pnl'])
+        self.assertEqual(summary['total_trades'], daily['total_trades'])
+        self.assertEqual([d['date'] for d in summary['data']], ['2024-01-16', '2024-01-17'])
+        for day, expected in zip(summary['data'], daily['data']):
+            self.assertNotIn('trades', day)
+            for key in ['date', 'pnl', 'trade_count', 'winning_trades', 'losing_trades']:
+                self.assertEqual(day[key], expected[key])
+
+        # trades only come back when asked for
+        with_trades = self.app.get('/api/pnl/daily/summary?include_trades=true').get_json()
+        self.assertEqual(len(with_trades['data'][0]['trades']), 1)
+
+
+    def test_daily_pnl_rollup(self):
+        """Starting Test daily_pnl rollup is kept in step with inserted trades"""
+        for i, (exit_time, pnl) in enumerate([('2024-01-16T10:00:00', 100.0),
+                                              ('2024-01-16T11:00:00', -40.0),
+                                              ('2024-01-17T10:00:00', 25.0)]):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_ROLLUP_{i}',
+                'acc_id': 'ACC01',
+                'symbol': 'MGC',
+                'direction': 'LONG',
+                'entry_time': '2024-01-16T09:30:00',
+                'exit_time': exit_time,
+                'entry_price': 4000,
+                'exit_price': 4000,
+                'quantity': 1,
+                'pnl': pnl,
+                'strategy': 'Test'
+            })
+
+        from_trades = self.app.get('/api/pnl/daily').get_json()
+        from_rollup = self.app.get('/api/pnl/daily?include_trades=false').get_json()
+
+        self.assertEqual(from_rollup['total_pnl'], from_trades['total_pnl'])
+        self.assertEqual(from_rollup['total_trades'], 3)
+        for day, expected in zip(from_rollup['data'], from_trades['data']):
+            self.assertNotIn('trades', day)
+            for key in ['date', 'pnl', 'trade_count', 'winning_trades', 'losing_trades']:
+                self.assertEqual(day[key], expected[key])
+
+        calendar = self.app.get('/api/trades/calendar?year=2024&month=1&include_trades=false').get_json()
+        self.assertEqual([(d['date'], d['pnl']) for d in calendar['data']], [('2024-01-16', 60.0), ('2024-01-17', 25.0)])
+
+        # rows left by an older session calendar are rebuilt once, then left alone
+        from datetime import date
+        from app.db.models import DailyPnl, RollupVersion
+        from app.services.daily_rollup import ensure_rollup_current
+        with app.app_context():
+            db.session.merge(RollupVersion(name='daily_pnl', calendar_version=1))
+            DailyPnl.query.filter_by(trading_day=date(2024, 1, 17)).update({'pnl': 999})
+            db.session.commit()
+            self.assertTrue(ensure_rollup_current())
+            self.assertFalse(ensure_rollup_current())
+        rollup = self.app.get('/api/pnl/daily?include_trades=false').get_json()
+        self.assertEqual([(d['date'], d['pnl']) for d in rollup['data']], [('2024-01-16', 60.0), ('2024-01-17', 25.0)])
+
+    def test_session_calendar_buckets(self):
+        """Starting Test PnL buckets follow each product's session calendar"""
+        from app.services.daily_rollup import rebuild_daily_rollup
+
+        # MLK day 2024-01-15 is a CME holiday: MGC / NQ trades that day count for the 16th,
+        # CL has no session spec and keeps the 3pm Pacific cutoff
+        for i, (symbol, exit_time, pnl) in enumerate([('MGC', '2024-01-15T10:00:00', 100.0),
+                                                      ('NQ', '2024-01-12T14:30:00', 50.0),
+                                                      ('CL', '2024-01-15T10:00:00', -20.0),
+                                                      ('CL', '2024-01-15T15:30:00', 10.0)]):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_SESSION_{i}',
+                'acc_id': 'ACC01',
+                'symbol': symbol,
+                'direction': 'LONG',
+                'entry_time': '2024-01-12T09:30:00',
+                'exit_time': exit_time,
+                'entry_price': 100,
+                'exit_price': 100,
+                'quantity': 1,
+                'pnl': pnl,
+                'strategy': 'Test'
+            })
+
+        expected = [('2024-01-15', -20.0), ('2024-01-16', 160.0)]
+        daily = self.app.get('/api/pnl/daily').get_json()
+        self.assertEqual([(d['date'], d['pnl']) for d in daily['data']], expected)
+        summary = self.app.get('/api/pnl/daily/summary?source=trades').get_json()
+        self.assertEqual([(d['date'], d['pnl']) for d in summary['data']], expected)
+
+        one_day = '?start_date=2024-01-16&end_date=2024-01-16'
+        for url in ['/api/pnl/daily' + one_day, '/api/pnl/daily/summary' + one_day + '&source=trades',
+                    '/api/pnl/daily/summary' + one_day]:
+            data = self.app.get(url).get_json()['data']
+            self.assertEqual([(d['date'], d['pnl'], d['trade_count']) for d in data], [('2024-01-16', 160.0, 3)], url)
+
+        with app.app_context():
+            rebuild_daily_rollup()
+        rollup = self.app.get('/api/pnl/daily?include_trades=false').get_json()
+        self.assertEqual([(d['date'], d['pnl']) for d in rollup['data']], expected)
+
+        stats = self.app.get('/api/analytics/summary?source=db&start_date=2024-01-16&end_date=2024-01-16').get_json()
+        self.assertEqual(stats['total_trades'], 3)
+
+
+    def test_get_trades_pagination(self):
+        """Starting Test keyset pagination, fields= projection and filters on GET /api/trades"""
+        for i in range(5):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_PAGE_{i}',
+                'acc_id': 'ACC01' if i % 2 == 0 else 'ACC02',
+                'symbol': 'MGC',
+                'direction': 'LONG',
+                'entry_time': '2024-01-15T09:30:00',
+                # two trades share an exit time so the id tie-break is exercised
+                'exit_time': f'2024-01-{15 + min(i, 3)}T10:00:00',
+                'entry_price': 4000,
+                'exit_price': 4001,
+                'quantity': 1,
+                'pnl': 10.0,
+                'strategy': 'Test'
+            })
+
+        seen = []
+        cursor = None
+        while True:
+            url = '/api/trades?limit=2&fields=id,exit_time,pnl'
+            if cursor:
+                url += f'&cursor={cursor}'
+            page = self.app.get(url).get_json()
+            self.assertLessEqual(page['count'], 2)
+            for trade in page['trades']:
+                self.assertEqual(set(trade), {'id', 'exit_time', 'pnl'})
+            seen.extend(t['id'] for t in page['trades'])
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                break
+
+        # newest first, every trade exactly once
+        self.assertEqual(seen, ['TEST_PAGE_4', 'TEST_PAGE_3', 'TEST_PAGE_2', 'TEST_PAGE_1', 'TEST_PAGE_0'])
+
+        by_account = self.app.get('/api/trades?account=ACC02').get_json()
+        self.assertEqual(sorted(t['id'] for t in by_account['trades']), ['TEST_PAGE_1', 'TEST_PAGE_3'])
+
+        in_range = self.app.get('/api/trades?start_date=2024-01-16T00:00:00&end_date=2024-01-17T23:59:59').get_json()
+        self.assertEqual(sorted(t['id'] for t in in_range['trades']), ['TEST_PAGE_1', 'TEST_PAGE_2'])
+
+        # no limit / cursor: everything in one response
+        unpaged = self.app.get('/api/trades').get_json()
+        self.assertEqual((unpaged['count'], unpaged['has_more'], unpaged['next_cursor']), (5, False, None))
+
+        self.assertEqual(self.app.get('/api/trades?fields=id,bogus').status_code, 400)
+        self.assertEqual(self.app.get('/api/trades?cursor=nope').status_code, 400)
+        bad_date = self.app.get('/api/trades?start_date=2024-13-45')
+        self.assertEqual(bad_date.status_code, 400)
+        self.assertIn('error', bad_date.get_json())
+
+    def test_analytics_summary(self):
+        """Starting Test /api/analytics/summary over inserted trades"""
+        for i, (exit_time, pnl) in enumerate([('2024-01-16T10:00:00', 100.0),
+                                              ('2024-01-16T11:00:00', -40.0),
+                                              ('2024-01-17T10:00:00', 25.0)]):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_STATS_{i}',
+                'acc_id': 'ACC01',
+                'symbol': 'MGC',
+                'direction': 'LONG',
+                'entry_time': '2024-01-16T09:30:00',
+                'exit_time': exit_time,
+                'entry_price': 4000,
+                'exit_price': 4000,
+                'quantity': 1,
+                'pnl': pnl,
+                'strategy': 'Test'
+            })
+
+        response = self.app.get('/api/analytics/summary?series=daily')
+        stats = response.get_json()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stats['total_trades'], 3)
+        self.assertAlmostEqual(stats['win_rate'], 200 / 3)
+        self.assertAlmostEqual(stats['profit_factor'], 125 / 40)
+        self.assertEqual(stats['max_drawdown'], 40.0)
+        self.assertEqual([p['date'] for p in stats['equity_curve']], ['2024-01-16', '2024-01-17'])
+
+        self.assertEqual(self.app.get('/api/analytics/summary?symbol=NQ').get_json()['total_trades'], 0)
+
+    def test_trade_cache_follows_writes(self):
+        """Starting Test trade snapshot matches the db and is rebuilt after inserts"""
+        def post(i, pnl, symbol='MGC'):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_CACHE_{i}',
+                'acc_id': 'ACC01',
+                'symbol': symbol,
+                'direction': 'SHORT' if i % 2 else 'LONG',
+                'entry_time': '2024-01-15T09:30:00',
+                'exit_time': f'2024-01-{15 + i}T10:00:00',
+                'entry_price': 4000,
+                'exit_price': 4000,
+                'quantity': 1,
+                'pnl': pnl,
+                'strategy': 'Test'
+            })
+
+        post(0, 50.0)
+        post(1, -20.0, symbol='NQ')
+        self.assertEqual(self.app.get('/api/analytics/summary').get_json()['total_trades'], 2)
+
+        # a write through the API drops the snapshot
+        post(2, 10.0)
+        for params in ['', '?symbol=MGC', '?direction=SHORT', '?start_date=2024-01-16&end_date=2024-01-17']:
+            cached = self.app.get(f'/api/analytics/summary{params}').get_json()
+            from_db = self.app.get(f'/api/analytics/summary{params}{"&" if params else "?"}source=db').get_json()
+            self.assertEqual(cached, from_db, params)
+        self.assertEqual(self.app.get('/api/analytics/summary').get_json()['total_trades'], 3)
+
+        report = self.app.get('/api/analytics/cache').get_json()
+        self.assertEqual(report['trades'], 3)
+        self.assertEqual(report['symbols'], 2)
+        self.assertGreater(report['mb_per_million_trades'], 0)
+
+    def test_request_profiling(self):
+        """Starting Test profiling hooks report SQL counts / rows and dump slow requests"""
+        import tempfile
+        for i in range(3):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_PROFILE_{i}',
+                'acc_id': 'ACC01',
+                'symbol': 'MGC',
+                'direction': 'LONG',
+                'entry_time': '2024-01-15T09:30:00',
+                'exit_time': f'2024-01-15T1{i}:00:00',
+                'entry_price': 4000,
+                'exit_price': 4001,
+                'quantity': 1,
+                'pnl': 10.0,
+                'strategy': 'Test'
+            })
+
+        # off by default
+        response = self.app.get('/api/trades')
+        self.assertNotIn('X-Profile-Wall-Ms', response.headers)
+
+        with tempfile.TemporaryDirectory() as profile_dir:
+            app.config.update(PROFILE_REQUESTS=True, PROFILE_DUMP_MS=0, PROFILE_DIR=profile_dir)
+            try:
+                response = self.app.get('/api/trades')
+                patched = self.app.patch('/api/trades/TEST_PROFILE_0', json={'notes': 'profiled'})
+            finally:
+                app.config.update(PROFILE_REQUESTS=False, PROFILE_DUMP_MS=None)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertGreaterEqual(int(response.headers['X-Profile-Sql-Count']), 1)
+            # GET /api/trades reads row tuples, the PATCH loads one Trade
+            self.assertEqual(int(response.headers['X-Profile-Rows']), 0)
+            self.assertEqual(int(patched.headers['X-Profile-Rows']), 1)
+            self.assertTrue(os.path.exists(response.headers['X-Profile-Dump']))
+
+            import pstats
+            self.assertGreater(pstats.Stats(response.headers['X-Profile-Dump']).total_calls, 0)
+
+    def test_export_trades(self):
+        """Starting Test streaming NDJSON / CSV export"""
+        import csv
+        import io
+        import json
+        for i in range(3):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_EXPORT_{i}',
+                'acc_id': 'ACC01',
+                'symbol': 'NQ' if i == 1 else 'MGC',
+                'direction': 'LONG',
+                'entry_time': '2024-01-15T09:30:00',
+                'exit_time': f'2024-01-15T1{2 - i}:00:00',
+                'entry_price': 4000,
+                'exit_price': 4001.5,
+                'quantity': 2,
+                'pnl': 10.0 * i,
+                'strategy': 'Test'
+            })
+
+        response = self.app.get('/api/trades/export')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        # oldest first, same shape as GET /api/trades minus fills
+        self.assertEqual([r['id'] for r in rows], ['TEST_EXPORT_2', 'TEST_EXPORT_1', 'TEST_EXPORT_0'])
+        listed = self.app.get('/api/trades').get_json()['trades']
+        expected = {t['id']: {k: v for k, v in t.items() if k != 'fills'} for t in listed}
+        self.assertEqual({r['id']: r for r in rows}, expected)
+
+        response = self.app.get('/api/trades/export?format=csv&symbol=MGC&fields=id,pnl&fills=true')
+        self.assertEqual(response.mimetype, 'text/csv')
+        rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual(rows, [['id', 'pnl', 'fills'], ['TEST_EXPORT_2', '20.0', '[]'], ['TEST_EXPORT_0', '0.0', '[]']])
+
+        self.assertEqual(self.app.get('/api/trades/export?format=xml').status_code, 400)
+        self.assertEqual(self.app.get('/api/trades/export?fields=nope').status_code, 400)
+
+    def test_trade_rows_match_to_dict(self):
+        """Starting Test row-tuple responses match Trade.to_dict()"""
+        for i in range(3):
+            self.app.post('/api/trades', json={
+                'id': f'TEST_ROWS_{i}',
+                'acc_id': 'ACC01',
+                'symbol': 'MGC',
+                'direction': 'SHORT',
+                'entry_time': '2024-01-15T09:30:00.250000',
+                'exit_time': f'2024-01-16T1{i}:00:00',
+                'entry_price': 4000.25,
+                'exit_price': 3999.75,
+                'quantity': 3,
+                'pnl': 1.5 * i,
+                'strategy': 'Test' if i else None
+            })
+        self.app.patch('/api/trades/TEST_ROWS_1', json={'tags': ['a', 'b'], 'notes': 'note'})
+
+        with app.app_context():
+            expected = {t.id: t.to_dict() for t in Trade.query.all()}
+
+        listed = self.app.get('/api/trades').get_json()['trades']
+        self.assertEqual({t['id']: t for t in listed}, expected)
+        daily = self.app.get('/api/pnl/daily').get_json()['data']
+        self.assertEqual({t['id']: t for day in daily for t in day['trades']}, expected)
+        calendar = self.app.get('/api/trades/calendar').get_json()['data']
+        self.assertEqual({t['id']: t for day in calendar for t in day['trades']}, expected)
+
 if __name__ == '__main__':
     unittest.main(buffer=False)
 
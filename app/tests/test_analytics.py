@@ -0,0 +1,142 @@
+"""
+Analytics service tests.
+
+compute_summary works on plain numpy arrays, so no database is needed.
+"""
+
+import time
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from app.api.pnl import get_trading_day
+from app.services.analytics import compute_summary, trading_days, equity_curve, daily_totals
+from app.services.trade_cache import TradeSnapshot, _intern
+
+
+def loop_summary(pnl):
+    """the dashboard's per-trade loop, as the reference"""
+    wins = [p for p in pnl if p > 0]
+    losses = [p for p in pnl if p < 0]
+    peak = running = max_dd = 0
+    for p in pnl:
+        running += p
+        peak = max(peak, running)
+        max_dd = max(max_dd, peak - running)
+    return {
+        'win_rate': len(wins) / len(pnl) * 100,
+        'avg_win': sum(wins) / len(wins),
+        'avg_loss': abs(sum(losses)) / len(losses),
+        'profit_factor': sum(wins) / abs(sum(losses)),
+        'max_drawdown': max_dd,
+        'expectancy': sum(pnl) / len(pnl),
+    }
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def test_matches_dashboard_loop(self):
+        rng = np.random.default_rng(7)
+        pnl = rng.normal(2, 50, 2000).round(2)
+        summary = compute_summary(pnl)
+        expected = loop_summary(pnl.tolist())
+
+        for key, value in expected.items():
+            self.assertAlmostEqual(summary[key], value, places=6, msg=key)
+        self.assertEqual(summary['total_trades'], 2000)
+
+    def test_streaks(self):
+        summary = compute_summary(np.array([10, 5, -1, -2, -3, 0, 4, 4, 4, 4, -1, 2]))
+
+        self.assertEqual(summary['max_win_streak'], 4)
+        self.assertEqual(summary['max_loss_streak'], 3)
+        self.assertEqual(summary['current_streak'], 1)
+        self.assertEqual(summary['breakeven_trades'], 1)
+
+    def test_drawdown_starts_from_flat(self):
+        # losing straight away is a drawdown from the flat account
+        summary = compute_summary(np.array([-50.0, 20.0, -10.0]))
+        self.assertEqual(summary['max_drawdown'], 50.0)
+        self.assertEqual(summary['max_drawdown_trade_index'], 0)
+
+    def test_empty(self):
+        summary = compute_summary(np.array([]))
+        self.assertEqual(summary['total_trades'], 0)
+        self.assertEqual(summary['profit_factor'], 0.0)
+
+    def test_trading_days_match_get_trading_day(self):
+        times = [datetime(2024, 3, 8, 14, 59), datetime(2024, 3, 8, 15, 0), datetime(2024, 3, 8, 15, 0, 1),
+                 datetime(2024, 3, 8, 23, 30), datetime(2024, 3, 10, 2, 0), datetime(2024, 11, 3, 16, 0)]
+        days = trading_days(np.array(times, dtype='datetime64[us]'))
+        self.assertEqual(days.astype(str).tolist(), [get_trading_day(t) for t in times])
+
+    def test_daily_sharpe_and_curve(self):
+        start = datetime(2024, 1, 2, 9, 0)
+        times = np.array([start + timedelta(days=d, hours=h) for d in range(10) for h in (0, 1)], dtype='datetime64[us]')
+        pnl = np.tile([30.0, -10.0], 10)
+        pnl[::4] = -40.0
+        days = trading_days(times)
+
+        summary = compute_summary(pnl, days)
+        _, daily_pnl = daily_totals(pnl, days)
+        self.assertEqual(summary['trading_days'], 10)
+        self.assertAlmostEqual(summary['sharpe_ratio'], daily_pnl.mean() / daily_pnl.std(ddof=1) * np.sqrt(252))
+        downside = np.sqrt(np.mean(np.minimum(daily_pnl, 0) ** 2))
+        self.assertAlmostEqual(summary['sortino_ratio'], daily_pnl.mean() / downside * np.sqrt(252))
+
+        curve = equity_curve(pnl, days, by='daily')
+        self.assertEqual(len(curve), 10)
+        self.assertAlmostEqual(curve[-1]['equity'], pnl.sum())
+
+    def test_one_million_trades(self):
+        rng = np.random.default_rng(1)
+        pnl = rng.normal(5, 100, 1_000_000)
+        seconds = np.sort(rng.integers(0, 5 * 365 * 86400, pnl.size))
+        exit_time = np.datetime64('2020-01-01T00:00:00', 'us') + seconds.astype('timedelta64[s]')
+
+        started = time.perf_counter()
+        summary = compute_summary(pnl, trading_days(exit_time))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(summary['total_trades'], 1_000_000)
+        # ~60ms on a laptop; loose bound so slow CI boxes don't flake
+        self.assertLess(elapsed, 0.5)
+
+
+
+class TestTradeSnapshot(unittest.TestCase):
+
+    def build(self, count):
+        rng = np.random.default_rng(3)
+        exit_time = np.datetime64('2024-01-02T09:00:00', 'us') + np.arange(count).astype('timedelta64[m]')
+        symbol_code, symbols = _intern(rng.choice(['MGC', 'NQ', 'ES'], count).tolist())
+        account_code, accounts = _intern(rng.choice(['ACC01', 'ACC02'], count).tolist())
+        return TradeSnapshot(
+            exit_time=exit_time,
+            entry_time=exit_time - np.timedelta64(5, 'm'),
+            pnl=rng.normal(0, 50, count),
+            quantity=np.ones(count, dtype=np.int32),
+            direction=rng.choice(np.array([1, -1], dtype=np.int8), count),
+            symbol_code=symbol_code, symbols=symbols,
+            account_code=account_code, accounts=accounts,
+        )
+
+    def test_select(self):
+        snapshot = self.build(5000)
+        mask = snapshot.select(start_date='2024-01-03', end_date='2024-01-03', symbol='NQ', direction='long')
+
+        expected = ((snapshot.trading_day == np.datetime64('2024-01-03'))
+                    & (snapshot.symbol_code == snapshot.symbols.index('NQ'))
+                    & (snapshot.direction == 1))
+        self.assertTrue(mask.any())
+        self.assertTrue((mask == expected).all())
+        self.assertFalse(snapshot.select(symbol='CL').any())
+
+    def test_memory_per_million(self):
+        report = self.build(1_000_000).memory_report()
+
+        self.assertEqual(report['trades'], 1_000_000)
+        self.assertEqual(report['bytes_per_trade'], 45)
+        self.assertLess(report['mb_per_million_trades'], 50)
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
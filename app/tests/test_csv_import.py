@@ -8,10 +8,22 @@ Tests the basic import flow:
 """
 
 import unittest
+import csv
+import io
+import time
 import os
+from decimal import Decimal
 from app.main import app
-from app.db.models import db, Trade, Order
-from app.utils.csv_parser import save_raw_orders_to_db, process_filled_orders_to_trades
+from app.db.models import db, Trade, Order, PositionState, DailyPnl, Instrument
+from app.services.instruments import invalidate_instrument_cache
+from app.services.price_feed import FilePriceFeed, ReplayPriceFeed, set_price_feed
+from app.utils.csv_parser import (
+    save_raw_orders_to_db, bulk_save_raw_orders_to_db, stream_save_raw_orders_to_db,
+    process_filled_orders_to_trades, process_new_fills_to_trades,
+    parse_csv_text, find_column_value, compile_row_extractor, map_csv_row_to_backend_format,
+    parse_and_validate_csv, TRADE_CSV_COLUMNS,
+    parallel_save_raw_orders_to_db, parallel_map_order_rows, split_csv_byte_ranges, _map_order_rows,
+)
 
 
 class TestCsvImports(unittest.TestCase):
@@ -21,6 +33,14 @@ class TestCsvImports(unittest.TestCase):
     
     # Path to your CSV file
     CSV_FILE_PATH = "/Users/desmondjung/Downloads/Orders.csv"
+
+    # Small inline Orders.csv used by tests that shouldn't depend on the local file
+    SAMPLE_CSV = (
+        "orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status,Type\n"
+        "1,ACC1,Buy,MGCG6,MGC,2000.5,1,1/15/26 7:40,Filled,Market\n"
+        "2,ACC1,Sell,MGCG6,MGC,2003.0,1,1/15/26 7:45,Filled,Limit\n"
+        "3,ACC1,Buy,MGCG6,MGC,,,,Canceled,Limit\n"
+    )
     
     def setUp(self):
         """Set up test database before each test"""
@@ -45,6 +65,8 @@ class TestCsvImports(unittest.TestCase):
         with app.app_context():
             db.session.remove()
             db.drop_all()
+        # cached instrument specs outlive the dropped tables otherwise
+        invalidate_instrument_cache()
         print("✓ Test database cleaned")
     
     # ============================================
@@ -338,5 +360,607 @@ class TestCsvImports(unittest.TestCase):
         print("✓ TEST 4 PASSED: Trades import confirmed")
 
 
+    # ============================================
+    # TEST 5: Bulk Orders Import
+    # ============================================
+    def test_bulk_orders_import(self):
+        """
+        TEST 5: Bulk Orders Import
+
+        What we're testing:
+        - Bulk mode stores the same rows as the per-row path
+        - Re-importing is idempotent and reports rows/sec
+        """
+        print("\n--- TEST 5: Bulk Orders Import ---")
+
+        with app.app_context():
+            saved, errors, stats = bulk_save_raw_orders_to_db(self.SAMPLE_CSV, account="default")
+            print(f"  Bulk stats: {stats}")
+            self.assertEqual(len(saved), 3)
+            self.assertEqual(errors, [])
+            self.assertEqual(stats['inserted'], 3)
+            self.assertIn('rows_per_sec', stats)
+
+            bulk_rows = {o.id: o.to_dict() for o in Order.query.all()}
+
+            # Same CSV again: nothing new, every row reported as existing
+            saved, errors, stats = bulk_save_raw_orders_to_db(self.SAMPLE_CSV, account="default")
+            self.assertEqual(len(saved), 0)
+            self.assertEqual(stats['existing'], 3)
+            self.assertEqual(Order.query.count(), 3)
+
+            # Per-row path on a clean table produces identical rows
+            Order.query.delete()
+            db.session.commit()
+            save_raw_orders_to_db(self.SAMPLE_CSV, account="default")
+            serial_rows = {o.id: o.to_dict() for o in Order.query.all()}
+            self.assertEqual(bulk_rows, serial_rows)
+
+        print("✓ TEST 5 PASSED: Bulk orders import confirmed")
+
+
+    # ============================================
+    # TEST 6: Streaming Orders Import
+    # ============================================
+    def test_streaming_orders_import(self):
+        """
+        TEST 6: Streaming Orders Import
+
+        What we're testing:
+        - A binary stream is saved chunk by chunk (one commit per chunk)
+        - Progress counters are filled in while it runs
+        - An upload's counters are kept in the job store and read back by import_id
+        - Reusing the import_id of a running import is a 409
+        """
+        print("\n--- TEST 6: Streaming Orders Import ---")
+
+        with app.app_context():
+            progress = {}
+            saved, errors, stats = stream_save_raw_orders_to_db(
+                io.BytesIO(self.SAMPLE_CSV.encode("utf-8")), account="default", chunk_size=2, progress=progress
+            )
+            print(f"  Streaming stats: {stats}")
+            self.assertEqual(saved, 3)
+            self.assertEqual(errors, [])
+            self.assertIs(stats, progress)
+            self.assertEqual(progress['status'], 'done')
+            self.assertEqual(progress['rows_parsed'], 3)
+            self.assertEqual(progress['chunks_committed'], 2)
+            self.assertEqual(Order.query.count(), 3)
+
+        response = self.app.post('/api/trades/import', data={
+            'file': (io.BytesIO(self.SAMPLE_CSV.encode("utf-8")), 'orders.csv'),
+            'stream': 'true', 'import_id': 'stream-test', 'chunk_size': '2',
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.get_json()['import_id'], 'stream-test')
+        progress = self.app.get('/api/trades/import/progress/stream-test').get_json()
+        self.assertEqual((progress['status'], progress['rows_parsed']), ('done', 3))
+        self.assertEqual(self.app.get('/api/jobs/stream-test').get_json()['status'], 'succeeded')
+
+        # an id that's still in use by a running import is refused, not overwritten
+        from app.services.jobs import finish_job, track_job
+        running = track_job('import.stream', 'stream-busy')
+        running['rows_parsed'] = 7
+        response = self.app.post('/api/trades/import', data={
+            'file': (io.BytesIO(self.SAMPLE_CSV.encode("utf-8")), 'orders.csv'),
+            'stream': 'true', 'import_id': 'stream-busy',
+        }, content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.app.get('/api/trades/import/progress/stream-busy').get_json()['rows_parsed'], 7)
+        finish_job('stream-busy')
+        self.assertEqual(self.app.get('/api/trades/import/progress/nope').status_code, 404)
+
+        print("✓ TEST 6 PASSED: Streaming orders import confirmed")
+
+
+    # ============================================
+    # TEST 7: Incremental Matching
+    # ============================================
+    def test_incremental_matching(self):
+        """
+        TEST 7: Incremental Matching
+
+        What we're testing:
+        - An open position is persisted and resumed on the next run
+        - Re-running with no new fills does no work
+        - Fills the walk couldn't turn into a trade aren't taken for late fills
+        """
+        print("\n--- TEST 7: Incremental Matching ---")
+
+        header = "orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status\n"
+        first_import = header + (
+            "1,ACC1,Buy,MGCG6,MGC,2000.0,2,1/15/26 7:40,Filled\n"
+            "2,ACC1,Sell,MGCG6,MGC,2003.0,1,1/15/26 7:45,Filled\n"
+        )
+        second_import = header + "3,ACC1,Sell,MGCG6,MGC,2005.0,1,1/15/26 8:00,Filled\n"
+
+        with app.app_context():
+            bulk_save_raw_orders_to_db(first_import)
+            result = process_new_fills_to_trades()
+            self.assertEqual(result['trades_created'], 0)
+
+            state = db.session.get(PositionState, ("ACC1", "MGCG6"))
+            self.assertEqual(state.net_position, 1)
+            self.assertEqual(len(state.open_order_ids), 2)
+
+            bulk_save_raw_orders_to_db(second_import)
+            result = process_new_fills_to_trades()
+            self.assertEqual(result['filled_orders_count'], 1)
+            self.assertEqual(result['trades_created'], 1)
+            self.assertEqual(db.session.get(PositionState, ("ACC1", "MGCG6")).net_position, 0)
+
+            result = process_new_fills_to_trades()
+            self.assertEqual(result['filled_orders_count'], 0)
+            self.assertEqual(result['trades_created'], 0)
+            self.assertEqual(Trade.query.count(), 1)
+
+            # a round trip with no entry price can't be priced, so its orders stay unmatched
+            bulk_save_raw_orders_to_db(header + (
+                "4,ACC1,Buy,MGCG6,MGC,,1,1/15/26 8:10,Filled\n"
+                "5,ACC1,Sell,MGCG6,MGC,2006.0,1,1/15/26 8:15,Filled\n"
+            ))
+            result = process_new_fills_to_trades()
+            self.assertEqual(result['trades_created'], 0)
+            self.assertEqual(len(db.session.get(PositionState, ("ACC1", "MGCG6")).skipped_order_ids), 2)
+
+            bulk_save_raw_orders_to_db(header + "6,ACC1,Buy,MGCG6,MGC,2007.0,1,1/15/26 8:20,Filled\n")
+            result = process_new_fills_to_trades()
+            self.assertEqual(result['groups_replayed'], 0)
+            self.assertEqual(result['filled_orders_count'], 1)
+            self.assertEqual(db.session.get(PositionState, ("ACC1", "MGCG6")).net_position, 1)
+
+        print("✓ TEST 7 PASSED: Incremental matching confirmed")
+
+
+
+    # ============================================
+    # TEST 8: Trade CSV Column Plan
+    # ============================================
+    def test_trade_csv_column_plan(self):
+        """
+        TEST 8: Trade CSV Column Plan
+
+        What we're testing:
+        - The compiled extractor reads the same values as find_column_value
+          (mixed-case / spaced headers, duplicate headers, short rows, blank lines)
+        - parse_and_validate_csv gives the same trades as the per-row dict path
+        - Extracting by index is faster than searching every row's keys
+        """
+        print("\n--- TEST 8: Trade CSV Column Plan ---")
+
+        csv_text = (
+            "Trade ID,DATE,time,Symbol,side,Entry_Price,exitprice,Qty,P L,Tags,Tags\n"
+            "T1,2026-01-15,09:30,MGC,Long,2000.5,2003,1,,first,Breakout;AM\n"
+            "\n"
+            "T2,2026-01-15,10:05:30,NQ,sell,21000,20990,2,20\n"
+            "T3,2026-01-16, 11:00 ,MGC,b,2001,1999,1, -2 ,\n"
+        )
+
+        header = csv_text.splitlines()[0].split(',')
+        extract = compile_row_extractor(header)
+        list_rows = [row for row in csv.reader(io.StringIO(csv_text)) if row][1:]
+        dict_rows = parse_csv_text(csv_text)
+
+        for list_row, dict_row in zip(list_rows, dict_rows):
+            expected = {field: find_column_value(dict_row, names) for field, names in TRADE_CSV_COLUMNS.items()}
+            self.assertEqual(extract(list_row), expected)
+
+        trades, errors = parse_and_validate_csv(csv_text)
+        self.assertEqual(errors, [])
+        self.assertEqual(trades, [map_csv_row_to_backend_format(row) for row in dict_rows])
+        self.assertEqual([t['strategy'] for t in trades], ['Breakout', None, None])
+        self.assertEqual(trades[2]['direction'], 'LONG')
+        self.assertEqual(trades[2]['pnl'], -2.0)
+
+        rows = list_rows * 2000
+        dict_rows = dict_rows * 2000
+        started = time.perf_counter()
+        for row in dict_rows:
+            for names in TRADE_CSV_COLUMNS.values():
+                find_column_value(row, names)
+        search_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        for row in rows:
+            extract(row)
+        plan_elapsed = time.perf_counter() - started
+        print(f"   find_column_value: {search_elapsed:.3f}s, compiled plan: {plan_elapsed:.3f}s")
+        self.assertLess(plan_elapsed * 3, search_elapsed)
+
+        print("✓ TEST 8 PASSED: Trade CSV column plan confirmed")
+
+
+    # ============================================
+    # TEST 9: Parallel Orders Import
+    # ============================================
+    def test_parallel_orders_import(self):
+        """
+        TEST 9: Parallel Orders Import
+
+        What we're testing:
+        - Byte-range chunks never split a quoted multi-line field
+        - Mapping in a process pool gives exactly the serial result (order, row numbers, errors)
+        - parallel_save_raw_orders_to_db stores the same rows as bulk mode
+        - The import endpoint rejects a workers value that isn't a positive integer
+        """
+        print("\n--- TEST 9: Parallel Orders Import ---")
+
+        header = "orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status,Type,Text\r\n"
+        lines = []
+        for i in range(400):
+            text = '"stop\nmoved, ""twice"""' if i % 37 == 0 else "ok"
+            lines.append(f"{i},ACC{i % 12},{'Buy' if i % 2 else 'Sell'},MGCG6,MGC,{2000 + i % 9}.5,{1 + i % 3},"
+                         f"1/{1 + i % 28}/26 7:{i % 60:02d},{'Filled' if i % 4 else 'Canceled'},Market,{text}\r\n")
+            if i % 100 == 0:
+                lines.append("\r\n")  # blank lines don't count as rows
+        csv_text = header + "".join(lines)
+        data = csv_text.encode("utf-8")
+
+        header_end, ranges = split_csv_byte_ranges(data, 16)
+        self.assertGreater(len(ranges), 1)
+        self.assertEqual(b"".join(data[start:end] for start, end in ranges), data[header_end:])
+        for start, _ in ranges:
+            self.assertEqual(data[:start].count(b'"') % 2, 0)
+
+        serial = _map_order_rows(parse_csv_text(csv_text), "default")
+        self.assertEqual(parallel_map_order_rows(data, "default", workers=2), serial)
+
+        with app.app_context():
+            saved, errors, stats = parallel_save_raw_orders_to_db(csv_text, account="default", workers=2)
+            print(f"  Parallel stats: {stats}")
+            self.assertEqual(len(saved), 400)
+            self.assertEqual(stats['workers'], 2)
+            parallel_rows = {o.id: o.to_dict() for o in Order.query.all()}
+
+            Order.query.delete()
+            db.session.commit()
+            bulk_save_raw_orders_to_db(csv_text, account="default")
+            bulk_rows = {o.id: o.to_dict() for o in Order.query.all()}
+            self.assertEqual(parallel_rows, bulk_rows)
+
+        # workers has to be a positive integer
+        for workers in ['abc', 0, -2]:
+            response = self.app.post('/api/trades/import', json={
+                'csv_text': self.SAMPLE_CSV, 'parallel': True, 'workers': workers
+            })
+            self.assertEqual(response.status_code, 400, workers)
+
+        print("✓ TEST 9 PASSED: Parallel orders import confirmed")
+
+    # ============================================
+    # TEST 10: Background Import Job
+    # ============================================
+    def test_background_import_job(self):
+        """
+        TEST 10: Background Import Job
+
+        What we're testing:
+        - POST /api/jobs/import returns 202 with a job id right away
+        - GET /api/jobs/<id> reports progress and finishes with the import result
+        - Unknown job ids are a 404
+        """
+        print("\n--- TEST 10: Background Import Job ---")
+
+        response = self.app.post('/api/jobs/import', json={'csv_text': self.SAMPLE_CSV, 'default_acc_id': 'default'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['job_id']
+
+        deadline = time.time() + 30
+        while True:
+            job = self.app.get(f'/api/jobs/{job_id}').get_json()
+            if job['status'] in ['succeeded', 'failed'] or time.time() > deadline:
+                break
+            time.sleep(0.05)
+
+        print(f"  Job: {job}")
+        self.assertEqual(job['status'], 'succeeded', job['error'])
+        self.assertEqual(job['progress']['stage'], 'done')
+        self.assertEqual(job['progress']['rows_total'], 3)
+        self.assertEqual(job['progress']['rows_parsed'], 3)
+        self.assertEqual(job['progress']['orders_saved'], 3)
+        self.assertEqual(job['result']['trades_created'], 1)
+
+        with app.app_context():
+            self.assertEqual(Order.query.count(), 3)
+            self.assertEqual(Trade.query.count(), 1)
+
+        self.assertEqual(self.app.get('/api/jobs/nope').status_code, 404)
+
+        print("✓ TEST 10 PASSED: Background import job confirmed")
+
+    # ============================================
+    # TEST 11: Import Metrics
+    # ============================================
+    def test_import_metrics(self):
+        """
+        TEST 11: Import Metrics
+
+        What we're testing:
+        - An import records per-stage timers and counters
+        - GET /api/metrics returns them, reset=true clears them
+        """
+        print("\n--- TEST 11: Import Metrics ---")
+
+        self.app.get('/api/metrics?reset=true')
+        response = self.app.post('/api/trades/import', json={'csv_text': self.SAMPLE_CSV, 'default_acc_id': 'default'})
+        self.assertEqual(response.status_code, 201)
+
+        snapshot = self.app.get('/api/metrics?reset=true').get_json()
+        print(f"  Metrics: {snapshot}")
+        for stage in ['orders.parse', 'orders.hash', 'orders.dedupe', 'orders.insert', 'orders.commit',
+                      'match', 'match.commit', 'import.request']:
+            self.assertEqual(snapshot['timers'][stage]['count'], 1, stage)
+        self.assertEqual(snapshot['counters']['orders.rows'], 3)
+        self.assertEqual(snapshot['counters']['orders.inserted'], 3)
+        self.assertEqual(snapshot['counters']['trades.created'], 1)
+
+        snapshot = self.app.get('/api/metrics').get_json()
+        self.assertEqual(snapshot['counters'], {})
+        self.assertEqual(snapshot['timers'], {})
+
+        print("✓ TEST 11 PASSED: Import metrics confirmed")
+
+    # ============================================
+    # TEST 12: Instrument Pricing + Reprice Job
+    # ============================================
+    def test_instrument_pricing_and_reprice(self):
+        """
+        TEST 12: Instrument Pricing + Reprice Job
+
+        What we're testing:
+        - Matched trades are priced with the root's point value (MGC: $10 a point)
+        - Both matchers (position walk and lot relief) give the same dollar pnl
+        - PUT /api/instruments/<root> queues a reprice job that applies the new
+          commission to stored trades and rebuilds the daily_pnl rollup
+        """
+        print("\n--- TEST 12: Instrument Pricing + Reprice Job ---")
+
+        self.app.post('/api/trades/import', json={'csv_text': self.SAMPLE_CSV, 'default_acc_id': 'default'})
+        with app.app_context():
+            trade = Trade.query.one()
+            # 2000.5 -> 2003.0 long, 1 contract, $10 a point
+            self.assertEqual(float(trade.pnl), 25.0)
+
+            from app.services.order_matching import match_orders_to_trades
+            Trade.query.delete()
+            Order.query.update({'is_matched': False, 'matched_trade_id': None})
+            db.session.commit()
+            trades, _ = match_orders_to_trades()
+            self.assertEqual([float(t.pnl) for t in trades], [25.0])
+
+        instruments = self.app.get('/api/instruments').get_json()['instruments']
+        self.assertIn({'root': 'MGC', 'tick_size': 0.1, 'point_value': 10.0, 'commission_per_side': 0.0,
+                       'source': 'default'}, instruments)
+
+        # a manual trade keeps the pnl it was given
+        self.app.post('/api/trades', json={
+            'id': 'manual-1', 'acc_id': 'ACC1', 'symbol': 'MGCG6', 'direction': 'LONG',
+            'entry_time': '2026-01-16T07:00:00', 'exit_time': '2026-01-16T07:30:00',
+            'entry_price': 4000, 'exit_price': 4100, 'quantity': 1, 'pnl': 100})
+
+        # $0.62 a side: 25.00 - 2 * 0.62; a contract symbol resolves to its root
+        response = self.app.put('/api/instruments/MGCG6', json={'commission_per_side': 0.62})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['reprice']['job_id']
+
+        deadline = time.time() + 30
+        while True:
+            job = self.app.get(f'/api/jobs/{job_id}').get_json()
+            if job['status'] in ['succeeded', 'failed'] or time.time() > deadline:
+                break
+            time.sleep(0.05)
+
+        print(f"  Job: {job}")
+        self.assertEqual(job['status'], 'succeeded', job['error'])
+        self.assertEqual(job['result']['trades_scanned'], 2)
+        self.assertEqual(job['result']['trades_skipped'], 1)
+        self.assertEqual(job['result']['trades_updated'], 1)
+        with app.app_context():
+            self.assertEqual(float(db.session.get(Trade, 'manual-1').pnl), 100.0)
+            matched = Trade.query.filter(Trade.id != 'manual-1').one()
+            self.assertEqual(float(matched.pnl), 23.76)
+            self.assertEqual(float(db.session.query(db.func.sum(DailyPnl.pnl)).scalar()), 123.76)
+            self.assertEqual(len(Instrument.query.all()), 1)
+
+        # sub-cent ticks survive storage: HG 4.1235 -> 4.1265 is 0.003 * $25,000
+        header = "orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status\n"
+        self.app.post('/api/trades/import', json={'csv_text': header + (
+            "21,ACC1,Buy,HGH6,HG,4.1235,1,1/16/26 8:00,Filled\n"
+            "22,ACC1,Sell,HGH6,HG,4.1265,1,1/16/26 8:05,Filled\n"), 'default_acc_id': 'default'})
+        with app.app_context():
+            hg = Trade.query.filter_by(symbol='HGH6').one()
+            self.assertEqual((float(hg.entry_price), float(hg.pnl)), (4.1235, 75.0))
+            from app.services.instruments import run_reprice_job
+            run_reprice_job({}, roots=['HG'])
+            self.assertEqual(float(db.session.get(Trade, hg.id).pnl), 75.0)
+
+        self.assertEqual(self.app.put('/api/instruments/ZZ', json={'tick_size': 1}).status_code, 400)
+
+        print("✓ TEST 12 PASSED: Instrument pricing confirmed")
+
+    # ============================================
+    # TEST 13: Open Positions + Unrealised PnL
+    # ============================================
+    def test_open_positions(self):
+        """
+        TEST 13: Open Positions + Unrealised PnL
+
+        What we're testing:
+        - A position that doesn't return to zero is kept with its average entry price
+          (adds move the average, reductions don't)
+        - /api/positions marks it against a replayed feed, then a file feed
+        """
+        print("\n--- TEST 13: Open Positions + Unrealised PnL ---")
+
+        from datetime import datetime
+        import tempfile
+
+        header = "orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status\n"
+        orders = header + (
+            "1,ACC1,Buy,MGCG6,MGC,2000.0,2,1/16/26 7:40,Filled\n"
+            "2,ACC1,Buy,MGCG6,MGC,2003.0,1,1/16/26 7:45,Filled\n"
+            "3,ACC1,Sell,MGCG6,MGC,2005.0,1,1/16/26 7:50,Filled\n"
+            "4,ACC2,Sell,MNQH6,MNQ,18000.25,1,1/16/26 7:55,Filled\n"
+        )
+
+        with app.app_context():
+            bulk_save_raw_orders_to_db(orders)
+            result = process_filled_orders_to_trades()
+            self.assertEqual(result['trades_created'], 0)
+            self.assertEqual(result['open_positions'], 2)
+            self.assertEqual(result['errors'], [])
+
+            state = db.session.get(PositionState, ("ACC1", "MGCG6"))
+            self.assertEqual(state.net_position, 2)
+            self.assertEqual(float(state.avg_entry_price), 2001.0)
+            self.assertEqual(state.opened_at, datetime(2026, 1, 16, 7, 40))
+
+            # after a flip only the part of the crossing order past zero opened the position:
+            # long 1, sell 3 @110, sell 1 @120 -> short 3 at (2 * 110 + 120) / 3
+            from app.utils.csv_parser import _open_position_cost
+            flip = [Order(is_buy=False, is_sell=True, avg_price=110, filled_qty=3, fill_time=datetime(2026, 1, 16, 9, 0)),
+                    Order(is_buy=False, is_sell=True, avg_price=120, filled_qty=1, fill_time=datetime(2026, 1, 16, 9, 5))]
+            self.assertEqual(float(_open_position_cost(flip, -3)[0]), 113.3333)
+
+        feed = ReplayPriceFeed([
+            (datetime(2026, 1, 16, 8, 0), 'MGCG6', 2004.0),
+            (datetime(2026, 1, 16, 8, 0), 'MNQ', 17990.25),  # root-level mark
+            (datetime(2026, 1, 16, 9, 0), 'MGCG6', 2010.0),
+        ])
+        set_price_feed(feed)
+        try:
+            feed.advance(datetime(2026, 1, 16, 7, 0))
+            response = self.app.get('/api/positions').get_json()
+            self.assertEqual(response['priced_positions'], 0)
+            self.assertIsNone(response['positions'][0]['unrealized_pnl'])
+
+            feed.advance(datetime(2026, 1, 16, 8, 30))
+            response = self.app.get('/api/positions').get_json()
+            print(f"  Positions: {response}")
+            mgc, mnq = response['positions']
+            self.assertEqual((mgc['contract'], mgc['side'], mgc['quantity'], mgc['avg_entry_price']),
+                             ('MGCG6', 'LONG', 2, 2001.0))
+            # (2004 - 2001) * 2 * $10, (18000.25 - 17990.25) * 1 * $2 short
+            self.assertEqual(mgc['unrealized_pnl'], 60.0)
+            self.assertEqual(mnq['unrealized_pnl'], 20.0)
+            self.assertEqual(response['total_unrealized_pnl'], 80.0)
+
+            feed.advance(datetime(2026, 1, 16, 9, 0))
+            response = self.app.get('/api/positions?account=ACC1').get_json()
+            self.assertEqual([p['unrealized_pnl'] for p in response['positions']], [180.0])
+
+            with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+                f.write("symbol,price,time\nMGCG6,1999.0,2026-01-16T10:00:00\nMGCG6,1998.5,2026-01-16T09:00:00\n")
+            set_price_feed(FilePriceFeed(f.name))
+            response = self.app.get('/api/positions?contract=MGCG6').get_json()
+            self.assertEqual(response['positions'][0]['mark'], 1999.0)
+            self.assertEqual(response['positions'][0]['unrealized_pnl'], -40.0)
+            os.remove(f.name)
+        finally:
+            set_price_feed(None)
+
+        print("✓ TEST 13 PASSED: Open positions confirmed")
+
+    # ============================================
+    # TEST 14: Tradovate Sync
+    # ============================================
+    def test_tradovate_sync(self):
+        """
+        TEST 14: Tradovate Sync
+
+        What we're testing:
+        - Filled orders and their fills from the (mock) Tradovate API land in the orders table
+        - The new fills are matched into trades / open positions
+        - A sub-cent average fill price is stored with all 6 places
+        - Syncing again adds nothing
+        """
+        print("\n--- TEST 14: Tradovate Sync ---")
+
+        from app.ingestion.tradovate import TradovateClient, sync_orders
+        from app.tests.mock_tradovate import MockTradovate, sample_data
+
+        # the open MNQ long filled in three pieces: 18000.25, 18000.5, 18000.5 -> 18000.416667
+        data = sample_data()
+        data['fills'] += [{'id': 2102 + i, 'orderId': 21, 'contractId': 200, 'timestamp': '2026-01-16T16:00:01.000Z',
+                           'action': 'Buy', 'qty': 1, 'price': 18000.5, 'active': True} for i in range(2)]
+
+        with MockTradovate(data=data) as mock, app.app_context():
+            client = TradovateClient(base_url=mock.url, username='demo', password='demo')
+            result = sync_orders(client)
+            print(f"  Sync: {result}")
+            self.assertEqual(result['orders_fetched'], 3)  # the canceled order isn't fetched
+            self.assertEqual(result['orders_inserted'], 3)
+            self.assertEqual(result['trades_created'], 1)
+            self.assertEqual(result['errors'], [])
+
+            order = db.session.get(Order, 'tv-11')
+            self.assertEqual((order.account, order.contract, order.filled_qty, float(order.avg_price)),
+                             ('DEMO1', 'MGCG6', 2, 2000.5))
+
+            trade = Trade.query.one()
+            # long 2 MGC, 2000.5 -> 2003.0 at $10 a point
+            self.assertEqual((trade.acc_id, trade.symbol, trade.quantity, float(trade.pnl)), ('DEMO1', 'MGCG6', 2, 50.0))
+            self.assertEqual(db.session.get(PositionState, ('DEMO2', 'MNQH6')).net_position, 3)
+            self.assertEqual(db.session.get(Order, 'tv-21').avg_price, Decimal('18000.416667'))
+
+            result = sync_orders(client)
+            self.assertEqual((result['orders_new'], result['orders_inserted'], result['trades_created']), (0, 0, 0))
+            self.assertEqual(Order.query.count(), 3)
+            # one login, and the fill lookups only for the first sync's new orders
+            self.assertEqual(mock.calls['/auth/accesstokenrequest'], 1)
+            self.assertEqual(mock.calls['/fill/deps'], 3)
+            client.close()
+
+        print("✓ TEST 14 PASSED: Tradovate sync confirmed")
+
+    # ============================================
+    # TEST 15: Lot Matching Across Runs
+    # ============================================
+    def test_lot_matching_across_runs(self):
+        """
+        TEST 15: Lot Matching Across Runs
+
+        What we're testing:
+        - A partly relieved entry lot keeps its open contracts for the next run
+        - A flipping exit only counts the contracts it hasn't used yet
+        - /api/trades/match rejects bad workers / relief options
+        """
+        print("\n--- TEST 15: Lot Matching Across Runs ---")
+
+        from app.services.order_matching import match_orders_to_trades
+
+        header = "orderId,Account,B/S,Contract,Product,Avg Fill Price,Filled Qty,Fill Time,Status\n"
+        imports = [
+            "1,ACC1,Buy,CLF6,CL,100.0,2,1/16/26 7:40,Filled\n"
+            "2,ACC1,Sell,CLF6,CL,101.0,1,1/16/26 7:45,Filled\n",
+            # closes the last contract of order 1 and opens short 2
+            "3,ACC1,Sell,CLF6,CL,102.0,3,1/16/26 8:00,Filled\n",
+            "4,ACC1,Buy,CLF6,CL,100.0,2,1/16/26 8:30,Filled\n",
+        ]
+
+        with app.app_context():
+            quantities = []
+            for csv_rows in imports:
+                bulk_save_raw_orders_to_db(header + csv_rows)
+                trades, _ = match_orders_to_trades()
+                quantities.append([t.quantity for t in trades])
+
+                if len(quantities) == 1:
+                    # still long 1 after the first run
+                    order = Order.query.filter_by(order_id='1').one()
+                    self.assertEqual((order.is_matched, order.matched_quantity), (False, 1))
+
+            self.assertEqual(quantities, [[1], [1], [2]])
+            # CL has no spec: pnl in points, 1 + 2 long, 2 x 2 short
+            self.assertEqual(sorted(float(t.pnl) for t in Trade.query.all()), [1.0, 2.0, 4.0])
+            self.assertEqual(Order.query.filter_by(is_matched=False).count(), 0)
+
+        # bad options on POST /api/trades/match are a 400, not a 500
+        for options in [{'workers': 'abc'}, {'workers': 0}, {'relief': 'hifo'}]:
+            response = self.app.post('/api/trades/match', json={'engine': 'lots', **options})
+            self.assertEqual(response.status_code, 400, options)
+        self.assertEqual(self.app.post('/api/trades/match', json={'engine': 'lots', 'workers': 2}).status_code, 200)
+
+        print("✓ TEST 15 PASSED: Lot matching across runs confirmed")
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
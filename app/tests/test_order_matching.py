@@ -0,0 +1,208 @@
+"""
+Lot-relief matching engine tests.
+
+Runs match_fills on plain fill tuples, so no database is needed.
+"""
+
+import time
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from app.services.order_matching import match_fills, match_fill_groups
+from app.services.instruments import InstrumentSpec, UNKNOWN_INSTRUMENT, DIRECTION_SIGN, price_pnl
+
+
+T0 = datetime(2026, 1, 15, 7, 40)
+
+
+def fill(order_id, side, qty, price, minutes):
+    """(order_id, is_buy, quantity, price, fill_time) at T0 + minutes"""
+    return (order_id, side == 'B', qty, price, T0 + timedelta(minutes=minutes))
+
+
+class TestMatchFills(unittest.TestCase):
+
+    def test_simple_long_and_short(self):
+        fills = [
+            fill('b1', 'B', 1, 2000.0, 0),
+            fill('s1', 'S', 1, 2003.0, 5),
+            fill('s2', 'S', 2, 2010.0, 10),
+            fill('b2', 'B', 2, 2006.0, 15),
+        ]
+        trades, errors = match_fills(fills)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(trades), 2)
+        self.assertEqual((trades[0]['direction'], trades[0]['quantity'], trades[0]['pnl']), ('LONG', 1, 3.0))
+        self.assertEqual(trades[0]['entry_order_id'], 'b1')
+        self.assertEqual(trades[0]['exit_order_id'], 's1')
+        self.assertEqual((trades[1]['direction'], trades[1]['quantity'], trades[1]['pnl']), ('SHORT', 2, 8.0))
+
+    def test_scaled_exit(self):
+        fills = [
+            fill('b1', 'B', 3, 100.0, 0),
+            fill('s1', 'S', 1, 101.0, 1),
+            fill('s2', 'S', 2, 104.0, 2),
+        ]
+        trades, errors = match_fills(fills)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(trades), 1)
+        trade = trades[0]
+        self.assertTrue(trade['is_scaled'])
+        self.assertIsNone(trade['exit_order_id'])
+        self.assertEqual([leg['order_id'] for leg in trade['exit_orders']], ['s1', 's2'])
+        self.assertEqual(trade['quantity'], 3)
+        self.assertAlmostEqual(trade['exit_price'], 103.0)
+        self.assertAlmostEqual(trade['pnl'], 9.0)
+        self.assertEqual(trade['exit_time'], T0 + timedelta(minutes=2))
+
+    def test_fifo_vs_lifo(self):
+        fills = [
+            fill('b1', 'B', 1, 100.0, 0),
+            fill('b2', 'B', 1, 110.0, 1),
+            fill('s1', 'S', 1, 120.0, 2),
+            fill('s2', 'S', 1, 120.0, 3),
+        ]
+        fifo, _ = match_fills(fills, 'fifo')
+        lifo, _ = match_fills(fills, 'lifo')
+
+        self.assertEqual([(t['entry_order_id'], t['exit_order_id']) for t in fifo], [('b1', 's1'), ('b2', 's2')])
+        self.assertEqual([(t['entry_order_id'], t['exit_order_id']) for t in lifo], [('b2', 's1'), ('b1', 's2')])
+        self.assertEqual(sum(t['pnl'] for t in fifo), sum(t['pnl'] for t in lifo))
+
+    def test_average_cost(self):
+        fills = [
+            fill('b1', 'B', 1, 100.0, 0),
+            fill('b2', 'B', 1, 110.0, 1),
+            fill('s1', 'S', 2, 120.0, 2),
+        ]
+        trades, errors = match_fills(fills, 'average')
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(trades), 1)
+        self.assertAlmostEqual(trades[0]['entry_price'], 105.0)
+        self.assertAlmostEqual(trades[0]['pnl'], 30.0)
+        self.assertEqual(trades[0]['entry_order_ids'], ['b1', 'b2'])
+
+    def test_exit_flips_position(self):
+        fills = [
+            fill('b1', 'B', 1, 100.0, 0),
+            fill('s1', 'S', 3, 105.0, 1),
+            fill('b2', 'B', 2, 101.0, 2),
+        ]
+        trades, errors = match_fills(fills)
+
+        self.assertEqual(errors, [])
+        self.assertEqual([(t['direction'], t['quantity']) for t in trades], [('LONG', 1), ('SHORT', 2)])
+        self.assertEqual(trades[1]['entry_order_id'], 's1')
+
+    def test_orphans_reported(self):
+        fills = [
+            fill('b1', 'B', 2, 100.0, 0),
+            fill('s1', 'S', 1, 101.0, 1),
+        ]
+        trades, errors = match_fills(fills)
+
+        # matched part is still a trade, the open contract is reported
+        self.assertEqual(len(trades), 1)
+        self.assertEqual(trades[0]['quantity'], 1)
+        self.assertEqual(len(errors), 1)
+        self.assertIn('b1', errors[0])
+
+    def test_entry_quantities(self):
+        fills = [
+            fill('b1', 'B', 1, 100.0, 0),
+            fill('s1', 'S', 3, 105.0, 1),
+            fill('b2', 'B', 2, 101.0, 2),
+        ]
+        for relief in ['fifo', 'average']:
+            trades, _ = match_fills(fills, relief)
+            self.assertEqual([t['entry_quantities'] for t in trades], [{'b1': 1}, {'s1': 2}], relief)
+
+    def test_average_cost_open_position_not_booked(self):
+        fills = [
+            fill('b1', 'B', 1, 100.0, 0),
+            fill('b2', 'B', 1, 110.0, 1),
+            fill('s1', 'S', 1, 120.0, 2),
+        ]
+        trades, errors = match_fills(fills, 'average')
+
+        # matched as a whole round trip on a later run instead
+        self.assertEqual(trades, [])
+        self.assertEqual(len(errors), 1)
+
+    def test_trade_ids_are_deterministic(self):
+        fills = [fill('b1', 'B', 1, 100.0, 0), fill('s1', 'S', 1, 101.0, 1)]
+        self.assertEqual(match_fills(fills)[0][0]['id'], match_fills(fills)[0][0]['id'])
+
+    def test_invalid_relief_method(self):
+        with self.assertRaises(ValueError):
+            match_fills([], 'hifo')
+
+    def test_scales_linearly(self):
+        def build(n):
+            fills = []
+            for i in range(n // 2):
+                fills.append(fill(f'b{i}', 'B', 1, 100.0, 2 * i))
+            for i in range(n // 2):
+                fills.append(fill(f's{i}', 'S', 1, 101.0, n + 2 * i))
+            return fills
+
+        small, large = build(10000), build(100000)
+        started = time.perf_counter()
+        match_fills(small)
+        small_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        trades, _ = match_fills(large)
+        large_elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(trades), 50000)
+        # 10x the fills should cost ~10x, nowhere near the 100x of a quadratic scan
+        self.assertLess(large_elapsed, small_elapsed * 30)
+
+
+
+class TestMatchFillGroups(unittest.TestCase):
+
+    def test_same_result_for_any_worker_count(self):
+        groups = {}
+        for g in range(12):
+            fills = []
+            for i in range(40):
+                side = 'B' if (i // 2) % 2 == 0 else 'S'
+                fills.append(fill(f'g{g}-{i}', side, 1 + (i + g) % 3, 100.0 + i, i))
+            groups[('MGCG6', f'ACC{g:02d}')] = fills
+
+        serial = match_fill_groups(groups, 'fifo', workers=1)
+        parallel = match_fill_groups(groups, 'fifo', workers=3)
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual([key for key, _, _ in serial], list(groups))
+        self.assertEqual(serial[0][1], match_fills(groups[('MGCG6', 'ACC00')])[0])
+
+    def test_invalid_relief_method(self):
+        with self.assertRaises(ValueError):
+            match_fill_groups({}, 'hifo')
+
+
+class TestPricing(unittest.TestCase):
+
+    def test_point_value_and_commission(self):
+        trades, _ = match_fills([
+            fill('b1', 'B', 2, 21000.0, 0), fill('s1', 'S', 2, 21010.25, 1),
+            fill('s2', 'S', 1, 21020.0, 2), fill('b2', 'B', 1, 21030.5, 3),
+        ])
+        nq = InstrumentSpec(tick_size=0.25, point_value=20.0, commission_per_side=0.5)
+        pnl = price_pnl(np.array([DIRECTION_SIGN[t['direction']] for t in trades]),
+                        np.array([t['entry_price'] for t in trades]), np.array([t['exit_price'] for t in trades]),
+                        np.array([t['quantity'] for t in trades], dtype=float), nq)
+
+        # 10.25 points x 2 x $20 - 4 sides x $0.50, then -10.5 points x $20 - 2 sides x $0.50
+        self.assertEqual(pnl.tolist(), [408.0, -211.0])
+        # points-only for roots without a spec
+        self.assertEqual(price_pnl(np.array([1.0]), np.array([100.0]), np.array([101.5]), np.array([3.0]),
+                                   UNKNOWN_INSTRUMENT).tolist(), [4.5])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
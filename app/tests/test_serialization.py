@@ -0,0 +1,46 @@
+"""
+Fast JSON encoder tests.
+
+dumps() (orjson when installed) must produce the same JSON as the stdlib encoder
+with the same conversions, so no database is needed.
+"""
+
+import json
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+from app.utils import serialization
+from app.utils.serialization import dumps
+
+
+class TestDumps(unittest.TestCase):
+
+    PAYLOAD = {
+        'count': 2,
+        'trades': [
+            {'id': 't1', 'exit_time': datetime(2024, 1, 15, 9, 30), 'pnl': 12.5, 'fills': [], 'notes': None},
+            {'id': 't2', 'exit_time': datetime(2024, 1, 15, 9, 30, 0, 250), 'pnl': Decimal('-3.25'),
+             'fills': [{'avg_price': 2000.1, 'fill_time': '2024-01-15T09:29:00'}], 'notes': 'ünïcode'},
+        ],
+        'day': date(2024, 1, 15),
+        'has_more': False,
+    }
+
+    def test_matches_stdlib(self):
+        stdlib = json.dumps(self.PAYLOAD, default=serialization._default, separators=(',', ':'))
+        self.assertEqual(json.loads(dumps(self.PAYLOAD)), json.loads(stdlib))
+
+    def test_iso_datetimes(self):
+        decoded = json.loads(dumps(self.PAYLOAD))
+        self.assertEqual(decoded['trades'][0]['exit_time'], '2024-01-15T09:30:00')
+        self.assertEqual(decoded['trades'][1]['exit_time'], '2024-01-15T09:30:00.000250')
+        self.assertEqual(decoded['day'], '2024-01-15')
+        self.assertEqual(decoded['trades'][1]['pnl'], -3.25)
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            dumps({'x': object()})
+
+
+if __name__ == '__main__':
+    unittest.main()
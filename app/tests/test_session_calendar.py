@@ -0,0 +1,104 @@
+"""
+Session calendar tests.
+
+Holiday rules, early closes and the timestamp -> session lookup are pure, so no
+database is needed.
+"""
+
+import random
+import unittest
+from datetime import date, datetime, timedelta
+import pytz
+from app.api.pnl import get_trading_day, get_trading_day_range
+from app.utils.session_calendar import (
+    cme_holidays, cme_early_closes, product_root, session_name, session_day_strings,
+    session_trading_day, session_bounds, session_windows, get_calendar,
+)
+
+
+class TestSessionCalendar(unittest.TestCase):
+
+    def test_product_roots(self):
+        for symbol, root, session in [('MGCG6', 'MGC', 'comex_metals'), ('NQH26', 'NQ', 'cme_equity'),
+                                      ('ES', 'ES', 'cme_equity'), (' mnqz5 ', 'MNQ', 'cme_equity'),
+                                      ('SIL', 'SIL', 'comex_metals'), ('CLF6', 'CL', 'default'), (None, '', 'default')]:
+            self.assertEqual(product_root(symbol), root, symbol)
+            self.assertEqual(session_name(symbol), session, symbol)
+
+    def test_holidays(self):
+        self.assertEqual(sorted(cme_holidays(2024)), [
+            date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19), date(2024, 3, 29), date(2024, 5, 27),
+            date(2024, 6, 19), date(2024, 7, 4), date(2024, 9, 2), date(2024, 11, 28), date(2024, 12, 25),
+        ])
+        # weekend holidays are observed on the nearest weekday, except a Saturday New Year's Day
+        holidays_2021 = cme_holidays(2021)
+        self.assertIn(date(2021, 7, 5), holidays_2021)
+        self.assertIn(date(2021, 12, 24), holidays_2021)
+        self.assertNotIn(date(2021, 12, 31), cme_holidays(2022))
+        self.assertNotIn(date(2021, 6, 18), holidays_2021)  # Juneteenth from 2022
+        self.assertIn(date(2025, 11, 28), cme_early_closes(2025))
+
+    def test_default_session_matches_get_trading_day(self):
+        rng = random.Random(5)
+        naive = [datetime(2000, 1, 1) + timedelta(seconds=rng.randint(0, 30 * 365 * 86400)) for _ in range(3000)]
+        times = naive + [pytz.utc.localize(t) for t in naive[:1000]]
+        self.assertEqual(session_day_strings(times, ['CL'] * len(times)), [get_trading_day(t) for t in times])
+
+    def test_cme_sessions(self):
+        # naive exit times are Pacific wall-clock: the 4pm CT close is 2pm here
+        cases = [
+            ('2024-01-12T14:00:00', 'NQ', '2024-01-12'),    # at the close
+            ('2024-01-12T14:00:01', 'NQ', '2024-01-16'),    # Friday after the close -> past the weekend and MLK day
+            ('2024-01-15T10:00:00', 'MGC', '2024-01-16'),   # on MLK day itself
+            ('2024-01-15T10:00:00', 'CL', '2024-01-15'),    # products without a session keep calendar days
+            ('2024-11-29T10:15:00', 'ES', '2024-11-29'),    # half day: equities close 12:15 CT
+            ('2024-11-29T10:15:01', 'ES', '2024-12-02'),
+            ('2024-11-29T10:45:00', 'MGC', '2024-11-29'),   # metals close 12:45 CT
+            ('2024-11-29T10:45:01', 'MGCZ4', '2024-12-02'),
+            ('2024-12-24T12:00:00', 'NQ', '2024-12-26'),    # Christmas Eve close, then Christmas
+            ('2024-03-10T14:00:00', 'NQ', '2024-03-11'),    # Sunday evening session, DST day
+            ('2024-11-04T14:00:00', 'NQ', '2024-11-04'),    # first close after the clocks go back
+        ]
+        for exit_time, symbol, expected in cases:
+            self.assertEqual(session_trading_day(datetime.fromisoformat(exit_time), symbol), expected, (exit_time, symbol))
+
+        # aware times go through UTC: 22:00Z is 4pm CST
+        self.assertEqual(session_trading_day(pytz.utc.localize(datetime(2024, 1, 12, 22, 0)), 'NQ'), '2024-01-12')
+        self.assertEqual(session_trading_day(pytz.utc.localize(datetime(2024, 1, 12, 22, 0, 1)), 'NQ'), '2024-01-16')
+
+    def test_bounds(self):
+        self.assertEqual(session_bounds(date(2024, 1, 16), date(2024, 1, 16), ['NQ']),
+                         (datetime(2024, 1, 12, 14, 0, 0, 1), datetime(2024, 1, 16, 14, 0)))
+        # a holiday has no session of its own: the window is empty
+        start, end = session_bounds(date(2024, 1, 15), date(2024, 1, 15), ['MGC'])
+        self.assertGreater(start, end)
+        # without a symbol the window covers every product
+        self.assertEqual(session_bounds(date(2024, 1, 16), date(2024, 1, 16)),
+                         (datetime(2024, 1, 12, 14, 0, 0, 1), datetime(2024, 1, 16, 15, 0)))
+
+    def test_windows(self):
+        # MLK day has no window: Friday's close opens Tuesday's session
+        self.assertEqual(session_windows(date(2024, 1, 12), date(2024, 1, 16), ['cme_equity']), [
+            ('cme_equity', datetime(2024, 1, 11, 14, 0), datetime(2024, 1, 12, 14, 0), date(2024, 1, 12)),
+            ('cme_equity', datetime(2024, 1, 12, 14, 0), datetime(2024, 1, 16, 14, 0), date(2024, 1, 16)),
+        ])
+        self.assertEqual(len(session_windows(date(2024, 1, 12), date(2024, 1, 16), ['default', 'cme_equity'])), 7)
+
+    def test_trading_day_range(self):
+        self.assertEqual(get_trading_day_range('2024-01-16'),
+                         (datetime(2024, 1, 15, 15, 0, 0, 1), datetime(2024, 1, 16, 15, 0)))
+        self.assertEqual(get_trading_day_range('2024-01-16', symbol='NQH4'),
+                         session_bounds(date(2024, 1, 16), date(2024, 1, 16), ['NQ']))
+        self.assertEqual(get_trading_day_range('2024-01-16', market_close_hour=13),
+                         (datetime(2024, 1, 15, 13, 0, 0, 1), datetime(2024, 1, 16, 13, 0)))
+
+    def test_calendar_grows(self):
+        calendar = get_calendar('cme_equity', 2024, 2024)
+        self.assertTrue(calendar.covers(2024, 2024))
+        wider = get_calendar('cme_equity', 1985, 2024)
+        self.assertTrue(wider.covers(1985, 2024))
+        self.assertEqual(session_trading_day(datetime(1987, 10, 19, 10, 0), 'ES'), '1987-10-19')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,60 @@
+"""
+Fill time parser tests.
+
+FillTimeParser must give exactly what _parse_datetime_maybe gives, so no database is needed.
+"""
+
+import random
+import unittest
+from app.utils.csv_parser import _parse_datetime_maybe, new_fill_time_parser
+from app.utils.timestamps import FillTimeParser
+
+
+class TestFillTimeParser(unittest.TestCase):
+
+    def assertSameAsFallback(self, values):
+        parse = new_fill_time_parser()
+        for value in values:
+            self.assertEqual(parse(value), _parse_datetime_maybe(value), value)
+
+    def test_known_formats(self):
+        self.assertSameAsFallback([
+            "1/15/26 7:40", "01/15/2026 07:40:22", "1/15/26 7:40:22", "01/15/2026 07:40",
+            "1/15/70 23:59", "12/31/68 0:00", "2026-01-15 07:40:22", "2026-1-5 7:40",
+        ])
+
+    def test_locks_format_and_caches(self):
+        parser = FillTimeParser(_parse_datetime_maybe)
+        for value in ["1/15/26 7:40", "1/15/26 7:40", "1/15/26 7:41", "2026-01-15 07:40:22"]:
+            parser.parse(value)
+
+        self.assertEqual(parser.format, 'us')
+        self.assertEqual(parser.stats['cache_hits'], 1)
+        self.assertEqual(parser.stats['fast_path'], 2)
+        # a value in another format still parses, through the fallback
+        self.assertEqual(parser.stats['fallback'], 1)
+
+    def test_odd_values_match_fallback(self):
+        self.assertSameAsFallback([
+            None, "", "  ", "null", "None", "13/01/26 7:40", "2/30/26 7:40", "1/15/26 24:00",
+            "1/15/26 7:60", "1/15/26 7:40:60", "1/15/2026 7:40 PM", "2026-01-15T07:40:22",
+            "2026-01-15T07:40:22Z", " 1/15/26 7:40 ", "1/15/26  7:40", "1/15/202 7:40", "garbage",
+        ])
+
+    def test_random_strings_match_fallback(self):
+        rng = random.Random(11)
+        values = []
+        for _ in range(3000):
+            month, day = rng.randint(0, 13), rng.randint(0, 32)
+            year = rng.choice([rng.randint(0, 99), rng.randint(1990, 2040)])
+            hour, minute, second = rng.randint(0, 25), rng.randint(0, 61), rng.randint(0, 61)
+            values.append(rng.choice([
+                f"{month}/{day}/{year:02d} {hour}:{minute:02d}",
+                f"{month:02d}/{day:02d}/{year} {hour:02d}:{minute:02d}:{second:02d}",
+                f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d}",
+            ]))
+        self.assertSameAsFallback(values)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,72 @@
+"""
+Batch trading day tests.
+
+trading_day_ordinals / trading_day_strings must give exactly what get_trading_day
+gives for every element, so no database is needed.
+"""
+
+import random
+import unittest
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytz
+from app.api.pnl import get_trading_day
+from app.utils.trading_day import trading_day_array, trading_day_ordinals, trading_day_strings
+
+LA = pytz.timezone('America/Los_Angeles')
+
+
+def minutes_around(start: datetime, hours: int):
+    return [start + timedelta(minutes=m) for m in range(-60, hours * 60 + 60, 7)]
+
+
+class TestTradingDay(unittest.TestCase):
+
+    def assertSameAsScalar(self, times, market_close_hour=15, timezone='America/Los_Angeles'):
+        expected = [get_trading_day(t, market_close_hour, timezone) for t in times]
+        self.assertEqual(trading_day_strings(times, market_close_hour, timezone), expected)
+        self.assertEqual(trading_day_ordinals(times, market_close_hour, timezone).tolist(),
+                         [date.fromisoformat(day).toordinal() for day in expected])
+
+    def test_close_boundary(self):
+        close = datetime(2026, 1, 15, 15, 0)
+        self.assertSameAsScalar([close - timedelta(microseconds=1), close, close + timedelta(microseconds=1),
+                                 close + timedelta(seconds=1), datetime(2026, 1, 15, 0, 0), datetime(2026, 1, 15, 23, 59, 59)])
+
+    def test_naive_wall_clock_over_dst(self):
+        # 2024-03-10 2:00-3:00 doesn't exist in LA, 2024-11-03 1:00-2:00 happens twice
+        self.assertSameAsScalar(minutes_around(datetime(2024, 3, 10, 0, 0), 4)
+                                + minutes_around(datetime(2024, 11, 3, 0, 0), 4)
+                                + minutes_around(datetime(2024, 3, 10, 14, 0), 2))
+
+    def test_utc_instants_over_dst(self):
+        # the 3pm close is 23:00 UTC in winter and 22:00 UTC in summer
+        times = []
+        for start in [datetime(2024, 3, 10, 8, 0), datetime(2024, 11, 3, 7, 0),    # the transitions
+                      datetime(2024, 3, 9, 21, 0), datetime(2024, 3, 10, 21, 0),   # closes either side
+                      datetime(2024, 11, 2, 21, 0), datetime(2024, 11, 3, 21, 0)]:
+            times += [pytz.utc.localize(t) for t in minutes_around(start, 3)]
+        times += [pytz.utc.localize(datetime(2024, 3, 10, 22, 0)), pytz.utc.localize(datetime(2024, 3, 10, 22, 0, 0, 1)),
+                  pytz.utc.localize(datetime(2024, 11, 3, 23, 0)), pytz.utc.localize(datetime(2024, 11, 3, 23, 0, 0, 1))]
+        self.assertSameAsScalar(times)
+
+    def test_other_zones_and_mixed_input(self):
+        rng = random.Random(3)
+        naive = [datetime(1995, 1, 1) + timedelta(seconds=rng.randint(0, 40 * 365 * 86400)) for _ in range(2000)]
+        ny = pytz.timezone('America/New_York')
+        mixed = naive[:500] + [pytz.utc.localize(t) for t in naive[500:1000]] + [ny.localize(t) for t in naive[1000:1500]] \
+            + [LA.localize(t) for t in naive[1500:]]
+
+        for close in (0, 15, 17, 23):
+            for timezone in ('America/Los_Angeles', 'Europe/London', 'UTC'):
+                self.assertSameAsScalar(mixed, close, timezone)
+
+    def test_datetime64_input(self):
+        times = minutes_around(datetime(2024, 11, 3, 13, 0), 4)
+        days = trading_day_array(np.array(times, dtype='datetime64[us]'))
+        self.assertEqual(days.astype(str).tolist(), [get_trading_day(t) for t in times])
+        self.assertEqual(trading_day_ordinals([]).size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
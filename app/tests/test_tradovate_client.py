@@ -0,0 +1,114 @@
+"""
+Tradovate client tests against the local mock server (app/tests/mock_tradovate.py).
+
+Token caching / renewal, retries, connection reuse and the concurrency cap; no
+database is needed (writing into the Order table is TEST 14 in test_csv_import.py).
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from app.ingestion.tradovate import TradovateClient, TradovateError, order_fields_from_api
+from app.tests.mock_tradovate import MockTradovate, sample_data
+
+
+class TestTradovateClient(unittest.TestCase):
+
+    def setUp(self):
+        self.mock = MockTradovate().start()
+
+    def tearDown(self):
+        self.mock.stop()
+
+    def client(self, **kwargs):
+        kwargs.setdefault('backoff_sec', 0.01)
+        return TradovateClient(base_url=self.mock.url, username='demo', password='demo', **kwargs)
+
+    def test_token_cached_until_expiry(self):
+        with self.client() as client:
+            client.accounts()
+            client.orders()
+            client.contracts([100, 200])
+            self.assertEqual(self.mock.calls['/auth/accesstokenrequest'], 1)
+            # one pooled keep-alive connection for all of it
+            self.assertEqual(self.mock.connections, 1)
+
+    def test_token_renewed_near_expiry(self):
+        self.mock.token_ttl = timedelta(minutes=2)  # inside the renew margin straight away
+        with self.client() as client:
+            client.accounts()  # logs in
+            client.accounts()  # renews
+            client.accounts()  # renews again: every token is this short-lived
+            self.assertEqual(self.mock.calls['/auth/accesstokenrequest'], 1)
+            self.assertEqual(self.mock.calls['/auth/renewaccesstoken'], 2)
+
+    def test_token_file_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'token.json')
+            with self.client(token_cache_path=path) as client:
+                client.accounts()
+            with self.client(token_cache_path=path) as client:
+                client.accounts()
+            self.assertEqual(self.mock.calls['/auth/accesstokenrequest'], 1)
+
+    def test_revoked_token_logs_in_again(self):
+        with self.client() as client:
+            client.accounts()
+            self.mock.expire_tokens()
+            self.assertEqual(len(client.accounts()), 2)
+            self.assertEqual(self.mock.calls['/auth/accesstokenrequest'], 2)
+
+    def test_bad_credentials(self):
+        with TradovateClient(base_url=self.mock.url, username='demo', password='nope') as client:
+            with self.assertRaises(TradovateError):
+                client.accounts()
+
+    def test_retries_with_backoff(self):
+        self.mock.fail_next('/account/list', 429, 503)
+        with self.client() as client:
+            self.assertEqual(len(client.accounts()), 2)
+        self.assertEqual(self.mock.calls['/account/list'], 3)
+
+        self.mock.fail_next('/account/list', 500, 500, 500)
+        with self.client(max_retries=2) as client:
+            with self.assertRaises(TradovateError) as raised:
+                client.accounts()
+        self.assertEqual(raised.exception.status_code, 500)
+
+    def test_fills_fetched_concurrently(self):
+        data = sample_data()
+        data['orders'] = [{'id': i, 'accountId': 1, 'contractId': 100, 'action': 'Buy', 'ordStatus': 'Filled'}
+                          for i in range(40)]
+        data['fills'] = [{'id': 1000 + i, 'orderId': i, 'timestamp': '2026-01-16T15:40:00Z', 'action': 'Buy',
+                          'qty': 1, 'price': 2000.0 + i} for i in range(40)]
+        self.mock.data = data
+        self.mock.latency_sec = 0.02
+        self.mock.fail_next('/fill/deps', 503)
+
+        with self.client(max_in_flight=4) as client:
+            started = time.perf_counter()
+            fills = client.fills_by_order_ids(range(40))
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(sorted(fills), list(range(40)))
+        self.assertEqual(fills[7][0]['price'], 2007.0)
+        self.assertEqual(self.mock.peak_in_flight, 4)
+        self.assertLessEqual(self.mock.connections, 4)
+        # 41 requests at 20ms, 4 at a time
+        self.assertLess(elapsed, 41 * 0.02 / 2)
+
+    def test_order_fields(self):
+        data = sample_data()
+        fields = order_fields_from_api(data['orders'][0], [f for f in data['fills'] if f['orderId'] == 11],
+                                       'MGCG6', 'DEMO1')
+        self.assertEqual((fields['id'], fields['order_id'], fields['product']), ('tv-11', '11', 'MGC'))
+        self.assertEqual((fields['filled_qty'], fields['avg_price']), (2, 2000.5))
+        # last fill, 15:40:02.5Z -> Pacific wall-clock
+        self.assertEqual(fields['fill_time'], datetime(2026, 1, 16, 7, 40, 2, 500000))
+        self.assertTrue(fields['is_filled'] and fields['is_buy'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import codecs
 import csv
 import hashlib
 import io
+import itertools
+import logging
+import time
 import uuid
-from typing import Any, List, Dict, Optional
-from datetime import datetime
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, List, Dict, Optional
+from datetime import date, datetime, time as dtime
+from functools import lru_cache
+from app.utils.timestamps import FillTimeParser
+from app.utils.instrumentation import get_logger, metrics
+
+log = get_logger('import')
 
 def parse_csv_text(csv_text: str) -> List[Dict[str, str]]:
     """
@@ -49,22 +58,92 @@ def find_column_value(row: Dict[str, str], possible_names: List[str]) -> Optiona
 
     return None
 
+# canonical trade field -> column names it may appear under, in preference order
+TRADE_CSV_COLUMNS: Dict[str, List[str]] = {
+    'id': ['id', 'trade_id', 'tradeid'],
+    'symbol': ['Symbol', 'symbol', 'sym', 'instrument'],
+    'side': ['direction', 'side', 'Side', 'Direction', 'dir'],
+    'entry_price': ['Entry Price', 'entry price', 'entry_price', 'entryprice', 'entry'],
+    'exit_price': ['Exit Price', 'exit price', 'exit_price', 'exitprice', 'exit'],
+    'quantity': ['Quantity', 'quantity', 'qty', 'shares', 'contracts'],
+    'date': ['Date', 'date', 'trade_date'],
+    'time': ['Time', 'time', 'trade_time'],
+    'pnl': ['PnL', 'pnl', 'profit', 'pl', 'profit_loss'],
+    'account': ['Account', 'account', 'acc_id', 'account_id'],
+    'tags': ['Tags', 'tags', 'tag', 'strategy'],
+    'notes': ['Notes', 'notes', 'note'],
+    'duration': ['Duration', 'duration'],
+}
+
+def resolve_column_index(header: List[str], possible_names: List[str]) -> Optional[int]:
+    """
+    Index of the column find_column_value would read for this header, or None.
+    Same precedence: exact / case-insensitive name by name, then normalized names.
+    """
+    # duplicate header names: DictReader keeps the last one
+    positions = {key: i for i, key in enumerate(header)}
+
+    for name in possible_names:
+        if name in positions:
+            return positions[name]
+        for key in positions:
+            if key.lower() == name.lower():
+                return positions[key]
+
+    normalized_positions = {normalize_column_name(key): i for key, i in positions.items()}
+    for name in possible_names:
+        normalized_name = normalize_column_name(name)
+        if normalized_name in normalized_positions:
+            return normalized_positions[normalized_name]
+
+    return None
+
+def compile_row_extractor(header: List[str], columns: Dict[str, List[str]] = TRADE_CSV_COLUMNS):
+    """
+    Resolve every field to a column index once per file.
+
+    Returns a function taking a csv.reader row (list of strings) and returning
+    {field: stripped value or None}, the same values find_column_value gives for
+    the equivalent DictReader row - but per row it's just list indexing.
+    """
+    plan = [(field, resolve_column_index(header, names)) for field, names in columns.items()]
+    width = len(header)
+
+    def extract(row: List[str]) -> Dict[str, Optional[str]]:
+        if len(row) < width:
+            # short row: DictReader fills the missing columns with None
+            row = row + [''] * (width - len(row))
+        values = {}
+        for field, index in plan:
+            value = row[index] if index is not None else None
+            values[field] = value.strip() if value else None
+        return values
+
+    return extract
+
 def combine_date_time(date_str: str, time_str: Optional[str] = None) -> datetime:
     """convert date:2026-01-15, time: 09:30 to datetime(2026, 1, 15, 9, 30)"""
 
-    date_obj = datetime.strptime(date_str, "%Y-%m-%d")
+    date_obj = _parse_date(date_str)
 
     if time_str:
-        time_str = time_str.strip()
-        if len(time_str) == 5:
-            time_format = "%H:%M"
-        else:
-            time_format = "%H:%M:%S"
-
-        time_obj = datetime.strptime(time_str, time_format).time()
-        return datetime.combine(date_obj.date(), time_obj)
+        return datetime.combine(date_obj, _parse_time(time_str.strip()))
     
-    return date_obj
+    return datetime.combine(date_obj, dtime())
+
+# trade CSVs repeat the same few dates / times on every row and strptime is slow,
+# so each distinct string is only parsed once
+@lru_cache(maxsize=4096)
+def _parse_date(date_str: str) -> date:
+    return datetime.strptime(date_str, "%Y-%m-%d").date()
+
+@lru_cache(maxsize=4096)
+def _parse_time(time_str: str) -> dtime:
+    if len(time_str) == 5:
+        time_format = "%H:%M"
+    else:
+        time_format = "%H:%M:%S"
+    return datetime.strptime(time_str, time_format).time()
 
 def calculate_pnl(entry_price: float, exit_price: float, quantity: int, side: str) -> float:
     if side.lower() == 'long':
@@ -89,17 +168,23 @@ def map_csv_row_to_backend_format(row:Dict[str, str], default_acc_id: str = "def
     - Duration → (not stored in backend currently)
     """
 
-    trade_id = find_column_value(row, ['id', 'trade_id', 'tradeid'])
+    values = {field: find_column_value(row, names) for field, names in TRADE_CSV_COLUMNS.items()}
+    return trade_from_column_values(values, default_acc_id)
+
+
+def trade_from_column_values(values: Dict[str, Optional[str]], default_acc_id: str = "default") -> Dict[str, Any]:
+    """build the backend trade dict from already-resolved {field: value} (see TRADE_CSV_COLUMNS)"""
+    trade_id = values['id']
     if not trade_id:
         trade_id = f"csv-{uuid.uuid4().hex[:12]}"
     
     # symbol
-    symbol = find_column_value(row, ['Symbol', 'symbol', 'sym', 'instrument'])
+    symbol = values['symbol']
     if not symbol:
         raise ValueError("Missing required field: Symbol")
     
     # side - direction
-    side = find_column_value(row, ['direction', 'side', 'Side', 'Direction', 'dir'])
+    side = values['side']
     if not side:
         raise ValueError("Missing required field: side")
 
@@ -115,8 +200,8 @@ def map_csv_row_to_backend_format(row:Dict[str, str], default_acc_id: str = "def
             raise ValueError(f"Invalid Side value: {side}. Must be 'long' or 'short'")
     
     # Step 4: Get Entry Price and Exit Price
-    entry_price_str = find_column_value(row, ['Entry Price', 'entry price', 'entry_price', 'entryprice', 'entry'])
-    exit_price_str = find_column_value(row, ['Exit Price', 'exit price', 'exit_price', 'exitprice', 'exit'])
+    entry_price_str = values['entry_price']
+    exit_price_str = values['exit_price']
     
     if not entry_price_str:
         raise ValueError("Missing required field: Entry Price")
@@ -130,7 +215,7 @@ def map_csv_row_to_backend_format(row:Dict[str, str], default_acc_id: str = "def
         raise ValueError(f"Invalid price values: entry={entry_price_str}, exit={exit_price_str}")
     
     # Step 5: Get Quantity
-    quantity_str = find_column_value(row, ['Quantity', 'quantity', 'qty', 'shares', 'contracts'])
+    quantity_str = values['quantity']
     if not quantity_str:
         raise ValueError("Missing required field: Quantity")
     
@@ -140,17 +225,17 @@ def map_csv_row_to_backend_format(row:Dict[str, str], default_acc_id: str = "def
         raise ValueError(f"Invalid Quantity value: {quantity_str}")
     
     # Step 6: Get Date and Time
-    date_str = find_column_value(row, ['Date', 'date', 'trade_date'])
+    date_str = values['date']
     if not date_str:
         raise ValueError("Missing required field: Date")
     
     # Get Time (your CSV has a "Time" column)
-    time_str = find_column_value(row, ['Time', 'time', 'trade_time'])
+    time_str = values['time']
      # For entry_time and exit_time, we'll use the same date+time
     # (If you have separate entry/exit times in future, we can modify this)
     try:
         entry_time = combine_date_time(date_str, time_str)
-        exit_time = combine_date_time(date_str, time_str)
+        exit_time = entry_time  # same date+time, no need to parse it twice
         
         # If exit time is before entry time, assume next day (overnight trades)
         if exit_time < entry_time:
@@ -160,7 +245,7 @@ def map_csv_row_to_backend_format(row:Dict[str, str], default_acc_id: str = "def
         raise ValueError(f"Invalid Date/Time format: {str(e)}")
     
     # Step 7: Get or Calculate PnL
-    pnl_str = find_column_value(row, ['PnL', 'pnl', 'profit', 'pl', 'profit_loss'])
+    pnl_str = values['pnl']
     if pnl_str:
         try:
             pnl = float(pnl_str)
@@ -172,12 +257,12 @@ def map_csv_row_to_backend_format(row:Dict[str, str], default_acc_id: str = "def
         pnl = calculate_pnl(entry_price, exit_price, quantity, side)
     
     # Step 8: Get Account (maps to acc_id)
-    acc_id = find_column_value(row, ['Account', 'account', 'acc_id', 'account_id'])
+    acc_id = values['account']
     if not acc_id:
         acc_id = default_acc_id
 
     # Step 9: Get Tags (maps to strategy - take first tag if multiple)
-    tags_str = find_column_value(row, ['Tags', 'tags', 'tag', 'strategy'])
+    tags_str = values['tags']
     strategy = None
     if tags_str:
         # If tags are semicolon-separated like "Breakout;Morning", take first one
@@ -188,8 +273,8 @@ def map_csv_row_to_backend_format(row:Dict[str, str], default_acc_id: str = "def
     
     # Step 10: Notes and Duration
     # These aren't in your backend model yet, but we can store them for future use
-    notes = find_column_value(row, ['Notes', 'notes', 'note'])
-    duration = find_column_value(row, ['Duration', 'duration'])
+    notes = values['notes']
+    duration = values['duration']
     
     # Build the backend format dictionary
     backend_trade = {
@@ -215,14 +300,20 @@ def parse_and_validate_csv(csv_text: str, default_acc_id: str = "default") -> tu
     error_messages = []
 
     try:
-        rows = parse_csv_text(csv_text)
+        # header resolved once, rows read as plain lists
+        reader = csv.reader(io.StringIO(csv_text))
+        header = next(reader, None)
+        # DictReader skips blank lines, keep the same row numbers
+        rows = [row for row in reader if row] if header is not None else []
 
         if not rows:
             return [], ["CSV file is empty or has no data rows"]
-        
+
+        extract = compile_row_extractor(header)
+
         for row_num, row in enumerate(rows, start = 2):
             try:
-                backend_trade = map_csv_row_to_backend_format(row, default_acc_id)
+                backend_trade = trade_from_column_values(extract(row), default_acc_id)
                 successful_trades.append(backend_trade)
             except ValueError as e:
                 # Record error but continue processing
@@ -235,87 +326,168 @@ def parse_and_validate_csv(csv_text: str, default_acc_id: str = "default") -> tu
     return successful_trades, error_messages  
             
     
-def save_raw_orders_to_db(csv_text: str, account: str = "default") -> tuple[List[Order], List[str]]:
+def _stable_row_id(row: Dict[str, str]) -> str:
+    """
+    Orders.csv sometimes has non-unique orderId values due to scientific notation
+    (e.g. 3.72955E+11). To make imports idempotent and avoid collisions, we use a
+    deterministic hash of the row contents as the primary key.
+    """
+    # Sort keys for deterministic hashing
+    normalized_items = []
+    for k in sorted(row.keys()):
+        v = row.get(k)
+        normalized_items.append(f"{k}={'' if v is None else str(v).strip()}")
+    payload = "|".join(normalized_items).encode("utf-8")
+    return "ord-" + hashlib.sha1(payload).hexdigest()[:24]
+
+
+def _parse_datetime_maybe(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    s = str(value).strip()
+    if not s or s.lower() in ['none', 'null', '']:
+        return None
+
+    # Try a few known formats from your Orders.csv
+    # Format examples: "01/15/2026 07:40:22", "1/15/26 7:40"
+    fmts = [
+        "%m/%d/%Y %H:%M:%S",  # 01/15/2026 07:40:22
+        "%m/%d/%y %H:%M:%S",  # 1/15/26 7:40:22
+        "%m/%d/%Y %H:%M",     # 01/15/2026 07:40
+        "%m/%d/%y %H:%M",     # 1/15/26 7:40
+        "%Y-%m-%d %H:%M:%S",  # ISO format
+        "%Y-%m-%d %H:%M",     # ISO format without seconds
+    ]
+    for fmt in fmts:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+    # Fall back: ISO-ish
+    try:
+        return datetime.fromisoformat(s.replace('Z', '+00:00'))
+    except Exception:
+        metrics.incr('fill_time.unparseable')
+        log.debug("Could not parse datetime: %r", s)
+        return None
+
+
+def safe_float(value):
+    if not value:
+        return None
+    try:
+        return float(str(value).replace(',', ''))
+    except:
+        return None
+
+
+def safe_int(value):
+    if not value:
+        return None
+    try:
+        return int(float(str(value).replace(',', '')))
+    except:
+        return None
+
+
+def _fill_time_str(row: Dict[str, str]) -> Optional[str]:
+    # Parse fill time - try multiple column name variations
+    return (
+        row.get("Fill Time") or
+        row.get("fill_time") or
+        row.get("FillTime") or
+        row.get("fillTime") or
+        row.get("Timestamp") or
+        row.get("timestamp")
+    )
+
+
+def new_fill_time_parser() -> Callable[[Optional[str]], Optional[datetime]]:
+    """per-file fill time parser: format sniffed once, repeated strings memoised (see app/utils/timestamps.py)"""
+    return FillTimeParser(_parse_datetime_maybe).parse
+
+
+def _order_fields_from_row(row: Dict[str, str], account: str,
+                           parse_time: Optional[Callable[[Optional[str]], Optional[datetime]]] = None) -> Dict[str, Any]:
+    """
+    Map one Orders.csv row to the column values of an Order row.
+    Shared by the per-row and bulk import paths so both store the same thing.
+
+    parse_time: fill time parser for this file (new_fill_time_parser()), defaults to _parse_datetime_maybe
+    """
+    parse_time = parse_time or _parse_datetime_maybe
+    raw_order_id = row.get("orderId") or row.get("Order ID") or row.get("order_id")
+    raw_order_id = str(raw_order_id).strip() if raw_order_id is not None else None
+
+    status = row.get('Status', '').strip()
+    b_s = row.get('B/S', '').strip()
+
+    return {
+        'id': _stable_row_id(row),  # Primary key for our DB row (stable per unique row)
+        'order_id': raw_order_id,
+        'account': row.get('Account', account),
+        'b_s': b_s,
+        'contract': row.get('Contract', ''),
+        'product': row.get('Product', ''),
+        'avg_price': safe_float(row.get('Avg Fill Price') or row.get('avgPrice')),
+        'filled_qty': safe_int(row.get('Filled Qty') or row.get('filledQty')),
+        'fill_time': parse_time(_fill_time_str(row)),
+        'status': status,
+        'limit_price': safe_float(row.get('Limit Price') or row.get('decimalLimit')),
+        'stop_price': safe_float(row.get('Stop Price') or row.get('decimalStop')),
+        'order_type': row.get('Type', ''),
+        'text': row.get('Text', ''),
+        'raw_csv_data': row,  # Store entire row as JSON
+        'is_filled': status == 'Filled',
+        'is_buy': b_s.upper() == 'BUY',
+        'is_sell': b_s.upper() == 'SELL',
+    }
+
+
+def save_raw_orders_to_db(csv_text: str, account: str = "default",
+                          progress: Optional[Dict[str, Any]] = None) -> tuple[List[Order], List[str]]:
+    """
+    progress: optional dict updated in place (rows_total, rows_parsed, orders_saved)
+              so a background job can report how far the import is
+    """
     from app.db.models import Order, db
-    from datetime import datetime
 
-    rows = parse_csv_text(csv_text)
+    with metrics.timer('orders.parse'):
+        rows = parse_csv_text(csv_text)
 
     if not rows:
         return [], ["CSV file is empty"]
 
     saved_orders = []
     errors = []
+    parse_time = new_fill_time_parser()
+    if progress is not None:
+        progress.update({'rows_total': len(rows), 'rows_parsed': 0, 'orders_saved': 0})
 
-    def _stable_row_id(row: Dict[str, str]) -> str:
-        """
-        Orders.csv sometimes has non-unique orderId values due to scientific notation
-        (e.g. 3.72955E+11). To make imports idempotent and avoid collisions, we use a
-        deterministic hash of the row contents as the primary key.
-        """
-        # Sort keys for deterministic hashing
-        normalized_items = []
-        for k in sorted(row.keys()):
-            v = row.get(k)
-            normalized_items.append(f"{k}={'' if v is None else str(v).strip()}")
-        payload = "|".join(normalized_items).encode("utf-8")
-        return "ord-" + hashlib.sha1(payload).hexdigest()[:24]
-
-    def _parse_datetime_maybe(value: Optional[str]) -> Optional[datetime]:
-        if not value:
-            return None
-        s = str(value).strip()
-        if not s or s.lower() in ['none', 'null', '']:
-            return None
-        
-        # Try a few known formats from your Orders.csv
-        # Format examples: "01/15/2026 07:40:22", "1/15/26 7:40"
-        fmts = [
-            "%m/%d/%Y %H:%M:%S",  # 01/15/2026 07:40:22
-            "%m/%d/%y %H:%M:%S",  # 1/15/26 7:40:22
-            "%m/%d/%Y %H:%M",     # 01/15/2026 07:40
-            "%m/%d/%y %H:%M",     # 1/15/26 7:40
-            "%Y-%m-%d %H:%M:%S",  # ISO format
-            "%Y-%m-%d %H:%M",     # ISO format without seconds
-        ]
-        for fmt in fmts:
-            try:
-                return datetime.strptime(s, fmt)
-            except ValueError:
-                continue
-        # Fall back: ISO-ish
-        try:
-            return datetime.fromisoformat(s.replace('Z', '+00:00'))
-        except Exception:
-            import sys
-            print(f"⚠️  DEBUG: Could not parse datetime: '{s}'", file=sys.stderr)
-            return None
+    # per-row stage times are summed locally and recorded once after the loop
+    debug = log.isEnabledFor(logging.DEBUG)
+    hash_sec = dedupe_sec = 0.0
+    updated_count = missing_fill_time = 0
+    loop_started = time.perf_counter()
 
     for row_num, row in enumerate(rows, start = 2):
+        if progress is not None and row_num % 500 == 0:
+            progress['rows_parsed'] = row_num - 2
+            progress['orders_saved'] = len(saved_orders)
         try:
-            raw_order_id = row.get("orderId") or row.get("Order ID") or row.get("order_id")
-            raw_order_id = str(raw_order_id).strip() if raw_order_id is not None else None
-
-            # Primary key for our DB row (stable per unique row)
-            order_row_id = _stable_row_id(row)
-            
-            # Parse fill time - try multiple column name variations (needed before checking existing)
-            fill_time_str = (
-                row.get("Fill Time") or 
-                row.get("fill_time") or 
-                row.get("FillTime") or
-                row.get("fillTime") or
-                row.get("Timestamp") or
-                row.get("timestamp")
-            )
-            fill_time = _parse_datetime_maybe(fill_time_str)
-            
-            # Determine status flags (needed before checking existing)
-            status = row.get('Status', '').strip()
-            is_filled = status == 'Filled'
+            t0 = time.perf_counter()
+            fields = _order_fields_from_row(row, account, parse_time)
+            order_row_id = fields['id']
+            fill_time = fields['fill_time']
+            status = fields['status']
+            is_filled = fields['is_filled']
             
             # Check if order already exists (idempotency)
+            # (this query also autoflushes the previous row's insert)
+            t1 = time.perf_counter()
             existing = Order.query.filter_by(id=order_row_id).first()
+            hash_sec += t1 - t0
+            dedupe_sec += time.perf_counter() - t1
             if existing:
                 # Update fill_time if it's missing but we have it now
                 updated = False
@@ -329,66 +501,24 @@ def save_raw_orders_to_db(csv_text: str, account: str = "default") -> tuple[List
                     updated = True
                 if updated:
                     db.session.add(existing)
-                    import sys
-                    print(f"🔄 DEBUG: Updated existing order {order_row_id[:20]}... (fill_time={fill_time is not None}, status={status})", file=sys.stderr)
+                    updated_count += 1
+                    if debug:
+                        log.debug("Updated existing order %s... (fill_time=%s, status=%s)",
+                                  order_row_id[:20], fill_time is not None, status)
                 errors.append(f"Row {row_num}: Order row already exists, skipping")
                 continue
             
             # Debug: log if fill_time is missing for filled orders
             if is_filled and not fill_time:
-                import sys
-                print(f"⚠️  DEBUG: Row {row_num}: Filled order but no fill_time. Status={status}", file=sys.stderr)
-                print(f"⚠️  DEBUG: Fill Time column value: '{fill_time_str}'", file=sys.stderr)
-                # Show all columns that might contain time info
-                time_columns = [k for k in row.keys() if 'time' in k.lower() or 'date' in k.lower() or 'timestamp' in k.lower()]
-                print(f"⚠️  DEBUG: Time-related columns found: {time_columns}", file=sys.stderr)
-            
-            b_s = row.get('B/S', '').strip()
-            is_buy = b_s.upper() == 'BUY'
-            is_sell = b_s.upper() == 'SELL'
-
-            def safe_float(value):
-                if not value:
-                    return None
-                try:
-                    return float(str(value).replace(',', ''))
-                except:
-                    return None
-            
-            def safe_int(value):
-                if not value:
-                    return None
-                try:
-                    return int(float(str(value).replace(',', '')))
-                except:
-                    return None
-            
-            avg_price = safe_float(row.get('Avg Fill Price') or row.get('avgPrice'))
-            filled_qty = safe_int(row.get('Filled Qty') or row.get('filledQty'))
-            limit_price = safe_float(row.get('Limit Price') or row.get('decimalLimit'))
-            stop_price = safe_float(row.get('Stop Price') or row.get('decimalStop'))
+                missing_fill_time += 1
+                if debug:
+                    # Show all columns that might contain time info
+                    time_columns = [k for k in row.keys() if 'time' in k.lower() or 'date' in k.lower() or 'timestamp' in k.lower()]
+                    log.debug("Row %d: Filled order but no fill_time. Status=%s, Fill Time value=%r, time columns=%s",
+                              row_num, status, _fill_time_str(row), time_columns)
             
             # Create Order object
-            order = Order(
-                id=order_row_id,
-                order_id=raw_order_id,
-                account=row.get('Account', account),
-                b_s=b_s,
-                contract=row.get('Contract', ''),
-                product=row.get('Product', ''),
-                avg_price=avg_price,
-                filled_qty=filled_qty,
-                fill_time=fill_time,
-                status=status,
-                limit_price=limit_price,
-                stop_price=stop_price,
-                order_type=row.get('Type', ''),
-                text=row.get('Text', ''),
-                raw_csv_data=row,  # Store entire row as JSON
-                is_filled=is_filled,
-                is_buy=is_buy,
-                is_sell=is_sell
-            )
+            order = Order(**fields)
             
             db.session.add(order)
             saved_orders.append(order)
@@ -396,15 +526,451 @@ def save_raw_orders_to_db(csv_text: str, account: str = "default") -> tuple[List
             errors.append(f"Row {row_num}: Error saving order - {str(e)}")
             continue
     
+    if progress is not None:
+        progress['rows_parsed'] = len(rows)
+        progress['orders_saved'] = len(saved_orders)
+
+    metrics.observe('orders.hash', hash_sec)
+    metrics.observe('orders.dedupe', dedupe_sec)
+    metrics.observe('orders.insert', time.perf_counter() - loop_started - hash_sec - dedupe_sec)
+    metrics.incr('orders.rows', len(rows))
+    metrics.incr('orders.inserted', len(saved_orders))
+    metrics.incr('orders.updated', updated_count)
+    if missing_fill_time:
+        metrics.incr('orders.filled_without_fill_time', missing_fill_time)
+        log.warning("%d filled orders have no parseable fill time", missing_fill_time)
+
     # Commit all orders in one transaction
     try:
-        db.session.commit()
+        with metrics.timer('orders.commit'):
+            db.session.commit()
         return saved_orders, errors
     except Exception as e:
         db.session.rollback()
         return [], [f"Database error: {str(e)}"] + errors
 
 
+# Columns written by the bulk insert, in VALUES order
+_BULK_ORDER_COLUMNS = [
+    'id', 'order_id', 'account', 'b_s', 'contract', 'product', 'avg_price', 'filled_qty',
+    'fill_time', 'status', 'limit_price', 'stop_price', 'order_type', 'text',
+    'csv_import_date', 'raw_csv_data', 'is_filled', 'is_buy', 'is_sell', 'is_matched',
+]
+
+
+def _fetch_existing_orders(order_ids: List[str], lookup_batch_size: int = 10000) -> Dict[str, tuple]:
+    """
+    Resolve which order ids are already stored with one set-based query per batch
+    (instead of one SELECT per CSV row). Returns id -> (fill_time, status).
+    """
+    from app.db.models import Order, db
+
+    existing = {}
+    for i in range(0, len(order_ids), lookup_batch_size):
+        batch = order_ids[i:i + lookup_batch_size]
+        rows = (
+            db.session.query(Order.id, Order.fill_time, Order.status)
+            .filter(Order.id.in_(batch))
+            .all()
+        )
+        for order_id, fill_time, status in rows:
+            existing[order_id] = (fill_time, status)
+    return existing
+
+
+def _bulk_insert_orders(records: List[Dict[str, Any]], page_size: int = 1000) -> None:
+    """
+    Write new order rows in multi-row INSERTs inside the current session transaction.
+
+    On PostgreSQL/psycopg2 this uses execute_values (one statement per page_size rows)
+    with ON CONFLICT DO NOTHING so a concurrent import of the same file can't fail the batch.
+    Other databases fall back to a Core executemany insert.
+    """
+    from app.db.models import Order, db
+
+    if not records:
+        return
+
+    table = Order.__table__
+    connection = db.session.connection()
+
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        from psycopg2.extras import execute_values, Json
+
+        values = [
+            tuple(Json(r[c]) if c == 'raw_csv_data' else r[c] for c in _BULK_ORDER_COLUMNS)
+            for r in records
+        ]
+        sql = (
+            f"INSERT INTO {table.fullname} ({', '.join(_BULK_ORDER_COLUMNS)}) VALUES %s "
+            f"ON CONFLICT (id) DO NOTHING"
+        )
+        cursor = connection.connection.cursor()
+        try:
+            execute_values(cursor, sql, values, page_size=page_size)
+        finally:
+            cursor.close()
+    else:
+        db.session.execute(table.insert(), records)
+
+
+def _map_order_rows(rows: List[Dict[str, str]], account: str, first_row_num: int = 2,
+                    parse_time: Optional[Callable[[Optional[str]], Optional[datetime]]] = None) -> List[tuple]:
+    """
+    The CPU side of an import (row hashing, number and fill time parsing), no DB access.
+
+    Returns:
+        one (row_num, order fields or None, error message or None) per row
+    """
+    parse_time = parse_time or new_fill_time_parser()
+    mapped = []
+    with metrics.timer('orders.hash'):
+        for row_num, row in enumerate(rows, start=first_row_num):
+            try:
+                mapped.append((row_num, _order_fields_from_row(row, account, parse_time), None))
+            except Exception as e:
+                mapped.append((row_num, None, str(e)))
+    return mapped
+
+
+def _bulk_upsert_order_rows(rows: List[Dict[str, str]], account: str, first_row_num: int = 2,
+                            parse_time: Optional[Callable[[Optional[str]], Optional[datetime]]] = None) -> tuple[List[Dict[str, Any]], List[str], Dict[str, int]]:
+    """
+    Bulk version of the save_raw_orders_to_db loop for one batch of CSV rows.
+
+    1. hash + map every row up front
+    2. resolve existing ids with set-based lookups
+    3. update fill_time/status on existing rows (same rules as the per-row path)
+    4. insert the new rows in multi-row statements
+
+    Does not commit - the caller owns the transaction.
+    Pass the same parse_time for every chunk of a file to keep its sniffed format / cache.
+    """
+    return _bulk_upsert_mapped_orders(_map_order_rows(rows, account, first_row_num, parse_time))
+
+
+def _bulk_upsert_mapped_orders(mapped: List[tuple]) -> tuple[List[Dict[str, Any]], List[str], Dict[str, int]]:
+    """steps 2-4 of _bulk_upsert_order_rows for rows already run through _map_order_rows"""
+    from app.db.models import Order, db
+    from sqlalchemy import update
+
+    errors = []
+    counts = {'rows': len(mapped), 'inserted': 0, 'updated': 0, 'existing': 0, 'failed': 0}
+
+    # Step 1: drop duplicate rows within the same file
+    # (the per-row path sees those as "already exists" after autoflush)
+    new_records: Dict[str, Dict[str, Any]] = {}
+    row_nums: Dict[str, int] = {}
+    for row_num, fields, error in mapped:
+        if fields is None:
+            errors.append(f"Row {row_num}: Error saving order - {error}")
+            counts['failed'] += 1
+            continue
+        if fields['id'] in new_records:
+            errors.append(f"Row {row_num}: Order row already exists, skipping")
+            counts['existing'] += 1
+            continue
+        new_records[fields['id']] = fields
+        row_nums[fields['id']] = row_num
+
+    # Step 2: which of these are already in the table
+    with metrics.timer('orders.dedupe'):
+        existing = _fetch_existing_orders(list(new_records.keys()))
+
+    # Step 3: same update semantics as the per-row path
+    updates = []
+    for order_id in [i for i in new_records if i in existing]:
+        existing_fill_time, existing_status = existing[order_id]
+        fields = new_records.pop(order_id)
+        update_values = {}
+        if not existing_fill_time and fields['fill_time']:
+            update_values['fill_time'] = fields['fill_time']
+        if existing_status != fields['status']:
+            update_values['status'] = fields['status']
+            update_values['is_filled'] = fields['is_filled']
+        if update_values:
+            updates.append({'id': order_id, **update_values})
+        errors.append(f"Row {row_nums[order_id]}: Order row already exists, skipping")
+        counts['existing'] += 1
+
+    insert_started = time.perf_counter()
+    for update_values in updates:
+        db.session.execute(
+            update(Order)
+            .where(Order.id == update_values['id'])
+            .values({k: v for k, v in update_values.items() if k != 'id'})
+        )
+    counts['updated'] = len(updates)
+
+    # Step 4: insert everything that's left
+    import_date = datetime.utcnow()
+    records = list(new_records.values())
+    for record in records:
+        record['csv_import_date'] = import_date
+        record['is_matched'] = False
+    _bulk_insert_orders(records)
+    counts['inserted'] = len(records)
+    metrics.observe('orders.insert', time.perf_counter() - insert_started)
+
+    for name in ['rows', 'inserted', 'updated', 'existing', 'failed']:
+        metrics.incr(f'orders.{name}', counts[name])
+
+    return records, errors, counts
+
+
+def bulk_save_raw_orders_to_db(csv_text: str, account: str = "default") -> tuple[List[Dict[str, Any]], List[str], Dict[str, Any]]:
+    """
+    Bulk ingest mode for large Orders.csv exports.
+
+    Same idempotency and status/fill_time update rules as save_raw_orders_to_db, but
+    without a SELECT + session.add per row: ids are hashed up front, existing ids are
+    resolved with set-based queries and new rows go in with multi-row INSERTs.
+
+    Returns:
+        (saved order dicts, errors, stats) where stats has row counts, elapsed_sec and rows_per_sec
+    """
+    from app.db.models import db
+
+    started = time.perf_counter()
+    with metrics.timer('orders.parse'):
+        rows = parse_csv_text(csv_text)
+
+    if not rows:
+        return [], ["CSV file is empty"], {'rows': 0, 'inserted': 0, 'updated': 0, 'existing': 0,
+                                           'failed': 0, 'elapsed_sec': 0.0, 'rows_per_sec': 0.0}
+
+    try:
+        records, errors, stats = _bulk_upsert_order_rows(rows, account)
+        with metrics.timer('orders.commit'):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return [], [f"Database error: {str(e)}"], {'rows': len(rows), 'inserted': 0, 'updated': 0, 'existing': 0,
+                                                   'failed': len(rows), 'elapsed_sec': 0.0, 'rows_per_sec': 0.0}
+
+    elapsed = time.perf_counter() - started
+    stats['elapsed_sec'] = round(elapsed, 4)
+    stats['rows_per_sec'] = round(len(rows) / elapsed, 1) if elapsed > 0 else 0.0
+    return records, errors, stats
+
+
+def split_csv_byte_ranges(data: bytes, target_chunks: int) -> tuple[int, List[tuple[int, int]]]:
+    """
+    Split raw CSV bytes into about target_chunks (start, end) ranges of whole records.
+
+    Cuts only land right after a newline that is outside a quoted field (an even
+    number of '"' before it), so multi-line quoted values stay in one chunk.
+
+    Returns:
+        (end of the header record, body ranges in file order)
+    """
+    def next_record_end(pos: int, quotes_before: int) -> tuple[int, int]:
+        """first record boundary at or after pos, and the quote count up to it"""
+        while True:
+            newline = data.find(b'\n', pos)
+            if newline == -1:
+                return len(data), quotes_before + data.count(b'"', pos)
+            quotes_before += data.count(b'"', pos, newline + 1)
+            if quotes_before % 2 == 0:
+                return newline + 1, quotes_before
+            pos = newline + 1
+
+    header_end, quotes = next_record_end(0, 0)
+    body_size = len(data) - header_end
+    if body_size <= 0:
+        return header_end, []
+
+    step = max(1, body_size // max(1, target_chunks))
+    ranges = []
+    start = header_end
+    while start < len(data):
+        # count quotes up to the nominal cut, then finish the record it falls in
+        cut = min(len(data), start + step)
+        quotes_at_cut = quotes + data.count(b'"', start, cut)
+        end, quotes = next_record_end(cut, quotes_at_cut) if cut < len(data) else (len(data), quotes_at_cut)
+        ranges.append((start, end))
+        start = end
+    return header_end, ranges
+
+
+def _map_order_chunk(task: tuple) -> List[tuple]:
+    """process pool worker: (header bytes, body chunk bytes, account) -> [(fields or None, error or None)]"""
+    header, chunk, account = task
+    rows = parse_csv_text((header + chunk).decode('utf-8'))
+    return [(fields, error) for _, fields, error in _map_order_rows(rows, account)]
+
+
+def parallel_map_order_rows(data: bytes, account: str = "default", workers: Optional[int] = None,
+                            chunks_per_worker: int = 4) -> List[tuple]:
+    """
+    _map_order_rows over a whole file in a process pool.
+
+    The file is cut into byte ranges on record boundaries, every range is parsed,
+    hashed and mapped in a worker, and the results come back in file order with
+    the same row numbers the serial path would give.
+    """
+    import os
+    from app.utils.process_pool import process_pool
+
+    workers = workers or os.cpu_count() or 1
+    header_end, ranges = split_csv_byte_ranges(data, workers * chunks_per_worker)
+    header = data[:header_end]
+    if header and not header.endswith(b'\n'):
+        header += b'\n'
+    tasks = [(header, data[start:end], account) for start, end in ranges]
+
+    if workers == 1 or len(tasks) <= 1:
+        chunk_results = map(_map_order_chunk, tasks)
+        return _number_mapped_rows(chunk_results)
+
+    with process_pool(workers) as pool:
+        return _number_mapped_rows(pool.map(_map_order_chunk, tasks))
+
+
+def _number_mapped_rows(chunk_results: Iterable[List[tuple]], first_row_num: int = 2) -> List[tuple]:
+    mapped = []
+    for chunk in chunk_results:
+        for fields, error in chunk:
+            mapped.append((first_row_num + len(mapped), fields, error))
+    return mapped
+
+
+def parallel_save_raw_orders_to_db(csv_data, account: str = "default",
+                                   workers: Optional[int] = None) -> tuple[List[Dict[str, Any]], List[str], Dict[str, Any]]:
+    """
+    Parallel ingest mode: bulk_save_raw_orders_to_db with the row parsing / hashing
+    spread over a process pool (parallel_map_order_rows). The DB write is one ordered
+    batch, same as the bulk path, so the stored rows are identical.
+
+    Args:
+        csv_data: file contents, bytes or str
+        workers: processes to use (default: CPU count)
+
+    Returns:
+        (saved order dicts, errors, stats) - bulk stats plus workers, parse_sec, write_sec
+    """
+    import os
+    from app.db.models import db
+
+    data = csv_data.encode('utf-8') if isinstance(csv_data, str) else csv_data
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    mapped = parallel_map_order_rows(data, account, workers)
+    parsed = time.perf_counter()
+    # parse + hash happen together in the workers
+    metrics.observe('orders.parse', parsed - started)
+
+    if not mapped:
+        return [], ["CSV file is empty"], {'rows': 0, 'inserted': 0, 'updated': 0, 'existing': 0, 'failed': 0,
+                                           'workers': workers, 'elapsed_sec': 0.0, 'rows_per_sec': 0.0}
+
+    try:
+        records, errors, stats = _bulk_upsert_mapped_orders(mapped)
+        with metrics.timer('orders.commit'):
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return [], [f"Database error: {str(e)}"], {'rows': len(mapped), 'inserted': 0, 'updated': 0, 'existing': 0,
+                                                   'failed': len(mapped), 'workers': workers,
+                                                   'elapsed_sec': 0.0, 'rows_per_sec': 0.0}
+
+    finished = time.perf_counter()
+    stats['workers'] = workers
+    stats['parse_sec'] = round(parsed - started, 4)
+    stats['write_sec'] = round(finished - parsed, 4)
+    stats['elapsed_sec'] = round(finished - started, 4)
+    stats['rows_per_sec'] = round(len(mapped) / (finished - started), 1) if finished > started else 0.0
+    return records, errors, stats
+
+
+def iter_csv_row_chunks(lines: Iterable[str], chunk_size: int = 5000) -> Iterator[List[Dict[str, str]]]:
+    """
+    Lazily parse CSV lines into lists of at most chunk_size row dicts.
+    Only one chunk of rows is held in memory at a time.
+    """
+    reader = csv.DictReader(lines)
+    while True:
+        chunk = list(itertools.islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_save_raw_orders_to_db(stream: BinaryIO, account: str = "default", chunk_size: int = 5000,
+                                 progress: Optional[Dict[str, Any]] = None,
+                                 max_errors: int = 100) -> tuple[int, List[str], Dict[str, Any]]:
+    """
+    Streaming import mode for uploaded Orders.csv files.
+
+    Reads the binary upload stream line by line, runs the bulk upsert on fixed-size
+    chunks and commits after each chunk, so only one chunk of parsed rows is in memory
+    at a time. The upload itself isn't streamed from the client: werkzeug spools the
+    whole body (to a temp file past 500KB) before the view runs.
+    A chunk that fails is rolled back on its own; earlier chunks stay committed.
+
+    Args:
+        stream: binary file-like object (e.g. request.files['file'].stream)
+        chunk_size: rows per chunk / commit
+        progress: optional dict updated in place after every chunk, so another
+                  request can read the counters while the import is running
+        max_errors: cap on stored error messages (the count keeps going)
+
+    Returns:
+        (orders saved, first max_errors errors, stats)
+    """
+    from app.db.models import db
+
+    stats = progress if progress is not None else {}
+    stats.update({
+        'status': 'running',
+        'chunks_committed': 0,
+        'rows_parsed': 0,
+        'orders_saved': 0,
+        'orders_updated': 0,
+        'orders_existing': 0,
+        'rows_failed': 0,
+        'error_count': 0,
+        'elapsed_sec': 0.0,
+        'rows_per_sec': 0.0,
+    })
+    errors: List[str] = []
+    started = time.perf_counter()
+    next_row_num = 2
+    parse_time = new_fill_time_parser()
+
+    for chunk in iter_csv_row_chunks(codecs.iterdecode(stream, "utf-8"), chunk_size):
+        try:
+            _, chunk_errors, counts = _bulk_upsert_order_rows(chunk, account, first_row_num=next_row_num,
+                                                              parse_time=parse_time)
+            with metrics.timer('orders.commit'):
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            chunk_errors = [f"Rows {next_row_num}-{next_row_num + len(chunk) - 1}: Database error - {str(e)}"]
+            counts = {'inserted': 0, 'updated': 0, 'existing': 0, 'failed': len(chunk)}
+        else:
+            stats['chunks_committed'] += 1
+
+        next_row_num += len(chunk)
+        errors.extend(chunk_errors[:max(0, max_errors - len(errors))])
+
+        stats['rows_parsed'] += len(chunk)
+        stats['orders_saved'] += counts['inserted']
+        stats['orders_updated'] += counts['updated']
+        stats['orders_existing'] += counts['existing']
+        stats['rows_failed'] += counts['failed']
+        stats['error_count'] += len(chunk_errors)
+        elapsed = time.perf_counter() - started
+        stats['elapsed_sec'] = round(elapsed, 4)
+        stats['rows_per_sec'] = round(stats['rows_parsed'] / elapsed, 1) if elapsed > 0 else 0.0
+
+    stats['status'] = 'done'
+    if stats['rows_parsed'] == 0:
+        errors.append("CSV file is empty")
+    return stats['orders_saved'], errors, stats
+
+
 def process_filled_orders_to_trades(account: str = None) -> Dict[str, Any]:
     """
     Position-based matching: Process filled orders into trades.
@@ -422,38 +988,35 @@ def process_filled_orders_to_trades(account: str = None) -> Dict[str, Any]:
         - trades_created: number of trades created
         - errors: list of error messages
     """
-    import sys
     from app.db.models import Order, Trade, db
     import uuid
     from decimal import Decimal
     
-    print(f"\n🔄 DEBUG [process_filled_orders_to_trades]: Starting matching...", file=sys.stderr)
-    print(f"🔄 DEBUG: Account filter = {account}", file=sys.stderr)
+    log.info("Matching filled orders into trades (account filter=%s)", account)
+    match_started = time.perf_counter()
     
     errors = []
     trades_created = 0
+    open_positions = 0
+    new_trades = []
     
     # Get all filled orders, sorted by fill_time
     query = Order.query.filter_by(is_filled=True).filter(Order.fill_time.isnot(None))
     if account and account != "default":
         # Only filter by account if it's not "default" (which might not match actual account names)
         query = query.filter_by(account=account)
-        print(f"🔄 DEBUG: Filtering by account = {account}", file=sys.stderr)
-    else:
-        print(f"🔄 DEBUG: Not filtering by account (account={account}), getting all filled orders", file=sys.stderr)
     
     all_orders = query.order_by(Order.fill_time).all()
     filled_count = len(all_orders)
     
-    print(f"🔄 DEBUG: Found {filled_count} filled orders", file=sys.stderr)
+    log.debug("Found %d filled orders", filled_count)
     
     if filled_count == 0:
         # Check total orders to see if any exist
         total_orders = Order.query.count()
         filled_orders_no_time = Order.query.filter_by(is_filled=True).count()
-        print(f"🔄 DEBUG: Total orders in DB: {total_orders}", file=sys.stderr)
-        print(f"🔄 DEBUG: Filled orders (any): {filled_orders_no_time}", file=sys.stderr)
-        print(f"🔄 DEBUG: Filled orders with fill_time: {filled_count}", file=sys.stderr)
+        log.info("No filled orders with a fill_time (total orders: %d, filled: %d)",
+                 total_orders, filled_orders_no_time)
         
         return {
             'filled_orders_count': 0,
@@ -469,119 +1032,383 @@ def process_filled_orders_to_trades(account: str = None) -> Dict[str, Any]:
             orders_by_key[key] = []
         orders_by_key[key].append(order)
     
-    print(f"🔄 DEBUG: Grouped into {len(orders_by_key)} (account, contract) groups", file=sys.stderr)
-    for key, orders_list in orders_by_key.items():
-        print(f"  - {key[0]}/{key[1]}: {len(orders_list)} orders", file=sys.stderr)
+    debug = log.isEnabledFor(logging.DEBUG)
+    log.debug("Grouped %d filled orders into %d (account, contract) groups", filled_count, len(orders_by_key))
+    metrics.incr('match.groups', len(orders_by_key))
     
     # Process each (account, contract) group
     for (acc, contract), orders in orders_by_key.items():
-        print(f"\n🔄 DEBUG: Processing {contract} (account: {acc}), {len(orders)} orders", file=sys.stderr)
+        if debug:
+            log.debug("Processing %s (account: %s), %d orders", contract, acc, len(orders))
         # Sort by fill_time within this group
         orders.sort(key=lambda o: o.fill_time)
         
-        # Track position and current trade
-        net_position = 0  # Current position (positive = long, negative = short)
-        current_trade_orders: List[Order] = []  # Orders in current trade
-        
-        # Helper function to close current trade
-        def close_current_trade():
-            nonlocal trades_created, current_trade_orders
-            if len(current_trade_orders) > 0:
-                try:
-                    # Check if trade already exists before creating
-                    trade = _create_trade_from_orders(current_trade_orders, acc, contract)
-                    if trade:
-                        # Check if trade with this ID already exists (idempotency)
-                        existing_trade = Trade.query.filter_by(id=trade.id).first()
-                        if existing_trade:
-                            # Trade already exists - just mark orders as matched to existing trade
-                            print(f"🔄 DEBUG: Trade {trade.id[:20]}... already exists, skipping creation", file=sys.stderr)
-                            for o in current_trade_orders:
-                                if not o.is_matched:  # Only update if not already matched
-                                    o.is_matched = True
-                                    o.matched_trade_id = existing_trade.id
-                        else:
-                            # New trade - create it
-                            db.session.add(trade)
-                            trades_created += 1
-                            # Mark orders as matched
-                            for o in current_trade_orders:
-                                o.is_matched = True
-                                o.matched_trade_id = trade.id
-                except Exception as e:
-                    errors.append(f"Error creating trade from orders: {str(e)}")
-                current_trade_orders = []
-        
-        for order in orders:
-            # Calculate position change
-            if order.is_buy:
-                position_change = order.filled_qty
-            elif order.is_sell:
-                position_change = -order.filled_qty
-            else:
-                errors.append(f"Order {order.id}: Unknown direction (not buy or sell)")
-                continue
-            
-            # Store previous position and sign
-            prev_position = net_position
-            prev_position_sign = 1 if prev_position > 0 else (-1 if prev_position < 0 else 0)
-            
-            # Calculate new position after this order
-            new_position = net_position + position_change
-            
-            # Check if position crosses zero (goes from + to - or - to +, but not through 0)
-            # Example: +5 to -2 means we closed the long and opened a short
-            position_crossed_zero = (prev_position_sign != 0 and 
-                                    new_position != 0 and 
-                                    ((prev_position_sign > 0) != (new_position > 0)))
-            
-            if position_crossed_zero:
-                # Position crossed zero: close current trade, start new trade with this order
-                close_current_trade()
-                # Start new trade with this order
-                current_trade_orders = [order]
-                net_position = new_position
-            elif prev_position == 0:
-                # Starting new trade from zero
-                current_trade_orders = [order]
-                net_position = new_position
-                # Check if this order immediately closes the trade (position still 0)
-                if net_position == 0:
-                    close_current_trade()
-            else:
-                # Continue current trade
-                current_trade_orders.append(order)
-                net_position = new_position
-                # Check if trade is complete (position returns to exactly 0)
-                if net_position == 0:
-                    close_current_trade()
-        
-        # Check for open position at end (position != 0)
+        # Track position and current trade, starting flat
+        closed_trades, net_position, current_trade_orders = _walk_positions(orders, 0, [], errors)
+        for trade_orders in closed_trades:
+            trade = _save_trade_for_orders(trade_orders, acc, contract, errors)
+            if trade:
+                new_trades.append(trade)
+                trades_created += 1
+
+        # open position at end (position != 0) is kept on the state, see /api/positions
+        state = _save_position_state(acc, contract, net_position, current_trade_orders, orders)
         if net_position != 0:
-            error_msg = (
-                f"Open position remaining for {contract} (account: {acc}): "
-                f"position={net_position}, {len(current_trade_orders)} orders unmatched"
-            )
-            errors.append(error_msg)
-            print(f"⚠️  DEBUG: {error_msg}", file=sys.stderr)
-    
-    print(f"\n🔄 DEBUG: Matching complete:", file=sys.stderr)
-    print(f"  - Trades created: {trades_created}", file=sys.stderr)
-    print(f"  - Errors: {len(errors)}", file=sys.stderr)
-    
-    # Commit all trades
+            open_positions += 1
+            if debug:
+                log.debug("Open position for %s (account: %s): position=%d @ %s, %d orders unmatched",
+                          contract, acc, net_position, state.avg_entry_price if state else None,
+                          len(current_trade_orders))
+    
+    metrics.observe('match', time.perf_counter() - match_started)
+    
+    # Commit all trades (and their daily_pnl rollup rows) together
     try:
-        db.session.commit()
-        print(f"✅ DEBUG: Committed {trades_created} trades to database", file=sys.stderr)
+        from app.services.daily_rollup import apply_trades_to_rollup
+        from app.services.trade_cache import invalidate_trade_cache
+        with metrics.timer('match.commit'):
+            apply_trades_to_rollup(new_trades)
+            db.session.commit()
+        invalidate_trade_cache()
+        metrics.incr('trades.created', trades_created)
+        log.info("Matching complete: %d trades created from %d filled orders, %d errors",
+                 trades_created, filled_count, len(errors))
     except Exception as e:
         db.session.rollback()
         error_msg = f"Database error committing trades: {str(e)}"
         errors.append(error_msg)
-        print(f"❌ DEBUG: {error_msg}", file=sys.stderr)
+        log.error(error_msg)
     
     return {
         'filled_orders_count': filled_count,
         'trades_created': trades_created,
+        'open_positions': open_positions,
+        'errors': errors
+    }
+
+
+def _walk_positions(orders: List[Order], net_position: int, current_trade_orders: List[Order],
+                    errors: List[str]) -> tuple[List[List[Order]], int, List[Order]]:
+    """
+    Walk fills (sorted by fill_time) through the net position of one (account, contract).
+
+    - A trade starts when net position goes from 0 → non-zero
+    - A trade ends when net position returns to 0 (or crosses it, in which case the
+      crossing order starts the next trade)
+
+    Starts from the given position / open trade orders so it can resume where a
+    previous run stopped.
+
+    Returns:
+        (order lists of the trades closed, net position after the last fill, orders of the still-open trade)
+    """
+    closed_trades: List[List[Order]] = []
+    current_trade_orders = list(current_trade_orders)
+
+    def close_current_trade():
+        nonlocal current_trade_orders
+        if len(current_trade_orders) > 0:
+            closed_trades.append(current_trade_orders)
+            current_trade_orders = []
+
+    for order in orders:
+        # Calculate position change
+        if order.is_buy:
+            position_change = order.filled_qty
+        elif order.is_sell:
+            position_change = -order.filled_qty
+        else:
+            errors.append(f"Order {order.id}: Unknown direction (not buy or sell)")
+            continue
+        
+        # Store previous position and sign
+        prev_position = net_position
+        prev_position_sign = 1 if prev_position > 0 else (-1 if prev_position < 0 else 0)
+        
+        # Calculate new position after this order
+        new_position = net_position + position_change
+        
+        # Check if position crosses zero (goes from + to - or - to +, but not through 0)
+        # Example: +5 to -2 means we closed the long and opened a short
+        position_crossed_zero = (prev_position_sign != 0 and 
+                                new_position != 0 and 
+                                ((prev_position_sign > 0) != (new_position > 0)))
+        
+        if position_crossed_zero:
+            # Position crossed zero: close current trade, start new trade with this order
+            close_current_trade()
+            # Start new trade with this order
+            current_trade_orders = [order]
+            net_position = new_position
+        elif prev_position == 0:
+            # Starting new trade from zero
+            current_trade_orders = [order]
+            net_position = new_position
+            # Check if this order immediately closes the trade (position still 0)
+            if net_position == 0:
+                close_current_trade()
+        else:
+            # Continue current trade
+            current_trade_orders.append(order)
+            net_position = new_position
+            # Check if trade is complete (position returns to exactly 0)
+            if net_position == 0:
+                close_current_trade()
+
+    return closed_trades, net_position, current_trade_orders
+
+
+def _save_trade_for_orders(trade_orders: List[Order], account: str, contract: str, errors: List[str]) -> Optional[Trade]:
+    """
+    Build the trade for one closed group of orders, add it to the session unless it
+    already exists (idempotency) and mark the orders as matched.
+
+    Returns the new Trade, or None if nothing was added.
+    """
+    from app.db.models import Trade, db
+
+    try:
+        trade = _create_trade_from_orders(trade_orders, account, contract)
+        if not trade:
+            return None
+        # Check if trade with this ID already exists (idempotency)
+        existing_trade = Trade.query.filter_by(id=trade.id).first()
+        if existing_trade:
+            # Trade already exists - just mark orders as matched to existing trade
+            log.debug("Trade %s... already exists, skipping creation", trade.id[:20])
+            for o in trade_orders:
+                if not o.is_matched:  # Only update if not already matched
+                    o.is_matched = True
+                    o.matched_trade_id = existing_trade.id
+            return None
+        # New trade - create it
+        db.session.add(trade)
+        # Mark orders as matched
+        for o in trade_orders:
+            o.is_matched = True
+            o.matched_trade_id = trade.id
+        return trade
+    except Exception as e:
+        errors.append(f"Error creating trade from orders: {str(e)}")
+        return None
+
+
+def _save_position_state(account: str, contract: str, net_position: int, open_orders: List[Order],
+                         processed_orders: List[Order], state: Optional[PositionState] = None,
+                         full_walk: bool = True) -> Optional[PositionState]:
+    """
+    Persist where matching stopped for one (account, contract): net position with its
+    average entry price, the orders of the open trade and the fill_time watermark (plus
+    the ids already processed at exactly that time, so ties aren't replayed or skipped).
+
+    Orders the walk processed but couldn't match are recorded too, so the incremental
+    matcher doesn't take them for late fills. full_walk: processed_orders is the group's
+    whole history, so that list is rebuilt rather than added to.
+    """
+    from app.db.models import PositionState, db
+
+    if account is None or contract is None:
+        return None
+
+    if state is None:
+        state = db.session.get(PositionState, (account, contract))
+    if state is None:
+        state = PositionState(account=account, contract=contract, net_position=0, open_order_ids=[], last_order_ids=[],
+                              skipped_order_ids=[])
+        db.session.add(state)
+
+    timed = [o for o in processed_orders if o.fill_time is not None]
+    if timed:
+        watermark = max(o.fill_time for o in timed)
+        at_watermark = [o.id for o in timed if o.fill_time == watermark]
+        if state.last_fill_time == watermark:
+            at_watermark = list(dict.fromkeys((state.last_order_ids or []) + at_watermark))
+        if state.last_fill_time is None or watermark >= state.last_fill_time:
+            state.last_fill_time = watermark
+            state.last_order_ids = at_watermark
+
+    open_ids = {o.id for o in open_orders}
+    skipped = [o.id for o in processed_orders if not o.is_matched and o.id not in open_ids]
+    if not full_walk:
+        skipped = list(dict.fromkeys((state.skipped_order_ids or []) + skipped))
+    state.skipped_order_ids = skipped
+
+    state.net_position = net_position
+    state.avg_entry_price, state.opened_at = _open_position_cost(open_orders, net_position)
+    state.open_order_ids = [o.id for o in open_orders]
+    state.updated_at = datetime.utcnow()
+    return state
+
+
+def _open_position_cost(open_orders: List[Order], net_position: int) -> tuple[Optional[Decimal], Optional[datetime]]:
+    """
+    Average entry price and open time of the position left after a walk.
+
+    Average cost: every fill that adds to the position's side moves the average,
+    fills that reduce it don't. When the open trade began by crossing zero, only the
+    part of the crossing order past zero opened it, so the first order is weighted by
+    the position right after it rather than its filled_qty.
+    """
+    from decimal import Decimal
+
+    if net_position == 0 or not open_orders:
+        return None, None
+    adds_long = net_position > 0
+
+    def change(order):
+        return (order.filled_qty or 0) * (1 if order.is_buy else -1 if order.is_sell else 0)
+
+    # position right after the first order = final position minus everything after it
+    after_first = net_position - sum(change(o) for o in open_orders[1:])
+    qty = 0
+    cost = Decimal('0')
+    for i, order in enumerate(open_orders):
+        if bool(order.is_buy) == adds_long and order.avg_price is not None and order.filled_qty:
+            used = abs(after_first) if i == 0 else order.filled_qty
+            qty += used
+            cost += Decimal(str(order.avg_price)) * used
+    if qty == 0:
+        return None, open_orders[0].fill_time
+    return (cost / qty).quantize(Decimal('0.0001')), open_orders[0].fill_time
+
+
+def process_new_fills_to_trades(account: str = None) -> Dict[str, Any]:
+    """
+    Incremental position-based matching: only processes fills newer than each
+    (account, contract)'s watermark, resuming from the persisted net position and
+    open-trade orders, so re-import cost follows the number of new fills instead
+    of total history.
+
+    Same trade grouping rules as process_filled_orders_to_trades. A group without
+    saved state (first run) is replayed from its full history once. If a fill shows
+    up that is older than the group's watermark (e.g. an older export imported late),
+    that group is replayed from its full history too, since its position walk changed.
+
+    Note: This function must be called within app.app_context()
+
+    Returns:
+        dict with:
+        - filled_orders_count: number of new filled orders processed
+        - trades_created: number of trades created
+        - groups_processed / groups_replayed: (account, contract) groups touched / fully replayed
+        - errors: list of error messages
+    """
+    from app.db.models import Order, PositionState, db
+    from sqlalchemy import and_, or_
+
+    match_started = time.perf_counter()
+    errors = []
+    trades_created = 0
+    new_trades = []
+
+    # Fills at/after each group's watermark, plus unmatched stragglers before it
+    query = (
+        db.session.query(Order)
+        .outerjoin(PositionState, and_(PositionState.account == Order.account,
+                                       PositionState.contract == Order.contract))
+        .filter(Order.is_filled == True, Order.fill_time.isnot(None))
+        .filter(or_(
+            PositionState.last_fill_time.is_(None),
+            Order.fill_time >= PositionState.last_fill_time,
+            and_(Order.is_matched == False, or_(Order.is_buy == True, Order.is_sell == True)),
+        ))
+    )
+    state_query = PositionState.query
+    if account and account != "default":
+        query = query.filter(Order.account == account)
+        state_query = state_query.filter_by(account=account)
+
+    candidates = query.order_by(Order.fill_time, Order.id).all()
+    states = {(s.account, s.contract): s for s in state_query.all()}
+
+    orders_by_key: Dict[tuple, List[Order]] = {}
+    for order in candidates:
+        orders_by_key.setdefault((order.account, order.contract), []).append(order)
+
+    # Open-trade orders for every group we're about to resume, in one query
+    open_ids = set()
+    for key in orders_by_key:
+        if key in states:
+            open_ids.update(states[key].open_order_ids or [])
+    open_orders_by_id = {}
+    if open_ids:
+        open_orders_by_id = {o.id: o for o in Order.query.filter(Order.id.in_(list(open_ids))).all()}
+
+    filled_count = 0
+    groups_replayed = 0
+    for (acc, contract), orders in orders_by_key.items():
+        state = states.get((acc, contract))
+        net_position = 0
+        open_orders: List[Order] = []
+        full_walk = True
+
+        if state is not None and state.last_fill_time is not None:
+            state_open_ids = set(state.open_order_ids or [])
+            done_at_watermark = set(state.last_order_ids or [])
+            # walked before but unmatchable: still unmatched, but not new
+            skipped = set(state.skipped_order_ids or [])
+            late = [o for o in orders if o.fill_time < state.last_fill_time
+                    and o.id not in state_open_ids and o.id not in skipped]
+            if late:
+                # history before the watermark changed - replay this group from scratch
+                groups_replayed += 1
+                errors.append(
+                    f"{len(late)} fills for {contract} (account: {acc}) are older than the last matched fill; "
+                    f"replayed full history"
+                )
+                orders = (
+                    Order.query.filter_by(is_filled=True, account=acc, contract=contract)
+                    .filter(Order.fill_time.isnot(None))
+                    .order_by(Order.fill_time, Order.id)
+                    .all()
+                )
+            else:
+                net_position = state.net_position or 0
+                open_orders = [open_orders_by_id[i] for i in (state.open_order_ids or []) if i in open_orders_by_id]
+                orders = [
+                    o for o in orders
+                    if o.id not in state_open_ids and o.id not in skipped
+                    and not (o.fill_time == state.last_fill_time and o.id in done_at_watermark)
+                ]
+                full_walk = False
+
+        if not orders:
+            continue
+
+        filled_count += len(orders)
+        closed_trades, net_position, open_orders = _walk_positions(orders, net_position, open_orders, errors)
+        for trade_orders in closed_trades:
+            trade = _save_trade_for_orders(trade_orders, acc, contract, errors)
+            if trade:
+                new_trades.append(trade)
+                trades_created += 1
+        _save_position_state(acc, contract, net_position, open_orders, orders, state=state, full_walk=full_walk)
+
+    metrics.observe('match', time.perf_counter() - match_started)
+    metrics.incr('match.groups', len(orders_by_key))
+    metrics.incr('match.groups_replayed', groups_replayed)
+
+    try:
+        from app.services.daily_rollup import apply_trades_to_rollup
+        from app.services.trade_cache import invalidate_trade_cache
+        with metrics.timer('match.commit'):
+            apply_trades_to_rollup(new_trades)
+            db.session.commit()
+        invalidate_trade_cache()
+        metrics.incr('trades.created', trades_created)
+        log.info("Incremental matching: %d trades created from %d new fills in %d groups (%d replayed)",
+                 trades_created, filled_count, len(orders_by_key), groups_replayed)
+    except Exception as e:
+        db.session.rollback()
+        errors.append(f"Database error committing trades: {str(e)}")
+        log.error("Database error committing trades: %s", e)
+        trades_created = 0
+
+    return {
+        'filled_orders_count': filled_count,
+        'trades_created': trades_created,
+        'groups_processed': len(orders_by_key),
+        'groups_replayed': groups_replayed,
         'errors': errors
     }
 
@@ -601,6 +1428,7 @@ def _create_trade_from_orders(orders: List[Order], account: str, contract: str)
     from app.db.models import Trade
     from decimal import Decimal
     import uuid
+    from app.services.instruments import trade_pnl
     
     if not orders or len(orders) == 0:
         return None
@@ -625,8 +1453,9 @@ def _create_trade_from_orders(orders: List[Order], account: str, contract: str)
     entry_value = Decimal('0')
     exit_value = Decimal('0')
     
-    for order in orders:
-        order_dict = order.to_dict()
+    # one dict per order, shared by entry/exit_orders and fills
+    order_dicts = [order.to_dict() for order in orders]
+    for order, order_dict in zip(orders, order_dicts):
         if direction == 'LONG':
             if order.is_buy:
                 entry_orders.append(order_dict)
@@ -661,14 +1490,11 @@ def _create_trade_from_orders(orders: List[Order], account: str, contract: str)
     entry_time = orders[0].fill_time
     exit_time = orders[-1].fill_time
     
-    # Calculate PnL
-    if direction == 'LONG':
-        pnl = (exit_price - entry_price) * entry_qty
-    else:  # SHORT
-        pnl = (entry_price - exit_price) * entry_qty
+    # Calculate PnL in dollars: point value and commissions from the instrument master
+    pnl = trade_pnl(direction, entry_price, exit_price, entry_qty, contract)
     
     # Create fills array: all orders as dicts
-    fills = [order.to_dict() for order in orders]
+    fills = order_dicts
     
     # Generate deterministic trade ID based on order IDs (for idempotency)
     # Sort order IDs to ensure same set of orders always produces same trade ID
@@ -0,0 +1,115 @@
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Leveled logging + in-process import metrics.
+#
+# Everything logs under the 'trading_journal' logger. The default level is INFO, so
+# per-row / per-group detail (logged at DEBUG) costs one isEnabledFor() check per loop
+# instead of formatting a line to stderr. Set LOG_LEVEL=DEBUG to get it back.
+#
+# Stage timers and counters live in one process-wide registry, read by GET /api/metrics.
+# Stage names used by the import pipeline:
+#   orders.parse   CSV text -> rows
+#   orders.hash    row -> order fields (row hash, numbers, fill time)
+#   orders.dedupe  looking up which rows are already stored
+#   orders.insert  writing new / updated order rows
+#   orders.commit  committing the orders transaction
+#   match          walking fills into trades
+#   match.commit   committing trades + rollup
+#   import.request the whole POST /api/trades/import
+
+LOGGER_NAME = 'trading_journal'
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+def get_logger(name: Optional[str] = None) -> logging.Logger:
+    """'trading_journal' or a child of it, e.g. get_logger('csv') -> trading_journal.csv"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+def configure_logging(level: Optional[str] = None) -> logging.Logger:
+    """
+    Attach a stderr handler to the 'trading_journal' logger (once).
+    level defaults to the LOG_LEVEL env var, then INFO.
+    """
+    logger = get_logger()
+    level = (level or os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    logger.setLevel(getattr(logging, level, logging.INFO))
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+class Metrics:
+    """
+    Thread-safe counters and stage timers.
+
+    Usage:
+        with metrics.timer('orders.dedupe'):
+            existing = _fetch_existing_orders(ids)
+        metrics.incr('orders.inserted', len(records))
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters: Dict[str, int] = {}
+            self._timers: Dict[str, Dict[str, float]] = {}
+            self._since = datetime.utcnow()
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        """record one run of a stage that took `seconds`"""
+        with self._lock:
+            stat = self._timers.get(name)
+            if stat is None:
+                stat = self._timers[name] = {'count': 0, 'total_sec': 0.0, 'max_sec': 0.0, 'last_sec': 0.0}
+            stat['count'] += 1
+            stat['total_sec'] += seconds
+            stat['last_sec'] = seconds
+            if seconds > stat['max_sec']:
+                stat['max_sec'] = seconds
+
+    @contextmanager
+    def timer(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            timers = {
+                name: {
+                    'count': stat['count'],
+                    'total_sec': round(stat['total_sec'], 6),
+                    'avg_sec': round(stat['total_sec'] / stat['count'], 6),
+                    'max_sec': round(stat['max_sec'], 6),
+                    'last_sec': round(stat['last_sec'], 6),
+                }
+                for name, stat in sorted(self._timers.items())
+            }
+            return {
+                'since': self._since.isoformat(),
+                'counters': dict(sorted(self._counters.items())),
+                'timers': timers,
+            }
+
+
+metrics = Metrics()
@@ -0,0 +1,20 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Process pools for the CPU-bound import / matching steps.
+#
+# The API runs threaded, and forking a multi-threaded process copies whatever locks
+# other threads held at that moment (logging, the DB pool, allocator state) into the
+# child, where nobody will ever release them. Workers are started with forkserver
+# instead (spawn where it isn't available): a clean interpreter that imports the
+# worker's module, so worker functions must be module-level and their arguments
+# picklable.
+
+
+def _start_method() -> str:
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """a ProcessPoolExecutor whose workers don't inherit the parent's threads or locks"""
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(_start_method()))
@@ -0,0 +1,183 @@
+import cProfile
+import os
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Optional
+from flask import Flask, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.utils.instrumentation import get_logger, metrics
+
+# Opt-in per-request profiling.
+#
+# With PROFILE_REQUESTS on, every request records wall time, SQL statement count and
+# time (engine cursor events), ORM rows hydrated (mapper load events) and response
+# bytes. The numbers go to the 'trading_journal.profile' log, the X-Profile-* response
+# headers and the /api/metrics timers. A request whose most repeated statement runs
+# PROFILE_SQL_REPEAT_WARN+ times is logged as a warning - that's the N+1 signature
+# (one SELECT per order in a loop).
+#
+# With PROFILE_DUMP_MS set, each request also runs under cProfile and the stats of
+# the ones slower than that many ms are written to PROFILE_DIR as .pstats files
+# (python -m pstats <file>, or snakeviz).
+#
+# Config keys (app.config, defaults from the env vars of the same name):
+#   PROFILE_REQUESTS          off unless 1/true/yes
+#   PROFILE_DUMP_MS           None = never dump
+#   PROFILE_DIR               'profiles'
+#   PROFILE_SQL_REPEAT_WARN   20
+
+log = get_logger('profile')
+
+# stats of the request being handled on this thread (None outside a profiled request)
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar('profile_stats', default=None)
+
+# literals differ between N+1 statements, their text doesn't (bound params), but
+# collapse whitespace so formatting doesn't split the counts
+_WHITESPACE = re.compile(r'\s+')
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').lower() in ['1', 'true', 'yes']
+
+
+def init_profiling(app: Flask) -> None:
+    """register the request hooks and SQL listeners; they do nothing while PROFILE_REQUESTS is off"""
+    dump_ms = os.environ.get('PROFILE_DUMP_MS')
+    app.config.setdefault('PROFILE_REQUESTS', _env_flag('PROFILE_REQUESTS'))
+    app.config.setdefault('PROFILE_DUMP_MS', float(dump_ms) if dump_ms else None)
+    app.config.setdefault('PROFILE_DIR', os.environ.get('PROFILE_DIR', 'profiles'))
+    app.config.setdefault('PROFILE_SQL_REPEAT_WARN', int(os.environ.get('PROFILE_SQL_REPEAT_WARN', 20)))
+
+    _install_sql_listeners()
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+
+
+_listeners_installed = False
+
+
+def _install_sql_listeners() -> None:
+    """listen on every Engine / mapped class once per process"""
+    global _listeners_installed
+    if _listeners_installed:
+        return
+    from app.db.models import db
+
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(db.Model, 'load', _on_load, propagate=True)
+    _listeners_installed = True
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        stats['sql_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    stats['sql_count'] += 1
+    stats['sql_sec'] += time.perf_counter() - stats.pop('sql_started', time.perf_counter())
+    stats['statements'][_WHITESPACE.sub(' ', statement).strip()] += 1
+
+
+def _on_load(target, context):
+    stats = _current.get()
+    if stats is not None:
+        stats['rows_hydrated'] += 1
+
+
+def _start_request():
+    if not current_app.config.get('PROFILE_REQUESTS'):
+        return
+    stats = {
+        'started': time.perf_counter(),
+        'sql_count': 0,
+        'sql_sec': 0.0,
+        'rows_hydrated': 0,
+        'statements': Counter(),
+        'profiler': None,
+    }
+    if current_app.config.get('PROFILE_DUMP_MS') is not None:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            stats['profiler'] = profiler
+        except ValueError:
+            pass  # another profiler is already running (concurrent request) - skip the dump for this one
+    g.profile_token = _current.set(stats)
+
+
+def _finish_request(response):
+    stats = _current.get()
+    if stats is None:
+        return response
+
+    wall_sec = time.perf_counter() - stats['started']
+    if stats['profiler'] is not None:
+        stats['profiler'].disable()
+
+    # streamed responses (exports) aren't buffered, so their size isn't known here
+    response_bytes = None if response.is_streamed else response.calculate_content_length()
+
+    endpoint = request.endpoint or 'unknown'
+    metrics.observe(f'request.{endpoint}', wall_sec)
+    metrics.observe(f'request.{endpoint}.sql', stats['sql_sec'])
+    metrics.incr(f'request.{endpoint}.sql_statements', stats['sql_count'])
+    metrics.incr(f'request.{endpoint}.rows_hydrated', stats['rows_hydrated'])
+
+    response.headers['X-Profile-Wall-Ms'] = f"{wall_sec * 1000:.1f}"
+    response.headers['X-Profile-Sql-Count'] = str(stats['sql_count'])
+    response.headers['X-Profile-Sql-Ms'] = f"{stats['sql_sec'] * 1000:.1f}"
+    response.headers['X-Profile-Rows'] = str(stats['rows_hydrated'])
+
+    log.info("%s %s -> %s: %.1f ms, %d SQL (%.1f ms), %d rows hydrated, %s bytes",
+             request.method, request.path, response.status_code, wall_sec * 1000,
+             stats['sql_count'], stats['sql_sec'] * 1000, stats['rows_hydrated'],
+             response_bytes if response_bytes is not None else 'streamed')
+
+    if stats['statements']:
+        statement, repeats = stats['statements'].most_common(1)[0]
+        if repeats >= current_app.config.get('PROFILE_SQL_REPEAT_WARN', 20):
+            metrics.incr('request.repeated_sql')
+            log.warning("%s %s ran the same statement %d times (N+1?): %s",
+                        request.method, request.path, repeats, statement[:300])
+
+    dump_ms = current_app.config.get('PROFILE_DUMP_MS')
+    if stats['profiler'] is not None and wall_sec * 1000 >= dump_ms:
+        path = _dump_profile(stats['profiler'], current_app.config.get('PROFILE_DIR', 'profiles'),
+                             endpoint, wall_sec)
+        response.headers['X-Profile-Dump'] = path
+        log.info("Wrote profile for %s %s to %s", request.method, request.path, path)
+
+    # done with this request, the teardown hook has nothing left to do
+    stats['profiler'] = None
+    _current.reset(g.pop('profile_token'))
+    return response
+
+
+def _teardown_request(exc):
+    """after_request doesn't run when a view raises - still stop the profiler and clear the stats"""
+    token = g.pop('profile_token', None)
+    if token is None:
+        return
+    stats = _current.get()
+    if stats is not None and stats['profiler'] is not None:
+        stats['profiler'].disable()
+    _current.reset(token)
+
+
+def _dump_profile(profiler: cProfile.Profile, directory: str, endpoint: str, wall_sec: float) -> str:
+    os.makedirs(directory, exist_ok=True)
+    name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{endpoint}-{wall_sec * 1000:.0f}ms.pstats"
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path)
+    return path
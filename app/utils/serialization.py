@@ -0,0 +1,43 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+from flask import current_app
+
+# Fast JSON encoding for the big read endpoints (trades, daily PnL, calendar, export).
+#
+# Uses orjson when it's installed (C encoder, formats datetimes itself) and falls back
+# to the stdlib encoder otherwise - same output either way for the values we send:
+# naive datetimes / dates as ISO strings, Decimals as floats.
+#
+# Payloads built from trade_rows_to_dicts() keep datetimes as datetime objects, so
+# send them with json_response() / dumps(), not jsonify() (Flask's default provider
+# would format them as HTTP dates).
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements.txt
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        """obj -> compact JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(obj: Any) -> bytes:
+        """obj -> compact JSON bytes"""
+        return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload: Any, status: int = 200):
+    """jsonify() replacement that encodes with dumps()"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
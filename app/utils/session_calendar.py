@@ -0,0 +1,313 @@
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pytz
+from app.utils.trading_day import TimeArray, wall_clock_array, EPOCH_ORDINAL
+
+# Trading sessions per product.
+#
+# A trade belongs to the trading day whose session it exits in: a session runs from
+# just after the previous session's close up to and including its own close. Which
+# days have a session, and when it closes, depends on the product:
+#
+# - CME equity index (ES, NQ, micros) and COMEX metals (GC, MGC, ...): weekdays, close
+#   4pm Chicago, no session on CME holidays (the holiday's Globex trading counts for the
+#   next trading day, like CME's trade dates), early close on the half days
+# - anything else: the original rule, every calendar day closing 3pm Pacific (the same
+#   answer as get_trading_day)
+#
+# Session closes are precomputed per product group for a span of years and kept as one
+# sorted array: looking up a timestamp's session is a searchsorted (O(log n)) over it.
+#
+# Exit times are stored naive, as wall-clock in STORAGE_TIMEZONE (what get_trading_day
+# assumes), so the closes are converted to that clock too. Aware exit times are converted
+# with the DST transition table from app.utils.trading_day.
+
+STORAGE_TIMEZONE = 'America/Los_Angeles'
+
+# Bump whenever a change below moves trades to a different trading day (specs, product
+# mapping, holiday rules). Stored rollups built under another version are rebuilt, see
+# app.services.daily_rollup.ensure_rollup_current.
+#   1: every product on the 3pm Pacific cutoff
+#   2: per-product sessions (CME 4pm CT close, holidays, half days)
+CALENDAR_VERSION = 2
+
+# name -> session spec
+#   timezone / close: when the session ends, in the exchange's clock
+#   early_close: close on the half days (None: the product has none)
+#   exchange_days: True = weekdays minus CME holidays, False = every calendar day
+SESSION_SPECS: Dict[str, Dict] = {
+    'default': {
+        'timezone': 'America/Los_Angeles',
+        'close': time(15, 0),
+        'early_close': None,
+        'exchange_days': False,
+    },
+    # CME Globex equity index futures: 5pm-4pm CT, half days close 12:15 CT
+    'cme_equity': {
+        'timezone': 'America/Chicago',
+        'close': time(16, 0),
+        'early_close': time(12, 15),
+        'exchange_days': True,
+    },
+    # COMEX metals on Globex: 5pm-4pm CT, half days close 12:45 CT
+    'comex_metals': {
+        'timezone': 'America/Chicago',
+        'close': time(16, 0),
+        'early_close': time(12, 45),
+        'exchange_days': True,
+    },
+}
+
+DEFAULT_SESSION = 'default'
+
+# product root (Order.product, or Trade.symbol without the contract month) -> session spec
+PRODUCT_SESSIONS: Dict[str, str] = {
+    'ES': 'cme_equity', 'MES': 'cme_equity',
+    'NQ': 'cme_equity', 'MNQ': 'cme_equity',
+    'YM': 'cme_equity', 'MYM': 'cme_equity',
+    'RTY': 'cme_equity', 'M2K': 'cme_equity',
+    'GC': 'comex_metals', 'MGC': 'comex_metals',
+    'SI': 'comex_metals', 'SIL': 'comex_metals',
+    'HG': 'comex_metals', 'MHG': 'comex_metals',
+}
+
+# one-off exchange closures / half days the rules below don't produce (date -> reason)
+EXTRA_HOLIDAYS: Dict[date, str] = {}
+EXTRA_EARLY_CLOSES: Dict[date, str] = {}
+
+# contract month code + 1-2 digit year, e.g. the G6 in MGCG6 or the H26 in NQH26
+_CONTRACT_SUFFIX = re.compile(r'^([A-Z0-9]+?)[FGHJKMNQUVXZ]\d{1,2}$')
+
+
+def product_root(symbol: Optional[str]) -> str:
+    """MGCG6 -> MGC, NQH26 -> NQ, MGC -> MGC"""
+    symbol = (symbol or '').strip().upper()
+    if symbol in PRODUCT_SESSIONS:
+        return symbol
+    match = _CONTRACT_SUFFIX.match(symbol)
+    return match.group(1) if match else symbol
+
+
+def session_name(symbol: Optional[str]) -> str:
+    """name of the session spec a symbol trades on"""
+    return PRODUCT_SESSIONS.get(product_root(symbol), DEFAULT_SESSION)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th (1-based, -1 = last) weekday (0 = Monday) of a month"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous algorithm)"""
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = divmod(b, 4)
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays move to Friday, Sunday holidays to Monday"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def cme_holidays(year: int) -> Dict[date, str]:
+    """CME holidays in a year (days with no trade date of their own), date -> name"""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3): "Martin Luther King Jr. Day",
+        _nth_weekday(year, 2, 0, 3): "Presidents' Day",
+        _easter(year) - timedelta(days=2): "Good Friday",
+        _nth_weekday(year, 5, 0, -1): "Memorial Day",
+        _observed(date(year, 7, 4)): "Independence Day",
+        _nth_weekday(year, 9, 0, 1): "Labor Day",
+        _nth_weekday(year, 11, 3, 4): "Thanksgiving",
+        _observed(date(year, 12, 25)): "Christmas",
+    }
+    # a Saturday New Year's Day isn't moved back into the old year
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays[_observed(new_year)] = "New Year's Day"
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = "Juneteenth"
+    holidays.update({day: name for day, name in EXTRA_HOLIDAYS.items() if day.year == year})
+    return holidays
+
+
+def cme_early_closes(year: int) -> Dict[date, str]:
+    """half days in a year, date -> reason (only the ones that are trading days apply)"""
+    closes = {
+        date(year, 7, 3): "Independence Day eve",
+        _nth_weekday(year, 11, 3, 4) + timedelta(days=1): "Day after Thanksgiving",
+        date(year, 12, 24): "Christmas Eve",
+    }
+    closes.update({day: reason for day, reason in EXTRA_EARLY_CLOSES.items() if day.year == year})
+    return closes
+
+
+class SessionCalendar:
+    """
+    Precomputed sessions of one spec for first_year..last_year.
+
+    closes[i] is the close of the session for trading day days[i] (a date ordinal) as
+    naive STORAGE_TIMEZONE wall-clock; the session covers (closes[i - 1], closes[i]].
+    """
+
+    def __init__(self, name: str, first_year: int, last_year: int):
+        self.name = name
+        self.first_year = first_year
+        self.last_year = last_year
+        spec = SESSION_SPECS[name]
+        exchange_tz = pytz.timezone(spec['timezone'])
+        storage_tz = pytz.timezone(STORAGE_TIMEZONE)
+
+        days, closes = [], []
+        for year in range(first_year, last_year + 1):
+            holidays = cme_holidays(year) if spec['exchange_days'] else {}
+            early_closes = cme_early_closes(year) if spec['early_close'] else {}
+            day = date(year, 1, 1)
+            while day.year == year:
+                if not spec['exchange_days'] or (day.weekday() < 5 and day not in holidays):
+                    close = spec['early_close'] if day in early_closes else spec['close']
+                    local = exchange_tz.localize(datetime.combine(day, close))
+                    days.append(day.toordinal())
+                    closes.append(local.astimezone(storage_tz).replace(tzinfo=None))
+                day += timedelta(days=1)
+
+        self.days = np.array(days, dtype=np.int64)
+        self.closes = np.array(closes, dtype='datetime64[us]')
+
+    def __len__(self):
+        return int(self.days.size)
+
+    def covers(self, first_year: int, last_year: int) -> bool:
+        # a year of slack at each end so every session in range has a previous close
+        return self.first_year < first_year and last_year < self.last_year
+
+    def trading_day_ordinals(self, wall_clock: np.ndarray) -> np.ndarray:
+        """trading day ordinal for each naive STORAGE_TIMEZONE wall-clock time"""
+        return self.days[np.searchsorted(self.closes, wall_clock, side='left')]
+
+    def bounds(self, start_day: Optional[date], end_day: Optional[date]) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        (first exit time, last exit time) that land on trading days start_day..end_day,
+        as naive wall-clock for exit_time >= start / exit_time <= end filters.
+        """
+        start = end = None
+        if start_day is not None:
+            idx = int(np.searchsorted(self.days, start_day.toordinal(), side='left'))
+            start = self.closes[idx - 1].astype(datetime) + timedelta(microseconds=1)
+        if end_day is not None:
+            idx = int(np.searchsorted(self.days, end_day.toordinal(), side='right'))
+            end = self.closes[idx - 1].astype(datetime)
+        return start, end
+
+    def windows(self, start_day: date, end_day: date) -> List[Tuple[datetime, datetime, date]]:
+        """(previous close, close, trading day) of each session start_day..end_day"""
+        lo = int(np.searchsorted(self.days, start_day.toordinal(), side='left'))
+        hi = int(np.searchsorted(self.days, end_day.toordinal(), side='right'))
+        closes = self.closes[lo - 1:hi].astype(datetime).tolist()
+        return [(closes[i], closes[i + 1], date.fromordinal(int(self.days[lo + i])))
+                for i in range(hi - lo)]
+
+
+_calendars: Dict[str, SessionCalendar] = {}
+
+
+def get_calendar(name: str, first_year: int, last_year: int) -> SessionCalendar:
+    """the cached calendar for a spec, rebuilt wider when years outside it are asked for"""
+    calendar = _calendars.get(name)
+    if calendar is None or not calendar.covers(first_year, last_year):
+        if calendar is not None:
+            first_year, last_year = min(first_year, calendar.first_year + 1), max(last_year, calendar.last_year - 1)
+        # whole decades, so a growing journal doesn't rebuild every year
+        calendar = SessionCalendar(name, first_year // 10 * 10 - 1, last_year // 10 * 10 + 10)
+        _calendars[name] = calendar
+    return calendar
+
+
+def _year_span(wall_clock: np.ndarray) -> Tuple[int, int]:
+    years = wall_clock.astype('datetime64[Y]').astype(np.int64) + 1970
+    return int(years.min()), int(years.max())
+
+
+def session_day_ordinals(exit_times: TimeArray, symbols: Sequence[Optional[str]]) -> np.ndarray:
+    """trading day (date ordinal) of each exit time, using each trade's product session"""
+    wall_clock = wall_clock_array(exit_times, STORAGE_TIMEZONE)
+    ordinals = np.zeros(wall_clock.size, dtype=np.int64)
+    if wall_clock.size == 0:
+        return ordinals
+
+    # one session name per distinct symbol, then one searchsorted per session
+    names: Dict[Optional[str], str] = {}
+    spec_of = np.array([names.get(s) or names.setdefault(s, session_name(s)) for s in symbols], dtype=object)
+    first_year, last_year = _year_span(wall_clock)
+    for name in set(names.values()):
+        mask = spec_of == name
+        ordinals[mask] = get_calendar(name, first_year, last_year).trading_day_ordinals(wall_clock[mask])
+    return ordinals
+
+
+def session_day_array(exit_times: TimeArray, symbols: Sequence[Optional[str]]) -> np.ndarray:
+    """session_day_ordinals as datetime64[D]"""
+    return (session_day_ordinals(exit_times, symbols) - EPOCH_ORDINAL).astype('datetime64[D]')
+
+
+def session_day_strings(exit_times: TimeArray, symbols: Sequence[Optional[str]]) -> List[str]:
+    """session_day_ordinals as ISO strings"""
+    iso: Dict[int, str] = {}
+    return [iso.get(n) or iso.setdefault(n, date.fromordinal(n).isoformat())
+            for n in session_day_ordinals(exit_times, symbols).tolist()]
+
+
+def session_trading_day(dt: datetime, symbol: Optional[str]) -> str:
+    """single-trade version: ISO trading day of one exit time"""
+    return session_day_strings([dt], [symbol])[0]
+
+
+def session_bounds(start_day: Optional[date], end_day: Optional[date],
+                   symbols: Optional[Iterable[Optional[str]]] = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Exit time window covering trading days start_day..end_day for the given symbols
+    (every session spec when None). With more than one spec it's the union of their
+    windows, so it can take in trades from neighbouring days - re-check those against
+    their own trading day.
+    """
+    names = {session_name(s) for s in symbols} if symbols is not None else set(SESSION_SPECS)
+    years = [d.year for d in (start_day, end_day) if d is not None]
+    if not years:
+        return None, None
+
+    starts, ends = [], []
+    for name in names:
+        start, end = get_calendar(name, min(years), max(years)).bounds(start_day, end_day)
+        starts.append(start)
+        ends.append(end)
+    return (min(starts) if start_day else None), (max(ends) if end_day else None)
+
+
+def session_windows(start_day: date, end_day: date,
+                    names: Iterable[str]) -> List[Tuple[str, datetime, datetime, date]]:
+    """
+    (session name, previous close, close, trading day) for every session of the named
+    specs on trading days start_day..end_day; an exit time t is on that trading day
+    when previous close < t <= close. Rows for a range join in SQL.
+    """
+    return [(name,) + window
+            for name in sorted(set(names))
+            for window in get_calendar(name, start_day.year, end_day.year).windows(start_day, end_day)]
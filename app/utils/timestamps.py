@@ -0,0 +1,105 @@
+import re
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+# Fill time parsing for order imports.
+#
+# A broker export uses one timestamp format for the whole file, so the format is
+# sniffed from the first value that parses and then locked in: every later value
+# goes through one precompiled regex instead of strptime trying formats one by one
+# (and raising a ValueError for each miss). Repeated strings - bracket orders that
+# fill in the same second - come straight out of a cache.
+
+# name -> regex, in the same order the fallback tries its strptime formats
+FILL_TIME_FORMATS = {
+    # 01/15/2026 07:40:22, 1/15/26 7:40
+    'us': re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\s+(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?'),
+    # 2026-01-15 07:40:22, 2026-01-15 07:40
+    'iso': re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})\s+(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?'),
+}
+
+# cap on memoised strings per file (an export with more distinct timestamps just stops caching new ones)
+CACHE_SIZE = 200_000
+
+
+def _build_us(match) -> datetime:
+    month, day, year, hour, minute, second = match.groups()
+    year = int(year)
+    if year < 100:
+        # strptime %y: 69-99 -> 1900s, 00-68 -> 2000s
+        year += 1900 if year >= 69 else 2000
+    return datetime(year, int(month), int(day), int(hour), int(minute), int(second or 0))
+
+
+def _build_iso(match) -> datetime:
+    year, month, day, hour, minute, second = match.groups()
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second or 0))
+
+
+_BUILDERS = {'us': _build_us, 'iso': _build_iso}
+
+
+class FillTimeParser:
+    """
+    Per-file fill time parser.
+
+    Gives the same result as `fallback` (the generic multi-format parser) for every
+    value: the fast path only answers when its regex matches the whole string and
+    builds a valid datetime, anything else goes to the fallback.
+
+    Usage:
+        parse = FillTimeParser(_parse_datetime_maybe).parse
+        fill_time = parse(row.get('Fill Time'))
+    """
+
+    def __init__(self, fallback: Callable[[Optional[str]], Optional[datetime]]):
+        self.fallback = fallback
+        self.format: Optional[str] = None  # locked in after the first value that parses
+        self._cache: Dict[str, Optional[datetime]] = {}
+        self.stats = {'parsed': 0, 'cache_hits': 0, 'fast_path': 0, 'fallback': 0}
+
+    def parse(self, value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        cached = self._cache.get(value)
+        if cached is not None or value in self._cache:
+            self.stats['cache_hits'] += 1
+            return cached
+
+        self.stats['parsed'] += 1
+        result = self._parse_uncached(value)
+        if len(self._cache) < CACHE_SIZE:
+            self._cache[value] = result
+        return result
+
+    def _parse_uncached(self, value: str) -> Optional[datetime]:
+        s = str(value).strip()
+
+        if self.format is None:
+            self.format = self._sniff(s)
+
+        if self.format is not None:
+            match = FILL_TIME_FORMATS[self.format].fullmatch(s)
+            if match:
+                try:
+                    result = _BUILDERS[self.format](match)
+                    self.stats['fast_path'] += 1
+                    return result
+                except ValueError:
+                    pass  # e.g. month 13 - let the fallback decide
+
+        self.stats['fallback'] += 1
+        return self.fallback(value)
+
+    @staticmethod
+    def _sniff(s: str) -> Optional[str]:
+        """first format whose regex matches and builds a valid datetime"""
+        for name, pattern in FILL_TIME_FORMATS.items():
+            match = pattern.fullmatch(s)
+            if match:
+                try:
+                    _BUILDERS[name](match)
+                    return name
+                except ValueError:
+                    continue
+        return None
@@ -0,0 +1,96 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple, Union
+import numpy as np
+import pytz
+
+# Batch version of app.api.pnl.get_trading_day.
+#
+# The scalar function builds a pytz timezone and runs localize / astimezone / replace
+# for every trade. Here the whole column goes through numpy in one pass:
+#
+# - naive exit times are wall-clock in the trading timezone (what get_trading_day
+#   assumes), so no offset is needed - the cutoff is a shift by (24 - close) hours
+#   minus 1µs and a truncate to the date
+# - aware exit times are converted to UTC, then to wall-clock with the zone's UTC
+#   offset at that instant, looked up in the zone's precomputed DST transition table
+#   (searchsorted, the same bisect pytz's fromutc does), then shifted the same way
+#
+# Results are date ordinals (date.toordinal()), or datetime64[D] / ISO strings.
+
+TimeArray = Union[np.ndarray, Sequence[datetime]]
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+@lru_cache(maxsize=None)
+def utc_transitions(timezone: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (transition instants as datetime64[us] UTC, offset in effect from each one as
+    timedelta64[us]) for a pytz zone. Fixed-offset zones get a single entry.
+    """
+    tz = pytz.timezone(timezone)
+    # pytz keeps the compiled tzfile transitions on DstTzInfo zones; fromutc bisects these
+    transition_times = getattr(tz, '_utc_transition_times', None)
+    if transition_times:
+        starts = np.array(transition_times, dtype='datetime64[us]')
+        offsets = np.array([info[0] for info in tz._transition_info], dtype='timedelta64[us]')
+    else:
+        starts = np.array([datetime.min], dtype='datetime64[us]')
+        offsets = np.array([tz.utcoffset(datetime(2000, 1, 1))], dtype='timedelta64[us]')
+    return starts, offsets
+
+
+def _to_arrays(exit_times: TimeArray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    -> (datetime64[us] array, bool array marking the UTC instants)
+
+    A datetime64 array is naive wall-clock. A sequence of datetimes can mix naive and
+    aware values, aware ones are converted to naive UTC.
+    """
+    if isinstance(exit_times, np.ndarray) and np.issubdtype(exit_times.dtype, np.datetime64):
+        return exit_times.astype('datetime64[us]'), np.zeros(exit_times.shape, dtype=bool)
+
+    naive = []
+    is_utc = np.zeros(len(exit_times), dtype=bool)
+    for i, dt in enumerate(exit_times):
+        offset = dt.utcoffset()
+        if offset is not None:
+            dt = dt.replace(tzinfo=None) - offset
+            is_utc[i] = True
+        naive.append(dt)
+    return np.array(naive, dtype='datetime64[us]'), is_utc
+
+
+def wall_clock_array(exit_times: TimeArray, timezone: str = 'America/Los_Angeles') -> np.ndarray:
+    """exit times as naive wall-clock datetime64[us] in `timezone` (naive inputs are taken as already in it)"""
+    wall_clock, is_utc = _to_arrays(exit_times)
+    if is_utc.any():
+        starts, offsets = utc_transitions(timezone)
+        instants = wall_clock[is_utc]
+        idx = np.maximum(np.searchsorted(starts, instants, side='right') - 1, 0)
+        wall_clock[is_utc] = instants + offsets[idx]
+    return wall_clock
+
+
+def trading_day_array(exit_times: TimeArray, market_close_hour: int = 15,
+                      timezone: str = 'America/Los_Angeles') -> np.ndarray:
+    """trading day of every exit time as datetime64[D], same answer as get_trading_day per element"""
+    wall_clock = wall_clock_array(exit_times, timezone)
+    shift = np.timedelta64(timedelta(hours=24 - market_close_hour) - timedelta(microseconds=1))
+    return (wall_clock + shift).astype('datetime64[D]')
+
+
+def trading_day_ordinals(exit_times: TimeArray, market_close_hour: int = 15,
+                         timezone: str = 'America/Los_Angeles') -> np.ndarray:
+    """trading days as int64 date ordinals (date.fromordinal(n) gives the date back)"""
+    days = trading_day_array(exit_times, market_close_hour, timezone)
+    return days.astype(np.int64) + EPOCH_ORDINAL
+
+
+def trading_day_strings(exit_times: TimeArray, market_close_hour: int = 15,
+                        timezone: str = 'America/Los_Angeles') -> List[str]:
+    """trading days as ISO strings, like get_trading_day returns (one isoformat per distinct day)"""
+    ordinals = trading_day_ordinals(exit_times, market_close_hour, timezone)
+    iso: Dict[int, str] = {}
+    return [iso.get(n) or iso.setdefault(n, date.fromordinal(n).isoformat()) for n in ordinals.tolist()]